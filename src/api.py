@@ -0,0 +1,51 @@
+from typing import IO, Any
+
+from src.parsing import parse_text
+from src.logic import Map
+from src.logic.improve import Improver
+from src.logic.schedule import Schedule
+
+
+def solve(
+    source: str | bytes | IO[str] | IO[bytes],
+    strategy: str = "bfs",
+    budget: float = 0
+) -> Schedule:
+    """
+    Plan a map given in memory.
+
+    Library entry point: no file is written, nothing is printed and
+    nothing is logged unless the schedule is improved.
+
+    Parameters
+    ----------
+    source
+        Map text, UTF-8 bytes, or a text or binary file object, see
+        parse_text.
+    strategy
+        Planning strategy, one of STRATEGIES.
+    budget
+        Seconds spent improving the schedule once planned, see Improver.
+
+    Returns
+    -------
+    Schedule
+        Planned schedule.
+
+    Raises
+    ------
+    ParseError:
+        Raised when the map text fails to parse.
+    pydantic.ValidationError:
+        Raised when the parsed values are out of range.
+    RuntimeError:
+        Raised if the strategy is unknown or the map can't be solved.
+    """
+    map_specs: dict[str, Any] = parse_text(source)
+    Map.Validate(**map_specs)
+    m: Map = Map(**map_specs)
+    drones, routes = m.plan(strategy)
+    if budget > 0:
+        Improver(m, drones, routes, strategy).improve(budget)
+    m.finalize(routes)
+    return Schedule(m, drones, routes, strategy)
@@ -1,4 +1,5 @@
 from .display import MapView
 from .helpers import screen_size
+from .export import export_frames
 
-__all__ = ["MapView", "screen_size"]
+__all__ = ["MapView", "screen_size", "export_frames"]
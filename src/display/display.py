@@ -1,22 +1,58 @@
+from typing import Sequence
+
 import arcade
+from pyglet.graphics import Batch
 from arcade.shape_list import (
     Shape,
+    ShapeElementList,
     create_rectangle_filled,
     create_ellipse_filled,
     create_polygon,
     create_line
 )
 
-from src.logic import Map, Connection
-from .helpers import parse_color, triangle_points, regular_polygon_points
+from src.logic import Map, Hub, Connection
+from src.logic.trace import Trace
+from src.logic.stream import PlanStream
+from src.logic.periodic import PeriodicSchedule
+from src.logic.analytics import Congestion, FloatArray, utilization
+from src.logic.watch import MapWatcher, MapDiff, Pair, pair
+from .helpers import (
+    parse_color,
+    triangle_points,
+    regular_polygon_points,
+    heat_color
+)
+
+
+# seconds between frames while something changes, and while idle
+DRAW_RATE: float = 1 / 60
+IDLE_DRAW_RATE: float = 0.5
+# frames drawn after a change, the window flips front and back buffers
+BUFFERS: int = 2
+# seconds between checks of a watched map file
+WATCH_RATE: float = 0.5
 
 
 class MapView(arcade.View):
     """
     Arcade view that draws the map and simulation state.
+
+    Labels are only updated when the turn changes, and only those whose
+    count differs from the displayed one. Once a frame shows the current
+    state, the window draws at IDLE_DRAW_RATE until something changes, and
+    frames that would show the same state are not drawn again.
     """
     def __init__(
-        self, m: Map, *, cell_size: float = 112, pad: float = 1.2
+        self,
+        m: Map,
+        *,
+        trace: Trace | None = None,
+        stream: PlanStream | None = None,
+        schedule: PeriodicSchedule | None = None,
+        watch: MapWatcher | None = None,
+        cell_size: float = 112,
+        pad: float = 1.2
     ) -> None:
         """
         Initialize the map view.
@@ -27,6 +63,16 @@ class MapView(arcade.View):
         ----------
         m
             Map instance to display.
+        trace
+            Trace to read occupancy from, instead of the map reservations.
+        stream
+            Schedule still being planned, received while displaying.
+        schedule
+            Periodic schedule to read occupancy from, instead of the map
+            reservations.
+        watch
+            Watcher of the map file, replacing the map and stream when the
+            file changes.
         cell_size
             Pixel size of one grid cell.
         pad
@@ -42,21 +88,51 @@ class MapView(arcade.View):
         self._current_turn: int = 0
 
         self.map: Map = m
-        for name in m.hubs:
-            x: int = int(m.hubs[name].x)
-            y: int = int(m.hubs[name].y)
-            m.hubs[name].x, m.hubs[name].y = self.grid_to_world(x, y)
+        # anything with occupancy_row(turn), indexed by node id
+        self.occupancy: Map | Trace | PeriodicSchedule = (
+            trace or schedule or m
+        )
+        self.stream: PlanStream | None = stream
+        self.watch: MapWatcher | None = watch
+        self.watch_time: float = 0
+        # world coordinates, the hubs keep their grid ones
+        self.positions: dict[Hub, tuple[float, float]] = {
+            hub: self.grid_to_world(int(hub.x), int(hub.y))
+            for hub in m.hubs.values()
+        }
 
         self.camera: arcade.Camera2D = arcade.Camera2D()
         self.gui_camera: arcade.Camera2D = arcade.Camera2D()
 
-        self.static_shapes: list[Shape] = []
+        # shapes and map labels are each drawn in a single call, lines
+        # first so that hubs are drawn over them
+        self.connection_shapes: ShapeElementList[Shape] = ShapeElementList()
+        self.static_shapes: ShapeElementList[Shape] = ShapeElementList()
+        self.labels: Batch = Batch()
+        # by name, so a reloaded map only redraws what changed
+        self.hub_shape: dict[str, Shape] = {}
         self.hub_name: dict[str, arcade.Text] = {}
         self.hub_count: dict[str, arcade.Text] = {}
-        self.connection_count: dict[Connection, arcade.Text] = {}
+        self.connection_shape: dict[Pair, Shape] = {}
+        self.connection_count: dict[Pair, arcade.Text] = {}
+        # drone counters, indexed by node id
+        self.counters: list[arcade.Text] = []
+        # counts shown by the counters, and whether they are outdated
+        self.shown_row: list[int] = []
+        self.dirty: bool = True
+        # camera position and zoom of the last frame drawn, and how many
+        # buffers of the window show it
+        self.drawn_view: tuple[float, float, float] | None = None
+        self.drawn: int = 0
+        # arcade windows start at full rate
+        self.draw_rate: float = DRAW_RATE
         self.world_bounds: tuple[float, float, float, float] | None = None
+        # utilization overlay, built when first shown
+        self.heatmap: ShapeElementList[Shape] | None = None
+        self.show_heatmap: bool = False
 
         self.turn_display: arcade.Text | None = None
+        self.progress_display: arcade.Text | None = None
         self.title_display: arcade.Text | None = None
 
     @property
@@ -92,10 +168,38 @@ class MapView(arcade.View):
         value
             New simulation turn index.
         """
-        if self.map.turn_count <= 0:
-            self._current_turn = 0
-            return
-        self._current_turn = value % self.map.turn_count
+        turn: int = (
+            value % self.map.turn_count if self.map.turn_count > 0 else 0
+        )
+        if turn != self._current_turn:
+            self._current_turn = turn
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Mark the counters and HUD as outdated and redraw soon.
+        """
+        self.dirty = True
+        self.wake()
+
+    def wake(self) -> None:
+        """
+        Draw at full rate until the next frame is drawn.
+        """
+        self.set_draw_rate(DRAW_RATE)
+
+    def set_draw_rate(self, rate: float) -> None:
+        """
+        Change the draw rate of the window, if it differs.
+
+        Parameters
+        ----------
+        rate
+            Seconds between two frames.
+        """
+        if rate != self.draw_rate:
+            self.draw_rate = rate
+            self.window.set_draw_rate(rate)
 
     def grid_to_world(self, x: int, y: int) -> tuple[float, float]:
         """
@@ -146,7 +250,7 @@ class MapView(arcade.View):
         """
         Build the HUD layer.
 
-        Create HUD texts for the title and current turn.
+        Create HUD texts for the title, current turn and planning progress.
         """
         t = arcade.Text(
             "0",
@@ -159,6 +263,17 @@ class MapView(arcade.View):
         )
         self.turn_display = t
 
+        t = arcade.Text(
+            "",
+            0,
+            0,
+            arcade.color.GRAY,
+            self.window.width // 60,
+            anchor_x="left",
+            anchor_y="bottom"
+        )
+        self.progress_display = t
+
         t = arcade.Text(
             "Fly-in",
             0,
@@ -176,82 +291,252 @@ class MapView(arcade.View):
 
         Create shapes and labels that do not change per turn.
         """
+        self.connection_shapes.clear()
         self.static_shapes.clear()
+        self.labels = Batch()
+        self.hub_shape.clear()
         self.hub_name.clear()
         self.hub_count.clear()
+        self.connection_shape.clear()
         self.connection_count.clear()
 
         for connection in self.map.connections:
-            a, b = connection.linked
-            a_x, a_y = a.x, a.y
-            b_x, b_y = b.x, b.y
-            self.static_shapes.append(
-                create_line(a_x, a_y, b_x, b_y, arcade.color.DAVY_GREY, 6.3)
-            )
-            x: float = (a_x + b_x) / 2
-            y: float = (a_y + b_y) / 2
-            t = arcade.Text(
-                "0",
-                x,
-                y,
-                arcade.color.SNOW,
-                8,
-                anchor_x="center",
-                anchor_y="center"
+            self.add_connection(connection)
+        for hub in self.map.hubs.values():
+            self.add_hub(hub)
+        self.index_counters()
+        self.shown_row = [0] * len(self.map.nodes)
+        self.fit_bounds()
+        self.dirty = True
+
+    def add_connection(self, connection: Connection) -> None:
+        """
+        Draw a connection and its counter.
+
+        Parameters
+        ----------
+        connection
+            Connection of the displayed map.
+        """
+        a, b = connection.linked
+        a_x, a_y = self.positions[a]
+        b_x, b_y = self.positions[b]
+        key: Pair = pair(a.name, b.name)
+        self.connection_shape[key] = create_line(
+            a_x, a_y, b_x, b_y, arcade.color.DAVY_GREY, 6.3
+        )
+        self.connection_shapes.append(self.connection_shape[key])
+        self.connection_count[key] = arcade.Text(
+            "0",
+            (a_x + b_x) / 2,
+            (a_y + b_y) / 2,
+            arcade.color.SNOW,
+            8,
+            anchor_x="center",
+            anchor_y="center",
+            batch=self.labels
+        )
+
+    def add_hub(self, hub: Hub) -> None:
+        """
+        Draw a hub, its name and its counter.
+
+        Parameters
+        ----------
+        hub
+            Hub of the displayed map.
+        """
+        x, y = self.positions[hub]
+        color: arcade.types.Color = parse_color(hub.color)
+        shape: Shape | None = None
+        if hub.zone == "normal":
+            shape = create_ellipse_filled(x, y, 30, 30, color)
+        elif hub.zone == "restricted":
+            shape = create_rectangle_filled(x, y, 30, 29, color)
+        elif hub.zone == "priority":
+            shape = create_polygon(triangle_points(x, y + 3.3, 29), color)
+        elif hub.zone == "blocked":
+            shape = create_polygon(
+                regular_polygon_points(x, y, 17.5, 6), color
             )
-            self.connection_count[connection] = t
+        if shape is not None:
+            self.hub_shape[hub.name] = shape
+            self.static_shapes.append(shape)
+
+        self.hub_name[hub.name] = arcade.Text(
+            hub.name,
+            x,
+            y - 32,
+            arcade.color.SNOW,
+            9,
+            anchor_x="center",
+            anchor_y="bottom",
+            batch=self.labels
+        )
+        self.hub_count[hub.name] = arcade.Text(
+            "0",
+            x,
+            y,
+            arcade.color.CHARCOAL,
+            11,
+            anchor_x="center",
+            anchor_y="center",
+            batch=self.labels
+        )
 
+    def remove_connection(self, key: Pair) -> None:
+        """
+        Erase a connection and its counter, if drawn.
+
+        Parameters
+        ----------
+        key
+            Names of the connected hubs, see pair.
+        """
+        if key in self.connection_shape:
+            self.connection_shapes.remove(self.connection_shape.pop(key))
+        if key in self.connection_count:
+            self.connection_count.pop(key).label.delete()
+
+    def remove_hub(self, name: str) -> None:
+        """
+        Erase a hub, its name and its counter, if drawn.
+
+        Parameters
+        ----------
+        name
+            Hub name.
+        """
+        if name in self.hub_shape:
+            self.static_shapes.remove(self.hub_shape.pop(name))
+        for texts in (self.hub_name, self.hub_count):
+            if name in texts:
+                texts.pop(name).label.delete()
+
+    def index_counters(self) -> None:
+        """
+        List the counters by node id of the displayed map.
+        """
+        self.counters = [
+            self.hub_count[key] if isinstance(key, str)
+            else self.connection_count[key]
+            for key in map(self.node_key, self.map.nodes)
+        ]
+
+    def fit_bounds(self) -> None:
+        """
+        Compute the world bounds of the hubs.
+        """
+        x_list: list[float] = [x for x, _ in self.positions.values()]
+        y_list: list[float] = [y for _, y in self.positions.values()]
+        self.world_bounds = (
+            min(x_list), min(y_list), max(x_list), max(y_list)
+        )
+
+    def reload(self) -> None:
+        """
+        Switch to the map the watcher just reloaded.
+
+        Only hubs and connections the diff redraws get new shapes and
+        labels, the others are kept as they are. Shown counts are matched
+        by name, so unchanged counters are not laid out again.
+        """
+        assert self.watch is not None
+        assert self.watch.diff is not None
+
+        diff: MapDiff = self.watch.diff
+        # counts shown by hub name and connection key
+        shown: dict[str | Pair, int] = {
+            self.node_key(node): count
+            for node, count in zip(self.map.nodes, self.shown_row)
+        }
+        for key in diff.relinked:
+            self.remove_connection(key)
+        for name in diff.redrawn:
+            self.remove_hub(name)
+
+        self.map = self.watch.map
+        self.occupancy = self.watch.map
+        self.stream = self.watch.stream
+        self.positions = {
+            hub: self.grid_to_world(int(hub.x), int(hub.y))
+            for hub in self.map.hubs.values()
+        }
+        for connection in self.map.connections:
+            a, b = connection.linked
+            if pair(a.name, b.name) in diff.relinked:
+                self.add_connection(connection)
+        for name in diff.redrawn & self.map.hubs.keys():
+            self.add_hub(self.map.hubs[name])
+
+        self.index_counters()
+        # new counters show 0, whatever the old ones showed
+        self.shown_row = [
+            -1 if key in diff.redrawn or key in diff.relinked
+            else shown.get(key, -1)
+            for key in map(self.node_key, self.map.nodes)
+        ]
+        self.fit_bounds()
+        if self.show_heatmap:
+            self.heatmap_layer()
+        self.invalidate()
+
+    @staticmethod
+    def node_key(node: Hub | Connection) -> str | Pair:
+        """
+        Key a node by name, the same in every version of the map.
+
+        Parameters
+        ----------
+        node
+            Hub or connection.
+
+        Returns
+        -------
+        str | Pair
+            Hub name, or names of the connected hubs.
+        """
+        if isinstance(node, Hub):
+            return node.name
+        a, b = node.linked
+        return pair(a.name, b.name)
+
+    def heatmap_layer(self) -> None:
+        """
+        Build the utilization overlay.
+
+        Color each used hub and connection from green to red by the share
+        of its capacity used over the schedule. A trace only holds
+        occupancy rows, so its routes are reserved on the map first, and
+        a periodic schedule, never reserved, sums its own lanes.
+        """
+        trace: Map | Trace | PeriodicSchedule = self.occupancy
+        if isinstance(trace, Trace) and not self.map.context.arrivals:
+            self.map.apply_paths(trace.routes())
+        used: FloatArray = (
+            utilization(self.map, trace.drone_turns())
+            if isinstance(trace, PeriodicSchedule)
+            else Congestion(self.map).utilization
+        )
+
+        self.heatmap = ShapeElementList()
+        for connection in self.map.connections:
+            if used[connection.id] <= 0:
+                continue
+            a, b = connection.linked
+            a_x, a_y = self.positions[a]
+            b_x, b_y = self.positions[b]
+            self.heatmap.append(create_line(
+                a_x, a_y, b_x, b_y,
+                heat_color(float(used[connection.id])), 16
+            ))
         for hub in self.map.hubs.values():
-            x, y = hub.x, hub.y
-            color: arcade.types.Color = parse_color(hub.color)
-            if hub.zone == "normal":
-                self.static_shapes.append(
-                    create_ellipse_filled(x, y, 30, 30, color)
-                )
-            elif hub.zone == "restricted":
-                self.static_shapes.append(
-                    create_rectangle_filled(x, y, 30, 29, color)
-                )
-            elif hub.zone == "priority":
-                pts: list[tuple[float, float]] = triangle_points(
-                    x, y + 3.3, 29
-                )
-                self.static_shapes.append(create_polygon(pts, color))
-            elif hub.zone == "blocked":
-                pts = regular_polygon_points(x, y, 17.5, 6)
-                self.static_shapes.append(create_polygon(pts, color))
-
-        x_list: list[int | float] = [hub.x for hub in self.map.hubs.values()]
-        y_list: list[int | float] = [hub.y for hub in self.map.hubs.values()]
-        min_x, max_x = min(x_list), max(x_list)
-        min_y, max_y = min(y_list), max(y_list)
-        self.world_bounds = (min_x, min_y, max_x, max_y)
-
-        for name, hub in self.map.hubs.items():
-            x, y = hub.x, hub.y
-            t = arcade.Text(
-                name,
-                x,
-                y - 32,
-                arcade.color.SNOW,
-                9,
-                anchor_x="center",
-                anchor_y="bottom"
-            )
-            self.hub_name[name] = t
-
-        for name, hub in self.map.hubs.items():
-            x, y = hub.x, hub.y
-            t = arcade.Text(
-                "0",
-                x,
-                y,
-                arcade.color.CHARCOAL,
-                11,
-                anchor_x="center",
-                anchor_y="center"
-            )
-            self.hub_count[name] = t
+            if used[hub.id] <= 0:
+                continue
+            x, y = self.positions[hub]
+            self.heatmap.append(create_ellipse_filled(
+                x, y, 50, 50, heat_color(float(used[hub.id]))
+            ))
 
     def camera_to_bounds(self) -> None:
         """
@@ -291,18 +576,36 @@ class MapView(arcade.View):
         self.static_layer()
         self.hud_layer()
         self.camera_to_bounds()
+        self.invalidate()
 
     def on_update(self, dt: float) -> None:
         """
         Update the simulation state.
 
-        Advance turns when not paused.
+        Reload the watched map file, receive streamed routes and advance
+        turns when not paused.
 
         Parameters
         ----------
         dt
             Elapsed time since last update.
         """
+        if self.watch is not None:
+            self.watch_time += dt
+            if self.watch_time >= WATCH_RATE:
+                self.watch_time = 0
+                error: str | None = self.watch.error
+                if self.watch.poll():
+                    self.reload()
+                elif self.watch.error != error:
+                    self.invalidate()
+        if self.stream is not None and not self.stream.done:
+            if self.stream.poll():
+                self.invalidate()
+            # a watched file may still be fixed
+            if self.stream.error is not None and self.watch is None:
+                arcade.exit()
+                return
         if self.pause:
             return
         self.elapsed_time += dt
@@ -310,49 +613,107 @@ class MapView(arcade.View):
             self.elapsed_time = 0.0
             self.current_turn += 1
 
-    def on_draw(self) -> None:
+    def refresh(self) -> None:
         """
-        Draw the current frame.
+        Update the counters and HUD to the current turn.
 
-        Draw map shapes, counts, and HUD overlays.
+        Only counters whose count differs from the displayed one get a new
+        text, since setting Text.text lays its glyphs out again.
         """
-        self.clear()
-
-        self.camera.use()
-        for s in self.static_shapes:
-            s.draw()
-
-        for name, hub in self.map.hubs.items():
-            self.hub_count[name].text = str(
-                len(hub.drones.get(self.current_turn, []))
-            )
-            self.hub_count[name].draw()
-
-        for c in self.map.connections:
-            self.connection_count[c].text = str(
-                c.drone_count.get(self.current_turn, 0)
-            )
-            self.connection_count[c].draw()
-
-        for name in self.map.hubs.keys():
-            self.hub_name[name].draw()
-
-        self.gui_camera.use()
         assert self.turn_display is not None
-        assert self.world_bounds is not None
+        assert self.progress_display is not None
         assert self.title_display is not None
 
+        row: Sequence[int] = self.occupancy.occupancy_row(self.current_turn)
+        for node_id, (count, shown) in enumerate(zip(row, self.shown_row)):
+            if count != shown:
+                self.counters[node_id].text = str(count)
+        self.shown_row = list(row)
+
         self.turn_display.x = self.window.height * 0.01
         self.turn_display.y = self.window.height * 0.01
         self.turn_display.text = (
             f"{self.current_turn + 1}/{self.map.turn_count}"
         )
-        self.turn_display.draw()
+
+        status: str = self.status()
+        if status:
+            self.progress_display.x = (
+                self.turn_display.x + self.turn_display.content_width
+                + self.window.height * 0.02
+            )
+            self.progress_display.y = self.turn_display.y
+            self.progress_display.text = status
 
         self.title_display.x = self.window.height * 0.01
         self.title_display.y = self.window.height - self.window.height * 0.01
+
+    def status(self) -> str:
+        """
+        Describe what the displayed schedule is waiting for.
+
+        Returns
+        -------
+        str
+            Why the watched file was not reloaded, why planning failed,
+            planning progress or the turn count being improved, empty
+            once the schedule is final.
+        """
+        if self.watch is not None and self.watch.error is not None:
+            return self.watch.error
+        if self.stream is None:
+            return ""
+        if self.stream.error is not None:
+            return self.stream.error
+        # turns stay provisional while drones are being planned
+        if self.stream.improving:
+            return f"improving, {self.map.turn_count} turns"
+        if not self.stream.done:
+            return f"planning {self.stream.planned}/{self.map.nb_drones}"
+        return ""
+
+    def on_draw(self) -> None:
+        """
+        Draw the current frame.
+
+        Draw map shapes, counts, and HUD overlays, then slow down drawing
+        until something changes. Frames are skipped once both buffers of
+        the window show the current state and camera.
+        """
+        view: tuple[float, float, float] = (
+            *self.camera.position, self.camera.zoom
+        )
+        if self.dirty or view != self.drawn_view:
+            self.drawn_view = view
+            self.drawn = 0
+        elif self.drawn >= BUFFERS:
+            return
+        self.drawn += 1
+
+        self.clear()
+        if self.dirty:
+            self.refresh()
+            self.dirty = False
+
+        self.camera.use()
+        # under the map, so hubs and counters stay readable
+        if self.show_heatmap and self.heatmap is not None:
+            self.heatmap.draw()
+        self.connection_shapes.draw()
+        self.static_shapes.draw()
+        self.labels.draw()
+
+        self.gui_camera.use()
+        assert self.turn_display is not None
+        assert self.progress_display is not None
+        assert self.title_display is not None
+        self.turn_display.draw()
+        if self.status():
+            self.progress_display.draw()
         self.title_display.draw()
 
+        self.set_draw_rate(IDLE_DRAW_RATE)
+
     def on_mouse_drag(
         self, x: int, y: int, dx: int, dy: int, buttons: int, modifiers: int
     ) -> None:
@@ -384,6 +745,7 @@ class MapView(arcade.View):
             self.camera.position = (
                 cx - dx / self.camera.zoom, cy - dy / self.camera.zoom
             )
+            self.wake()
 
     def on_resize(self, width: int, height: int) -> None:
         """
@@ -400,6 +762,7 @@ class MapView(arcade.View):
         """
         super().on_resize(width, height)
         self.camera_to_bounds()
+        self.invalidate()
 
     def on_mouse_scroll(
         self, x: int, y: int, scroll_x: int, scroll_y: int
@@ -443,12 +806,13 @@ class MapView(arcade.View):
         self.camera.position = (
             camera_x + (pre_x - new_x), camera_y + (pre_y - new_y)
         )
+        self.wake()
 
     def on_key_press(self, symbol: int, modifiers: int) -> bool | None:
         """
         Handle key press events.
 
-        Handle pause, stepping, reset, and quit controls.
+        Handle pause, stepping, reset, heatmap, and quit controls.
 
         Parameters
         ----------
@@ -472,6 +836,13 @@ class MapView(arcade.View):
         if symbol == arcade.key.R:
             self.current_turn = 0
             return True
+        if symbol == arcade.key.C:
+            self.show_heatmap = not self.show_heatmap
+            # rebuilt, as planning may have gone on since
+            if self.show_heatmap:
+                self.heatmap_layer()
+            self.invalidate()
+            return True
         if (
             (symbol == arcade.key.L or symbol == arcade.key.RIGHT)
             and self.pause
@@ -0,0 +1,407 @@
+import os
+import multiprocessing as mp
+from typing import Any, Iterator, Sequence
+
+import arcade
+from PIL import Image, ImageDraw, ImageFont
+
+from src.logic import Map
+from src.logic.trace import Trace
+from src.logic.periodic import PeriodicSchedule
+from .helpers import parse_color, triangle_points, regular_polygon_points
+
+
+# world units, as in MapView
+CELL_SIZE: float = 112
+PAD: float = 1.2
+# default frame width in pixels
+WIDTH: int = 1280
+# milliseconds per turn in animations, as the viewer autoplay
+FRAME_DURATION: int = 600
+# turns sent to a worker at once
+CHUNK_SIZE: int = 16
+
+RGB = tuple[int, int, int]
+Font = ImageFont.FreeTypeFont | ImageFont.ImageFont
+# node id, pixel position, color and font size of a counter
+Label = tuple[int, float, float, RGB, int]
+
+# base image, counters and HUD, set once in each worker by init_worker
+worker_state: dict[str, Any] = {}
+
+
+def rgb(color: arcade.types.Color) -> RGB:
+    """
+    Drop the alpha channel of an Arcade color.
+
+    Parameters
+    ----------
+    color
+        Arcade color.
+
+    Returns
+    -------
+    RGB
+        Red, green and blue values.
+    """
+    return color[0], color[1], color[2]
+
+
+class Layout():
+    """
+    Frame geometry: the MapView camera fitted to a fixed width.
+
+    Hubs are placed in the same world units as MapView, and the map
+    bounds are padded and scaled to the frame, y pointing down.
+    """
+    def __init__(self, m: Map, width: int = WIDTH) -> None:
+        """
+        Fit a map to a frame width.
+
+        Parameters
+        ----------
+        m
+            Map to draw.
+        width
+            Frame width in pixels.
+        """
+        xs: list[float] = [float(h.x) * CELL_SIZE for h in m.hubs.values()]
+        ys: list[float] = [float(h.y) * CELL_SIZE for h in m.hubs.values()]
+        w: float = max(max(xs) - min(xs), CELL_SIZE * 0.5) * PAD
+        h: float = max(max(ys) - min(ys), CELL_SIZE * 0.5) * PAD
+
+        self.center: tuple[float, float] = (
+            (min(xs) + max(xs)) * 0.5, (min(ys) + max(ys)) * 0.5
+        )
+        self.zoom: float = width / w
+        self.width: int = width
+        self.height: int = max(int(h * self.zoom), 1)
+
+    def to_pixel(self, x: float, y: float) -> tuple[float, float]:
+        """
+        Convert world coords to pixel coords.
+
+        Parameters
+        ----------
+        x
+            World x coordinate.
+        y
+            World y coordinate.
+
+        Returns
+        -------
+        tuple[float, float]
+            Pixel coordinates, from the top left corner.
+        """
+        return (
+            (x - self.center[0]) * self.zoom + self.width * 0.5,
+            self.height * 0.5 - (y - self.center[1]) * self.zoom
+        )
+
+    def grid_to_pixel(
+        self, x: int | float, y: int | float
+    ) -> tuple[float, float]:
+        """
+        Convert grid coords to pixel coords.
+
+        Parameters
+        ----------
+        x
+            Grid x coordinate.
+        y
+            Grid y coordinate.
+
+        Returns
+        -------
+        tuple[float, float]
+            Pixel coordinates, from the top left corner.
+        """
+        return self.to_pixel(float(x) * CELL_SIZE, float(y) * CELL_SIZE)
+
+    def font_size(self, size: float) -> int:
+        """
+        Scale a world font size.
+
+        Parameters
+        ----------
+        size
+            Font size in world units.
+
+        Returns
+        -------
+        int
+            Font size in pixels, at least 1.
+        """
+        return max(int(size * self.zoom), 1)
+
+
+def render_base(m: Map, layout: Layout) -> Image.Image:
+    """
+    Draw what does not change per turn, as MapView.static_layer.
+
+    Parameters
+    ----------
+    m
+        Map to draw.
+    layout
+        Frame geometry.
+
+    Returns
+    -------
+    Image.Image
+        Connections, hubs, hub names and title.
+    """
+    image: Image.Image = Image.new(
+        "RGB", (layout.width, layout.height),
+        rgb(arcade.color.SMOKY_BLACK)
+    )
+    draw: ImageDraw.ImageDraw = ImageDraw.Draw(image)
+    zoom: float = layout.zoom
+
+    for c in m.connections:
+        a, b = c.linked
+        draw.line(
+            [layout.grid_to_pixel(a.x, a.y), layout.grid_to_pixel(b.x, b.y)],
+            fill=rgb(arcade.color.DAVY_GREY), width=max(int(6.3 * zoom), 1)
+        )
+
+    for hub in m.hubs.values():
+        x: float = float(hub.x) * CELL_SIZE
+        y: float = float(hub.y) * CELL_SIZE
+        px, py = layout.to_pixel(x, y)
+        color: RGB = rgb(parse_color(hub.color))
+        if hub.zone == "normal":
+            draw.ellipse(
+                [px - 15 * zoom, py - 15 * zoom,
+                 px + 15 * zoom, py + 15 * zoom],
+                fill=color
+            )
+        elif hub.zone == "restricted":
+            draw.rectangle(
+                [px - 15 * zoom, py - 14.5 * zoom,
+                 px + 15 * zoom, py + 14.5 * zoom],
+                fill=color
+            )
+        elif hub.zone == "priority":
+            draw.polygon(
+                [layout.to_pixel(*p) for p in triangle_points(x, y + 3.3, 29)],
+                fill=color
+            )
+        elif hub.zone == "blocked":
+            draw.polygon(
+                [
+                    layout.to_pixel(*p)
+                    for p in regular_polygon_points(x, y, 17.5, 6)
+                ],
+                fill=color
+            )
+
+    font: Font = ImageFont.load_default(layout.font_size(9))
+    for name, hub in m.hubs.items():
+        px, py = layout.grid_to_pixel(hub.x, hub.y)
+        draw.text(
+            (px, py + 32 * zoom), name, fill=rgb(arcade.color.SNOW),
+            font=font, anchor="md"
+        )
+
+    draw.text(
+        (layout.height * 0.01, layout.height * 0.01), "Fly-in",
+        fill=rgb(arcade.color.SNOW),
+        font=ImageFont.load_default(max(layout.width // 30, 1)), anchor="la"
+    )
+    return image
+
+
+def counter_labels(m: Map, layout: Layout) -> list[Label]:
+    """
+    Place the per-turn counters, as MapView.on_draw.
+
+    Parameters
+    ----------
+    m
+        Map to draw.
+    layout
+        Frame geometry.
+
+    Returns
+    -------
+    list[Label]
+        One counter per hub, at its center, and per connection, at its
+        middle.
+    """
+    labels: list[Label] = []
+    for hub in m.hubs.values():
+        px, py = layout.grid_to_pixel(hub.x, hub.y)
+        labels.append((
+            hub.id, px, py, rgb(arcade.color.CHARCOAL), layout.font_size(11)
+        ))
+    for c in m.connections:
+        a, b = c.linked
+        px, py = layout.grid_to_pixel(
+            (float(a.x) + float(b.x)) / 2, (float(a.y) + float(b.y)) / 2
+        )
+        labels.append((
+            c.id, px, py, rgb(arcade.color.SNOW), layout.font_size(8)
+        ))
+    return labels
+
+
+def init_worker(
+    base: Image.Image,
+    labels: list[Label],
+    turn_count: int,
+    out_dir: str
+) -> None:
+    """
+    Store what every frame of a worker needs.
+
+    Fonts are loaded here, since they cannot be sent to workers.
+
+    Parameters
+    ----------
+    base
+        Image of the static layer.
+    labels
+        Counters to draw on each frame.
+    turn_count
+        Number of turns, shown in the HUD and frame names.
+    out_dir
+        Directory the frames are written to.
+    """
+    worker_state["base"] = base
+    worker_state["labels"] = labels
+    worker_state["turn_count"] = turn_count
+    worker_state["out_dir"] = out_dir
+    worker_state["fonts"] = {
+        size: ImageFont.load_default(size)
+        for size in {label[4] for label in labels} | {base.width // 30}
+    }
+
+
+def frame_path(out_dir: str, turn: int, turn_count: int) -> str:
+    """
+    Name the frame of a turn.
+
+    Parameters
+    ----------
+    out_dir
+        Directory the frames are written to.
+    turn
+        Turn index.
+    turn_count
+        Number of turns, for zero padding.
+
+    Returns
+    -------
+    str
+        Path of the frame, sorting in turn order.
+    """
+    digits: int = len(str(turn_count))
+    return os.path.join(out_dir, f"turn_{turn + 1:0{digits}d}.png")
+
+
+def render_turn(task: tuple[int, Sequence[int]]) -> str:
+    """
+    Draw and write the frame of one turn.
+
+    Parameters
+    ----------
+    task
+        Turn index and drone count of each node, indexed by node id.
+
+    Returns
+    -------
+    str
+        Path of the written frame.
+    """
+    turn, row = task
+    image: Image.Image = worker_state["base"].copy()
+    draw: ImageDraw.ImageDraw = ImageDraw.Draw(image)
+    fonts: dict[int, Font] = worker_state["fonts"]
+    for node_id, px, py, color, size in worker_state["labels"]:
+        draw.text(
+            (px, py), str(row[node_id]), fill=color, font=fonts[size],
+            anchor="mm"
+        )
+
+    turn_count: int = worker_state["turn_count"]
+    draw.text(
+        (image.height * 0.01, image.height * 0.99),
+        f"{turn + 1}/{turn_count}", fill=rgb(arcade.color.SNOW),
+        font=fonts[image.width // 30], anchor="ld"
+    )
+    path: str = frame_path(worker_state["out_dir"], turn, turn_count)
+    image.save(path)
+    return path
+
+
+def export_frames(
+    m: Map,
+    occupancy: Map | Trace | PeriodicSchedule,
+    out_dir: str,
+    jobs: int = 1,
+    gif: bool = False,
+    width: int = WIDTH
+) -> list[str]:
+    """
+    Render every turn to a PNG image, without a window.
+
+    The static layer is drawn once and reused as the base of every
+    frame, only counters and the turn number being drawn per turn. With
+    more than one job, turns are rendered by a process pool.
+
+    Parameters
+    ----------
+    m
+        Map to draw, planned or loaded from a trace.
+    occupancy
+        Anything with occupancy_row(turn), indexed by node id.
+    out_dir
+        Directory the frames are written to, created if needed.
+    jobs
+        Number of worker processes.
+    gif
+        Whether to also assemble the frames into out_dir/replay.gif.
+    width
+        Frame width in pixels.
+
+    Returns
+    -------
+    list[str]
+        Paths of the frames, in turn order.
+
+    Raises
+    ------
+    OSError:
+        Raised when the frames cannot be written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    layout: Layout = Layout(m, width)
+    initargs: tuple[Image.Image, list[Label], int, str] = (
+        render_base(m, layout), counter_labels(m, layout), m.turn_count,
+        out_dir
+    )
+    # rows are read lazily, so memory does not grow with the turn count
+    tasks: Iterator[tuple[int, Sequence[int]]] = (
+        (turn, tuple(occupancy.occupancy_row(turn)))
+        for turn in range(m.turn_count)
+    )
+
+    paths: list[str]
+    if jobs > 1:
+        with mp.get_context().Pool(
+            jobs, initializer=init_worker, initargs=initargs
+        ) as pool:
+            paths = list(pool.imap(render_turn, tasks, CHUNK_SIZE))
+    else:
+        init_worker(*initargs)
+        paths = [render_turn(task) for task in tasks]
+
+    if gif and paths:
+        frames: Iterator[Image.Image] = (Image.open(p) for p in paths)
+        first: Image.Image = next(frames)
+        first.save(
+            os.path.join(out_dir, "replay.gif"), save_all=True,
+            append_images=frames, duration=FRAME_DURATION, loop=0
+        )
+    return paths
@@ -102,3 +102,29 @@ def regular_polygon_points(
         )
         for i in range(n)
     ]
+
+
+def heat_color(ratio: float, alpha: int = 170) -> arcade.types.Color:
+    """
+    Map a load ratio to a heatmap color.
+
+    Go from green (idle) through yellow to red (always full).
+
+    Parameters
+    ----------
+    ratio
+        Load between 0 and 1, clamped.
+    alpha
+        Opacity of the color.
+
+    Returns
+    -------
+    arcade.types.Color
+        Heatmap color.
+    """
+    ratio = min(max(ratio, 0.0), 1.0)
+    if ratio < 0.5:
+        return arcade.types.Color(int(510 * ratio), 200, 0, alpha)
+    return arcade.types.Color(
+        255, int(200 * (2 - 2 * ratio)), 0, alpha
+    )
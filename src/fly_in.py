@@ -1,14 +1,24 @@
 import sys
 import logging
-from typing import Any
+from functools import partial
+from typing import Any, Callable
 
 from pydantic import ValidationError
 import arcade
 
-from src.parsing import parse
-from src.logic import Map
+from src.parsing import parse, parse_parallel, IncrementalParser
+from src.logic import Map, STRATEGIES, race
+from src.logic.portfolio import DEADLINE
+from src.logic.trace import Trace, is_trace, write_trace
+from src.logic.stream import PlanStream
+from src.logic.validate import validate
+from src.logic.analytics import write_report
+from src.logic.periodic import PeriodicSchedule
+from src.logic.improve import BUDGET
+from src.logic.watch import MapWatcher
+from src.logic.sweep import sweep, jumps, write_sweep
 from src.error import ParseError, ErrCode
-from src.display import MapView, screen_size
+from src.display import MapView, screen_size, export_frames
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,6 +26,39 @@ logging.basicConfig(
 )
 logger: logging.Logger = logging.getLogger(__name__)
 
+OPTIONS: set[str] = {
+    "strategy", "portfolio", "trace-out", "validate", "jobs", "export",
+    "gif", "analytics", "periodic", "watch", "improve", "sweep"
+}
+
+
+def parse_options(argv: list[str]) -> tuple[list[str], dict[str, str]]:
+    """
+    Split command-line arguments.
+
+    Separate positional arguments from "--name[=value]" options.
+
+    Parameters
+    ----------
+    argv
+        Arguments without the program name.
+
+    Returns
+    -------
+    tuple[list[str], dict[str, str]]
+        Positional arguments and options, valueless options mapping to an
+        empty string.
+    """
+    args: list[str] = []
+    options: dict[str, str] = {}
+    for arg in argv:
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            options[name] = value
+        else:
+            args.append(arg)
+    return args, options
+
 
 def main() -> int:
     """
@@ -28,30 +71,148 @@ def main() -> int:
     int
         Exit status code as an ErrCode value.
     """
-    ac: int = len(sys.argv)
+    usage: str = (
+        "invalid usage. example :\n"
+        "make run ARGS=\"example_map [(float)size] [--strategy=name]"
+        " [--portfolio[=seconds]] [--trace-out=file] [--validate]"
+        " [--jobs=n] [--export=dir [--gif]] [--analytics=file]"
+        " [--periodic] [--watch] [--improve[=seconds]] [--sweep=file]\""
+    )
+    args, options = parse_options(sys.argv[1:])
+    ac: int = len(args) + 1
     win_size: float = 3
-    if not (1 < ac < 4):
-        logger.error(
-            "invalid usage. example :\n"
-            "make run ARGS=\"example_map [(float)size]\""
-        )
+    if not (1 < ac < 4) or not set(options) <= OPTIONS:
+        logger.error(usage)
         return ErrCode.ARGS_ERR
     if ac == 3:
         try:
-            win_size = float(sys.argv[2])
+            win_size = float(args[1])
             if win_size < 1 or win_size > 4:
                 logger.error("size must be greather than 0 and less than 5")
                 return ErrCode.ARGS_ERR
         except ValueError:
-            logger.error(
-                "invalid usage. example :\n"
-                "make run ARGS=\"example_map [(float)size]\""
-            )
+            logger.error(usage)
             return ErrCode.ARGS_ERR
+    strategy: str = options.get("strategy", "bfs")
+    if strategy not in STRATEGIES:
+        logger.error(f"strategy must be one of {', '.join(STRATEGIES)}")
+        return ErrCode.ARGS_ERR
+    try:
+        deadline: float = float(options.get("portfolio") or DEADLINE)
+    except ValueError:
+        logger.error(usage)
+        return ErrCode.ARGS_ERR
+
+    try:
+        budget: float = (
+            float(options.get("improve") or BUDGET)
+            if "improve" in options else 0
+        )
+    except ValueError:
+        logger.error(usage)
+        return ErrCode.ARGS_ERR
 
-    # parsing
     try:
-        map_specs: dict[str, Any] = parse(sys.argv[1])
+        jobs: int = int(options.get("jobs") or 1)
+    except ValueError:
+        logger.error(usage)
+        return ErrCode.ARGS_ERR
+    if jobs < 1:
+        logger.error("jobs must be greater than 0")
+        return ErrCode.ARGS_ERR
+
+    trace_out: str | None = options.get("trace-out") or None
+    if "trace-out" in options and trace_out is None:
+        logger.error(usage)
+        return ErrCode.ARGS_ERR
+    analytics_out: str | None = options.get("analytics") or None
+    if "analytics" in options and analytics_out is None:
+        logger.error(usage)
+        return ErrCode.ARGS_ERR
+    sweep_out: str | None = options.get("sweep") or None
+    if "sweep" in options and sweep_out is None:
+        logger.error(usage)
+        return ErrCode.ARGS_ERR
+    # the periodic schedule is never planned drone by drone
+    if "periodic" in options and options.keys() & {
+        "strategy", "portfolio", "trace-out", "analytics", "improve", "sweep"
+    }:
+        logger.error(
+            "--periodic cannot be combined with --strategy, --portfolio,"
+            " --trace-out, --analytics, --improve or --sweep"
+        )
+        return ErrCode.ARGS_ERR
+    # the first drones of a sweep are planned as if they were alone
+    if "sweep" in options and (
+        options.keys() & {"portfolio", "improve", "watch"}
+        or strategy == "windowed"
+    ):
+        logger.error(
+            "--sweep cannot be combined with --portfolio, --improve, --watch"
+            " or --strategy=windowed"
+        )
+        return ErrCode.ARGS_ERR
+    # the portfolio already spends its deadline on every strategy
+    if "portfolio" in options and "improve" in options:
+        logger.error("--improve cannot be combined with --portfolio")
+        return ErrCode.ARGS_ERR
+    # the map file is followed while the viewer is open
+    if "watch" in options and options.keys() & {
+        "portfolio", "periodic", "export"
+    }:
+        logger.error(
+            "--watch cannot be combined with --portfolio, --periodic or"
+            " --export"
+        )
+        return ErrCode.ARGS_ERR
+    # frames are rendered instead of opening the viewer
+    out_dir: str | None = options.get("export") or None
+    if ("export" in options and out_dir is None) or (
+        "gif" in options and out_dir is None
+    ):
+        logger.error(usage)
+        return ErrCode.ARGS_ERR
+    show: Callable[..., int] = (
+        display if out_dir is None
+        else partial(export, out_dir=out_dir, jobs=jobs, gif="gif" in options)
+    )
+
+    # a trace is displayed as is, without parsing nor planning
+    trace: Trace | None = None
+    try:
+        if is_trace(args[0]):
+            trace = Trace(args[0])
+    except ParseError as e:
+        logger.error(e)
+        return ErrCode.PARSE_ERR
+    except OSError as e:
+        logger.error(e)
+        return ErrCode.INVALID_PATH
+    if trace is not None and "watch" in options:
+        logger.error("--watch needs a map file, not a trace")
+        trace.close()
+        return ErrCode.ARGS_ERR
+    if trace is not None:
+        m: Map = Map(**trace.specs)
+        m.turn_count = trace.turn_count
+        if analytics_out is not None:
+            try:
+                _, routes = m.apply_paths(trace.routes())
+                write_report(analytics_out, m, routes.values())
+            except OSError as e:
+                logger.error(e)
+                trace.close()
+                return ErrCode.INVALID_PATH
+        return show(m, win_size, trace=trace)
+
+    # parsing, a watched file keeps its parsed lines for the next reload
+    parser: IncrementalParser = IncrementalParser(args[0])
+    try:
+        map_specs: dict[str, Any] = (
+            parser.parse() if "watch" in options
+            else parse_parallel(args[0], jobs) if jobs > 1
+            else parse(args[0])
+        )
     except ParseError as e:
         logger.error(e)
         return ErrCode.PARSE_ERR
@@ -63,31 +224,239 @@ def main() -> int:
     except ValidationError as e:
         logger.error(e.errors()[0]["msg"])
         return ErrCode.VALIDATION_ERR
-    m: Map = Map(**map_specs)
+    m = Map(**map_specs)
     logger.debug(m.hubs)
     logger.debug(m.connections)
 
-    # logic
+    if "periodic" in options:
+        try:
+            schedule: PeriodicSchedule = PeriodicSchedule(m)
+        except (RuntimeError, AssertionError) as e:
+            logger.error(e)
+            return ErrCode.INVALID_PATH
+        m.turn_count = schedule.turn_count
+        schedule.display_logs()
+        if "validate" in options and report(
+            validate(m, schedule.routes())
+        ):
+            return ErrCode.INVALID_PATH
+        return show(m, win_size, schedule=schedule)
+
+    if sweep_out is not None:
+        try:
+            drones, routes, turn_counts = sweep(m, strategy)
+            m.finalize(routes)
+            m.display_logs(drones, routes)
+            if trace_out is not None:
+                write_trace(trace_out, m, drones, routes)
+            if analytics_out is not None:
+                write_report(analytics_out, m, routes.values())
+            write_sweep(sweep_out, strategy, turn_counts)
+        except (RuntimeError, AssertionError, OSError) as e:
+            logger.error(e)
+            return ErrCode.INVALID_PATH
+        logger.info(
+            f"swept {len(turn_counts)} fleet sizes, turn count jumps at"
+            f" {', '.join(map(str, jumps(turn_counts))) or 'none'}"
+        )
+        if "validate" in options and report(validate(m, routes.values())):
+            return ErrCode.INVALID_PATH
+        return show(m, win_size)
+
+    # logic, a single strategy is planned while the viewer is open
+    if "portfolio" not in options:
+        stream: PlanStream = PlanStream(
+            m, strategy, trace_out, "validate" in options,
+            analytics_out, budget=budget
+        )
+        if "watch" in options:
+            return show(m, win_size, stream=stream, watch=MapWatcher(
+                parser, m, stream, strategy, trace_out,
+                "validate" in options, analytics_out, budget
+            ))
+        return show(m, win_size, stream=stream)
     try:
-        m.compute_paths()
-    except (RuntimeError, AssertionError) as e:
+        strategy, turn_count, encoded = race(map_specs, deadline)
+        logger.info(f"portfolio kept {strategy} ({turn_count} turns)")
+        drones, routes = m.apply_paths(encoded)
+        m.display_logs(drones, routes)
+        if trace_out is not None:
+            write_trace(trace_out, m, drones, routes)
+        if analytics_out is not None:
+            write_report(analytics_out, m, routes.values())
+    except (RuntimeError, AssertionError, OSError) as e:
         logger.error(e)
         return ErrCode.INVALID_PATH
+    if "validate" in options and report(validate(m, routes.values())):
+        return ErrCode.INVALID_PATH
+
+    return show(m, win_size)
+
 
-    # display
+def display(
+    m: Map,
+    win_size: float,
+    *,
+    trace: Trace | None = None,
+    stream: PlanStream | None = None,
+    schedule: PeriodicSchedule | None = None,
+    watch: MapWatcher | None = None
+) -> int:
+    """
+    Launch the viewer.
+
+    Parameters
+    ----------
+    m
+        Map to display.
+    win_size
+        Screen size divisor of the window.
+    trace
+        Trace to read occupancy from, if any.
+    stream
+        Schedule still being planned, if any.
+    schedule
+        Periodic schedule to read occupancy from, if any.
+    watch
+        Watcher of the map file, if any.
+
+    Returns
+    -------
+    int
+        Exit status code as an ErrCode value.
+    """
+    status: int = ErrCode.NOERR
     try:
         width, height = screen_size()
         window: arcade.Window = arcade.Window(
             int(width / win_size), int(height / win_size), "Fly-in"
         )
-        view: MapView = MapView(m)
+        view: MapView = MapView(
+            m, trace=trace, stream=stream, schedule=schedule, watch=watch
+        )
         window.show_view(view)
         arcade.run()
     except Exception as e:
         logger.error(e)
-        return ErrCode.DISPLAY_ERR
+        status = ErrCode.DISPLAY_ERR
+        # still print the logs without a viewer
+        if watch is not None:
+            stream = watch.stream
+        if stream is not None:
+            stream.wait()
+    finally:
+        if trace is not None:
+            trace.close()
+        # the schedule of the last reload is the one reported
+        if watch is not None:
+            stream = watch.stream
+        if stream is not None:
+            stream.close()
+    return stream_status(stream, status)
+
+
+def export(
+    m: Map,
+    win_size: float,
+    *,
+    out_dir: str,
+    jobs: int,
+    gif: bool,
+    trace: Trace | None = None,
+    stream: PlanStream | None = None,
+    schedule: PeriodicSchedule | None = None
+) -> int:
+    """
+    Render every turn to images instead of launching the viewer.
+
+    Parameters
+    ----------
+    m
+        Map to display.
+    win_size
+        Screen size divisor of the window, unused.
+    out_dir
+        Directory the frames are written to.
+    jobs
+        Number of rendering processes.
+    gif
+        Whether to also assemble the frames into an animation.
+    trace
+        Trace to read occupancy from, if any.
+    stream
+        Schedule still being planned, if any.
+    schedule
+        Periodic schedule to read occupancy from, if any.
+
+    Returns
+    -------
+    int
+        Exit status code as an ErrCode value.
+    """
+    status: int = ErrCode.NOERR
+    try:
+        if stream is not None:
+            stream.wait()
+        if stream is None or stream.error is None:
+            occupancy: Map | Trace | PeriodicSchedule = (
+                trace or schedule or m
+            )
+            paths: list[str] = export_frames(
+                m, occupancy, out_dir, jobs, gif
+            )
+            logger.info(f"{len(paths)} frames written to {out_dir}")
+    except OSError as e:
+        logger.error(e)
+        status = ErrCode.INVALID_PATH
+    finally:
+        if trace is not None:
+            trace.close()
+        if stream is not None:
+            stream.close()
+    return stream_status(stream, status)
+
 
-    return ErrCode.NOERR
+def stream_status(stream: PlanStream | None, status: int) -> int:
+    """
+    Report how a streamed schedule ended.
+
+    Parameters
+    ----------
+    stream
+        Schedule planned while displaying, if any.
+    status
+        Exit status of the display itself.
+
+    Returns
+    -------
+    int
+        Exit status code as an ErrCode value.
+    """
+    if stream is not None and stream.error is not None:
+        logger.error(stream.error)
+        return ErrCode.INVALID_PATH
+    if stream is not None and report(stream.violations):
+        return ErrCode.INVALID_PATH
+    return status
+
+
+def report(violations: list[tuple[int, str, str]]) -> bool:
+    """
+    Log schedule violations.
+
+    Parameters
+    ----------
+    violations
+        (turn, node name, reason) of each violation.
+
+    Returns
+    -------
+    bool
+        True if there is any violation.
+    """
+    for turn, name, reason in violations:
+        logger.error(f"turn {turn}, {name}: {reason}")
+    return bool(violations)
 
 
 if __name__ == "__main__":
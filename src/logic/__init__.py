@@ -1,5 +1,10 @@
 from .drones import Drone
 from .nodes import Hub, Connection
-from .map import Map
+from .context import SolveContext
+from .map import Map, STRATEGIES
+from .portfolio import race
 
-__all__ = ["Map", "Drone", "Hub", "Connection"]
+__all__ = [
+    "Map", "Drone", "Hub", "Connection", "SolveContext", "STRATEGIES",
+    "race"
+]
@@ -0,0 +1,331 @@
+import json
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+import numpy.typing as npt
+
+from src.logic import Hub, Connection
+from src.logic.layered import TURN_BITS, LayeredSearch, Table
+from src.logic.route import Route
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+# bottlenecks listed in reports
+TOP: int = 5
+
+IntArray = npt.NDArray[np.int64]
+BoolArray = npt.NDArray[np.bool_]
+FloatArray = npt.NDArray[np.float64]
+
+
+def utilization(
+    m: "Map", drone_turns: FloatArray | list[int]
+) -> FloatArray:
+    """
+    Get the share of the capacity of every node used over a schedule.
+
+    Parameters
+    ----------
+    m
+        Map the schedule runs on, holding its turn count.
+    drone_turns
+        Turns drones hold each node, indexed by node id.
+
+    Returns
+    -------
+    FloatArray
+        Drone-turns over capacity times turns, indexed by node id.
+    """
+    capacity: IntArray = np.array(
+        [n.max_drones for n in m.nodes], dtype=np.int64
+    )
+    turns: float = float(max(m.turn_count, 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nan_to_num(
+            np.asarray(drone_turns, dtype=np.float64) / (capacity * turns)
+        )
+
+
+class Congestion():
+    """
+    Per-node load of a planned schedule.
+
+    Reservation timelines are flattened into interval arrays, so every
+    node is summed at once: drone-turns, turns spent at capacity and
+    peak drone count.
+    """
+    def __init__(self, m: "Map") -> None:
+        """
+        Sum the reservations of a map.
+
+        Parameters
+        ----------
+        m
+            Map whose routes are reserved.
+        """
+        self.map: "Map" = m
+        size: int = len(m.nodes)
+        horizon: int = m.turn_count
+        self.capacity: IntArray = np.array(
+            [n.max_drones for n in m.nodes], dtype=np.int64
+        )
+
+        ids, starts, counts = m.context.reserved.intervals()
+        # an interval ends where the next one of its node starts
+        ends: IntArray = np.full(len(starts), horizon, dtype=np.int64)
+        if len(starts) > 1:
+            same: npt.NDArray[np.bool_] = ids[1:] == ids[:-1]
+            ends[:-1][same] = starts[1:][same]
+        spans: IntArray = np.clip(
+            np.minimum(ends, horizon) - np.minimum(starts, horizon), 0, None
+        )
+
+        self.drone_turns: FloatArray = np.bincount(
+            ids, weights=counts * spans, minlength=size
+        ).astype(np.float64)
+        # nodes without capacity are never counted as saturated
+        full: npt.NDArray[np.bool_] = counts >= np.maximum(
+            self.capacity[ids], 1
+        )
+        self.saturated: FloatArray = np.bincount(
+            ids, weights=spans * full, minlength=size
+        ).astype(np.float64)
+        self.peak: IntArray = np.zeros(size, dtype=np.int64)
+        np.maximum.at(self.peak, ids, counts)
+        # count lookups, see LayeredSearch.table
+        self.table: Table = (
+            (ids << TURN_BITS) | np.minimum(starts, (1 << TURN_BITS) - 1),
+            counts
+        )
+
+        turns: float = float(max(horizon, 1))
+        self.utilization: FloatArray = utilization(m, self.drone_turns)
+        # share of the turns spent at capacity
+        self.saturation: FloatArray = self.saturated / turns
+
+    def delays(self, routes: Iterable[Route]) -> tuple[IntArray, IntArray]:
+        """
+        Blame waiting turns on the nodes that caused them.
+
+        A drone waits on the start hub before its departure, and on a hub
+        it stays on for more than one turn. The rest of its route is then
+        shifted one turn back, and the first node, or crossed connection,
+        that was full at its shifted entry turn is blamed. Hops of every
+        route are flattened, so all of them are checked at once.
+
+        Parameters
+        ----------
+        routes
+            Route of each drone.
+
+        Returns
+        -------
+        tuple[IntArray, IntArray]
+            Drones delayed and waiting turns caused, indexed by node id.
+        """
+        m: "Map" = self.map
+        assert m.start_hub is not None
+
+        size: int = len(m.nodes)
+        drones: IntArray = np.zeros(size, dtype=np.int64)
+        turns: IntArray = np.zeros(size, dtype=np.int64)
+        kept: list[Route] = [route for route in routes if route.hops]
+        total: int = sum(len(route.hops) for route in kept)
+        if total == 0:
+            return drones, turns
+
+        nodes: IntArray = np.fromiter(
+            (node.id for route in kept for node, _ in route.hops),
+            dtype=np.int64, count=total
+        )
+        entries: IntArray = np.fromiter(
+            (turn for route in kept for turn in route.turns),
+            dtype=np.int64, count=total
+        )
+        dwells: IntArray = np.fromiter(
+            (dwell for route in kept for _, dwell in route.hops),
+            dtype=np.int64, count=total
+        )
+        departures: IntArray = np.array(
+            [route.departure for route in kept], dtype=np.int64
+        )
+        lengths: IntArray = np.array(
+            [len(route.hops) for route in kept], dtype=np.int64
+        )
+        ends: IntArray = np.cumsum(lengths)
+        firsts: IntArray = ends - lengths
+        owner: IntArray = np.repeat(np.arange(len(kept)), lengths)
+        prev: IntArray = np.empty_like(nodes)
+        prev[0] = m.start_hub.id
+        prev[1:] = nodes[:-1]
+        prev[firsts] = m.start_hub.id
+
+        # hub to hub moves cross the first connection between them, as
+        # Map.get_connection finds it, among those of the hubs entered;
+        # the -1 sentinel matches no pair and keeps lookups in bounds
+        nb_hubs: int = len(m.hubs)
+        entered: list[Hub | Connection] = [
+            m.nodes[i] for i in np.unique(nodes[nodes < nb_hubs]).tolist()
+        ]
+        linked: list[Connection] = sorted({
+            c for hub in entered if isinstance(hub, Hub) for c in hub.linked
+        }, key=lambda c: c.id)
+        keys, first_ids = np.unique(np.array(
+            [-1] + [
+                min(a.id, b.id) * size + max(a.id, b.id)
+                for a, b in (c.linked for c in linked)
+            ],
+            dtype=np.int64
+        ), return_index=True)
+        conn_ids: IntArray = np.array(
+            [-1] + [c.id for c in linked], dtype=np.int64
+        )[first_ids]
+        pair: IntArray = np.minimum(prev, nodes) * size + np.maximum(
+            prev, nodes
+        )
+        found: IntArray = np.minimum(
+            np.searchsorted(keys, pair), len(keys) - 1
+        )
+        crossed: BoolArray = (
+            (prev < nb_hubs) & (nodes < nb_hubs) & (keys[found] == pair)
+        )
+        conns: IntArray = np.where(crossed, conn_ids[found], 0)
+
+        # what is full the turn before each hop is entered, see
+        # Map.is_node_valid, routes never enter blocked hubs
+        conn_full: BoolArray = crossed & (
+            LayeredSearch.count(self.table, conns, entries - 1)
+            >= self.capacity[conns]
+        )
+        node_full: BoolArray = LayeredSearch.count(
+            self.table, nodes, entries - 1
+        ) >= self.capacity[nodes]
+        blame: IntArray = np.where(
+            conn_full, conns, np.where(node_full, nodes, -1)
+        )
+        # first blamed hop from each hop on, past the route if none
+        hops: IntArray = np.arange(total)
+        nearest: IntArray = np.minimum.accumulate(
+            np.where(blame >= 0, hops, total)[::-1]
+        )[::-1]
+
+        # hop waited for and waiting turns: the first hop after leaving
+        # late, the hop after a hub stayed on
+        late: BoolArray = departures > 0
+        stay: BoolArray = (nodes < nb_hubs) & (dwells > 1)
+        stay[ends - 1] = False
+        waited: IntArray = np.concatenate((
+            firsts[late], hops[stay] + 1
+        ))
+        waits: IntArray = np.concatenate((
+            departures[late], dwells[stay] - 1
+        ))
+        blamed: IntArray = nearest[waited]
+        inside: BoolArray = blamed < ends[owner[waited]]
+        culprits: IntArray = blame[blamed[inside]]
+        np.add.at(turns, culprits, waits[inside])
+        # a drone is delayed once by each node it blames
+        delayed: IntArray = np.unique(
+            owner[waited[inside]] * size + culprits
+        )
+        np.add.at(drones, delayed % size, 1)
+        return drones, turns
+
+    def report(
+        self, routes: Iterable[Route], top: int = TOP
+    ) -> dict[str, Any]:
+        """
+        Build a congestion report.
+
+        Parameters
+        ----------
+        routes
+            Route of each drone.
+        top
+            Number of bottlenecks to list.
+
+        Returns
+        -------
+        dict[str, Any]
+            JSON-ready report: start hub queueing, per-node load and the
+            nodes delaying the most drones.
+        """
+        m: "Map" = self.map
+        assert m.start_hub is not None
+        assert m.end_hub is not None
+
+        routes = list(routes)
+        departures: IntArray = np.array(
+            [r.departure for r in routes], dtype=np.int64
+        )
+        delayed, delay_turns = self.delays(routes)
+
+        def describe(n: Hub | Connection) -> dict[str, Any]:
+            return {
+                "name": n.name,
+                "kind": "hub" if isinstance(n, Hub) else "connection",
+                "capacity": int(self.capacity[n.id]),
+                "peak": int(self.peak[n.id]),
+                "utilization": round(float(self.utilization[n.id]), 4),
+                "saturation": round(float(self.saturation[n.id]), 4),
+            }
+
+        # terminals have no capacity limit, unused nodes are left out
+        nodes: list[Hub | Connection] = [
+            n for n in m.nodes
+            if self.drone_turns[n.id] > 0
+            and n is not m.start_hub and n is not m.end_hub
+        ]
+        order: IntArray = np.lexsort((
+            -self.saturation, -delayed, -delay_turns
+        ))
+        bottlenecks: list[dict[str, Any]] = [
+            describe(m.nodes[i]) | {
+                "drones_delayed": int(delayed[i]),
+                "delay_turns": int(delay_turns[i]),
+            }
+            for i in order[:top] if delay_turns[i] > 0
+        ]
+        return {
+            "turn_count": m.turn_count,
+            "nb_drones": len(routes),
+            "start_queue": {
+                "drones_waiting": int((departures > 0).sum()),
+                "total_turns": int(departures.sum()),
+                "mean_turns": round(
+                    float(departures.mean()) if len(routes) else 0.0, 4
+                ),
+                "max_turns": int(departures.max()) if len(routes) else 0,
+            },
+            "bottlenecks": bottlenecks,
+            "nodes": [describe(n) for n in nodes],
+        }
+
+
+def write_report(
+    path: str, m: "Map", routes: Iterable[Route], top: int = TOP
+) -> None:
+    """
+    Write the congestion report of a schedule as JSON.
+
+    Parameters
+    ----------
+    path
+        Output file.
+    m
+        Map whose routes are reserved.
+    routes
+        Route of each drone.
+    top
+        Number of bottlenecks to list.
+
+    Raises
+    ------
+    OSError:
+        Raised when the file cannot be written.
+    """
+    with open(path, "w") as f:
+        json.dump(Congestion(m).report(routes, top), f, indent=2)
+        f.write("\n")
@@ -0,0 +1,222 @@
+import heapq
+from math import isqrt
+from typing import TYPE_CHECKING
+
+from src.logic import Hub, Connection
+from src.logic.timeline import FOREVER
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+# average number of hubs per cluster
+CLUSTER_HUBS: int = 256
+
+# grid cell of a cluster
+Cell = tuple[int, int]
+# hub reached, turns to reach it, and the connection crossed between
+# two clusters, None inside a cluster
+Edge = tuple[Hub, int, Connection | None]
+
+
+def cluster_side(hubs: list[Hub]) -> int:
+    """
+    Pick the side of the square cells hubs are grouped by.
+
+    Parameters
+    ----------
+    hubs
+        Hubs to group.
+
+    Returns
+    -------
+    int
+        Side in grid units, so that a cell holds about CLUSTER_HUBS hubs
+        when hubs are spread evenly over their bounding box.
+    """
+    xs: list[int] = [int(h.x) for h in hubs]
+    ys: list[int] = [int(h.y) for h in hubs]
+    area: int = (max(xs) - min(xs) + 1) * (max(ys) - min(ys) + 1)
+    return max(isqrt(area * CLUSTER_HUBS // len(hubs)), 1)
+
+
+class Clusters():
+    """
+    Abstract graph of a map grouped into square cells of hubs.
+
+    Entrances are the hubs linked to a hub of another cell, plus the
+    terminals. They are joined by the connections between cells, and by
+    the static distance between two entrances of the same cell, found
+    without leaving it the first time the search reaches one of them and
+    kept since. A route searched on this graph tells which cells a drone
+    goes through, and the drone is then planned on the hubs of those
+    cells only.
+    """
+    def __init__(self, m: "Map") -> None:
+        """
+        Group the active hubs of a map and link their entrances.
+
+        Parameters
+        ----------
+        m
+            Map to group, reduced.
+        """
+        assert m.start_hub is not None
+        assert m.end_hub is not None
+
+        hubs: list[Hub] = [n for n in m.active if isinstance(n, Hub)]
+        side: int = cluster_side(hubs)
+        # cells start at the bounding box corner
+        min_x: int = min(int(h.x) for h in hubs)
+        min_y: int = min(int(h.y) for h in hubs)
+        self.cell: dict[Hub, Cell] = {
+            h: ((int(h.x) - min_x) // side, (int(h.y) - min_y) // side)
+            for h in hubs
+        }
+        self.members: dict[Cell, set[Hub]] = {}
+        for h, cell in self.cell.items():
+            self.members.setdefault(cell, set()).add(h)
+
+        # connections between cells, by entrance
+        self.edges: dict[Hub, list[Edge]] = {}
+        self.entrances: dict[Cell, list[Hub]] = {}
+        for h in hubs:
+            for c in m.links[h]:
+                a, b = c.linked
+                dest: Hub = b if h is a else a
+                if self.cell[dest] != self.cell[h]:
+                    self.edges.setdefault(h, []).append((dest, dest.cost, c))
+            if h in self.edges or h is m.start_hub or h is m.end_hub:
+                self.entrances.setdefault(self.cell[h], []).append(h)
+                self.edges.setdefault(h, [])
+        # paths to the other entrances of the same cell, by entrance
+        self.inner: dict[Hub, list[Edge]] = {}
+
+    def neighbours(self, m: "Map", door: Hub) -> list[Edge]:
+        """
+        Get the abstract edges leaving an entrance.
+
+        Parameters
+        ----------
+        m
+            Map the clusters were built from.
+        door
+            Entrance to leave.
+
+        Returns
+        -------
+        list[Edge]
+            Connections to other cells, then other entrances of its cell.
+        """
+        if door not in self.inner:
+            dist: dict[Hub, int] = self.distances(m, door)
+            self.inner[door] = [
+                (other, dist[other], None)
+                for other in self.entrances[self.cell[door]]
+                if other is not door and other in dist
+            ]
+        return self.edges[door] + self.inner[door]
+
+    def distances(self, m: "Map", origin: Hub) -> dict[Hub, int]:
+        """
+        Compute static distances from a hub without leaving its cell.
+
+        Parameters
+        ----------
+        m
+            Map the clusters were built from.
+        origin
+            Hub to start from.
+
+        Returns
+        -------
+        dict[Hub, int]
+            Minimal number of turns to each reachable hub of the cell.
+        """
+        cell: Cell = self.cell[origin]
+        dist: dict[Hub, int] = {origin: 0}
+        heap: list[tuple[int, int, Hub]] = [(0, origin.id, origin)]
+        while heap:
+            d, _, hub = heapq.heappop(heap)
+            # the end hub is never left
+            if d > dist[hub] or (hub is m.end_hub and hub is not origin):
+                continue
+            for c in m.links[hub]:
+                a, b = c.linked
+                dest: Hub = b if hub is a else a
+                if self.cell.get(dest) != cell:
+                    continue
+                if dest not in dist or d + dest.cost < dist[dest]:
+                    dist[dest] = d + dest.cost
+                    heapq.heappush(heap, (d + dest.cost, dest.id, dest))
+        return dist
+
+    def corridor(self, m: "Map", start_turn: int) -> set[Hub] | None:
+        """
+        Find the hubs a drone leaving at a given turn is planned on.
+
+        The abstract graph is searched in A* order using distances_to_end
+        as heuristic. Crossing from one cell to another costs the wait
+        for its connection to be free at the estimated turn, so drones
+        spread over other cells once a border is congested.
+
+        Parameters
+        ----------
+        m
+            Map the clusters were built from, with its reservations.
+        start_turn
+            Last turn spent on the start hub.
+
+        Returns
+        -------
+        set[Hub] | None
+            Hubs of every cell the abstract route goes through, None if
+            it does not reach the end hub.
+        """
+        assert m.start_hub is not None
+        assert m.end_hub is not None
+
+        h: dict[Hub | Connection, int] = m.distances_to_end()
+        step: dict[Hub, int] = {m.start_hub: 0}
+        parent: dict[Hub, Hub] = {}
+        closed: set[Hub] = set()
+        # deepest first on ties, as many routes share the shortest length
+        heap: list[tuple[int, int, int, Hub]] = [
+            (h[m.start_hub], 0, m.start_hub.id, m.start_hub)
+        ]
+        while heap:
+            _, neg_g, _, hub = heapq.heappop(heap)
+            g: int = -neg_g
+            if hub in closed or g != step[hub]:
+                continue
+            closed.add(hub)
+            if hub is m.end_hub:
+                break
+            for dest, cost, c in self.neighbours(m, hub):
+                if dest in closed or dest not in h:
+                    continue
+                g_dest: int = g + cost
+                if c is not None:
+                    turn: int = start_turn + g + 1
+                    free: int = m.earliest_free(
+                        c, turn, max(dest.cost - 1, 1)
+                    )
+                    if free == FOREVER:
+                        continue
+                    g_dest += free - turn
+                if dest in step and step[dest] <= g_dest:
+                    continue
+                step[dest] = g_dest
+                parent[dest] = hub
+                heapq.heappush(
+                    heap, (g_dest + h[dest], -g_dest, dest.id, dest)
+                )
+
+        if m.end_hub not in closed:
+            return None
+        cells: set[Cell] = {self.cell[m.end_hub]}
+        hub = m.end_hub
+        while hub is not m.start_hub:
+            hub = parent[hub]
+            cells.add(self.cell[hub])
+        return set().union(*(self.members[cell] for cell in cells))
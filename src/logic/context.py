@@ -0,0 +1,38 @@
+from src.logic import Drone
+from src.logic.timeline import Timelines
+
+
+class SolveContext():
+    """
+    Per-solve state of a map: reservations, drone ids and turn count.
+
+    Hubs and connections only describe the topology, everything a solve
+    writes lives here, indexed by node id. Two solves sharing a topology
+    through Map.fork never see each other's reservations.
+    """
+    def __init__(self) -> None:
+        """
+        Create an empty SolveContext.
+        """
+        self.reserved: Timelines = Timelines()
+        # drones in transit on connections, hub to hub moves only use
+        # reserved
+        self.transit: Timelines = Timelines()
+        # sorted turns, standing for the start and end hub occupancy
+        self.departures: list[int] = []
+        self.arrivals: list[int] = []
+        self.turn_count: int = 0
+        self.next_id: int = 1
+
+    def new_drone(self) -> Drone:
+        """
+        Create a drone numbered after the previous one of this solve.
+
+        Returns
+        -------
+        Drone
+            New drone.
+        """
+        d: Drone = Drone(self.next_id)
+        self.next_id += 1
+        return d
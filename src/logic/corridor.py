@@ -0,0 +1,156 @@
+from typing import TYPE_CHECKING
+
+from src.logic import Hub, Connection
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+class Corridor():
+    """
+    Weighted edge between two hubs of the compressed graph.
+
+    Either a single connection, or a chain of normal hubs having exactly
+    two connections, collapsed into one super-edge.
+    """
+    def __init__(
+        self,
+        origin: Hub,
+        connections: list[Connection],
+        hubs: list[Hub],
+        dest: Hub
+    ) -> None:
+        """
+        Create a Corridor.
+
+        Parameters
+        ----------
+        origin
+            Hub the corridor leaves from.
+        connections
+            Connections crossed, in travel order.
+        hubs
+            Chain hubs crossed, one less than connections.
+        dest
+            Hub the corridor leads to.
+        """
+        self.origin: Hub = origin
+        self.dest: Hub = dest
+        self.connections: list[Connection] = connections
+        self.hubs: list[Hub] = hubs
+
+        # turns from origin to dest, entering dest takes its cost
+        self.length: int = len(hubs) + dest.cost
+
+    def nodes(self) -> list[Hub | Connection]:
+        """
+        Expand the corridor into per-turn nodes.
+
+        Returns
+        -------
+        list[Hub | Connection]
+            Node occupied on each turn after leaving origin.
+        """
+        nodes: list[Hub | Connection] = list(self.hubs)
+        nodes.extend([self.connections[-1]] * (self.dest.cost - 1))
+        nodes.append(self.dest)
+        return nodes
+
+    def is_free(self, m: "Map", turn: int) -> bool:
+        """
+        Check if the corridor can be crossed without waiting.
+
+        Parameters
+        ----------
+        m
+            Map holding the reservations.
+        turn
+            Last turn spent on origin.
+
+        Returns
+        -------
+        bool
+            True if every step is available on time.
+        """
+        for i, h in enumerate(self.hubs, start=1):
+            if not (
+                m.is_node_valid(self.connections[i - 1], turn + i)
+                and m.is_node_valid(h, turn + i)
+            ):
+                return False
+        turn += len(self.hubs) + 1
+        if m.earliest_free(
+            self.connections[-1], turn, max(self.dest.cost - 1, 1)
+        ) != turn:
+            return False
+        return m.is_node_valid(self.dest, turn + self.dest.cost - 1)
+
+
+def is_chain_hub(m: "Map", h: Hub) -> bool:
+    """
+    Check if a hub can be collapsed into a corridor.
+
+    Parameters
+    ----------
+    m
+        Map the hub belongs to.
+    h
+        Hub to check.
+
+    Returns
+    -------
+    bool
+        True for normal hubs of cost 1, other than start and end, with
+        exactly two connections to two different hubs.
+    """
+    if h is m.start_hub or h is m.end_hub or h.zone != "normal":
+        return False
+    if h.cost != 1:
+        return False
+    if len(m.links[h]) != 2:
+        return False
+    ends: set[int] = {
+        x.id for c in m.links[h] for x in c.linked if x is not h
+    }
+    return len(ends) == 2
+
+
+def compress(m: "Map") -> dict[Hub, list[Corridor]]:
+    """
+    Collapse chains of degree-2 normal hubs into corridors.
+
+    Parameters
+    ----------
+    m
+        Map to compress, after Map.reduce.
+
+    Returns
+    -------
+    dict[Hub, list[Corridor]]
+        Corridors leaving each remaining hub, in both directions.
+    """
+    chain: set[Hub] = {h for h in m.hubs.values() if is_chain_hub(m, h)}
+    corridors: dict[Hub, list[Corridor]] = {}
+    for origin in m.hubs.values():
+        if origin in chain or origin not in m.active:
+            continue
+        corridors[origin] = []
+        for c in m.links[origin]:
+            connections: list[Connection] = [c]
+            hubs: list[Hub] = []
+            a, b = c.linked
+            node: Hub = b if a is origin else a
+            while node in chain:
+                hubs.append(node)
+                link: Connection = next(
+                    x for x in m.links[node] if x is not connections[-1]
+                )
+                connections.append(link)
+                a, b = link.linked
+                node = b if a is node else a
+            # a chain looping back on its origin is never on a simple route
+            if node is not origin:
+                corridors[origin].append(
+                    Corridor(origin, connections, hubs, node)
+                )
+    return corridors
@@ -1,19 +1,14 @@
 class Drone():
     """
-    Simple drone model with an auto-incremented id.
-
-    Attributes
-    ----------
-    max_registered_id
-        Class-level counter for assigning new ids.
+    Simple drone model, numbered by the solve it belongs to.
     """
-    max_registered_id: int = 1
-
-    def __init__(self) -> None:
+    def __init__(self, drone_id: int) -> None:
         """
         Create a new Drone.
 
-        Assign a unique id and increment the class counter.
+        Parameters
+        ----------
+        drone_id
+            Drone number, unique within a solve.
         """
-        self.id: int = Drone.max_registered_id
-        Drone.max_registered_id += 1
+        self.id: int = drone_id
@@ -0,0 +1,224 @@
+from typing import TYPE_CHECKING
+from collections import deque
+
+from src.logic import Hub, Connection
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+class FlowGraph():
+    """
+    Residual graph used by the min-cost flow.
+
+    Each hub is split into an in and an out vertex so that its max_drones
+    becomes an arc capacity.
+    """
+    def __init__(self, size: int) -> None:
+        """
+        Create an empty residual graph.
+
+        Parameters
+        ----------
+        size
+            Number of vertices.
+        """
+        # arc i and arc i ^ 1 are the forward and reverse arcs of a pair
+        self.to: list[int] = []
+        self.cap: list[int] = []
+        self.cost: list[int] = []
+        self.adj: list[list[int]] = [[] for _ in range(size)]
+        self.connection: list[Connection | None] = []
+
+    def add_arc(
+        self, u: int, v: int, cap: int, cost: int, c: Connection | None
+    ) -> None:
+        """
+        Add an arc and its reverse arc.
+
+        Parameters
+        ----------
+        u
+            Tail vertex.
+        v
+            Head vertex.
+        cap
+            Arc capacity.
+        cost
+            Cost per unit of flow.
+        c
+            Connection the arc stands for, if any.
+        """
+        for tail, head, arc_cap, arc_cost in (
+            (u, v, cap, cost), (v, u, 0, -cost)
+        ):
+            self.adj[tail].append(len(self.to))
+            self.to.append(head)
+            self.cap.append(arc_cap)
+            self.cost.append(arc_cost)
+            self.connection.append(c)
+
+    def shortest_path(self, source: int, sink: int) -> list[int] | None:
+        """
+        Find the cheapest augmenting path.
+
+        Run SPFA since reverse arcs carry negative costs.
+
+        Parameters
+        ----------
+        source
+            Source vertex.
+        sink
+            Sink vertex.
+
+        Returns
+        -------
+        list[int] | None
+            Arcs of the path from source to sink, or None if the sink
+            cannot be reached.
+        """
+        size: int = len(self.adj)
+        dist: list[float] = [float("inf")] * size
+        via: list[int] = [-1] * size
+        queued: list[bool] = [False] * size
+        dist[source] = 0
+        queue: deque[int] = deque([source])
+        while queue:
+            u: int = queue.popleft()
+            queued[u] = False
+            for arc in self.adj[u]:
+                v: int = self.to[arc]
+                if self.cap[arc] > 0 and dist[u] + self.cost[arc] < dist[v]:
+                    dist[v] = dist[u] + self.cost[arc]
+                    via[v] = arc
+                    if not queued[v]:
+                        queued[v] = True
+                        queue.append(v)
+
+        if via[sink] == -1:
+            return None
+        arcs: list[int] = []
+        v = sink
+        while v != source:
+            arcs.append(via[v])
+            v = self.to[via[v] ^ 1]
+        arcs.reverse()
+        return arcs
+
+
+def min_cost_flow(
+    m: "Map", period: int | None = None
+) -> list[tuple[list[Hub | Connection], int]]:
+    """
+    Compute a min-cost flow between start and end, split into routes.
+
+    Send up to nb_drones units of flow per turn through the static graph,
+    hub and connection capacities being per-turn capacities, then
+    decompose the flow into start to end routes.
+
+    With a period, capacities are counted over period turns instead: a
+    hub holds max_drones * period drones, and a connection held k turns
+    by each drone max_link_capacity * period // k drones.
+
+    Parameters
+    ----------
+    m
+        Map to route on.
+    period
+        Turns the flow is counted over, if it is repeated.
+
+    Returns
+    -------
+    list[tuple[list[Hub | Connection], int]]
+        Routes from the start hub to the end hub, with the connection
+        repeated before each hub costing more than 1 turn, once per extra
+        turn, and the flow each one carries per turn, cheapest first.
+    """
+    assert m.start_hub is not None
+    assert m.end_hub is not None
+
+    hubs: list[Hub] = list(m.hubs.values())
+    g: FlowGraph = FlowGraph(2 * len(m.nodes))
+
+    # hub h: in vertex 2 * h.id, out vertex 2 * h.id + 1
+    for h in hubs:
+        if h.zone != "blocked" and h in m.active:
+            g.add_arc(
+                2 * h.id, 2 * h.id + 1, h.max_drones * (period or 1), 0, None
+            )
+    for c in m.connections:
+        a, b = c.linked
+        if c.max_drones <= 0 or a is b or c not in m.active:
+            continue
+        for tail, head in ((a, b), (b, a)):
+            if head.zone == "blocked":
+                continue
+            cap: int = c.max_drones
+            if period is not None:
+                cap = cap * period // max(head.cost - 1, 1)
+            g.add_arc(2 * tail.id + 1, 2 * head.id, cap, head.cost, c)
+
+    source: int = 2 * m.start_hub.id + 1
+    sink: int = 2 * m.end_hub.id
+    remaining: int = m.nb_drones
+    while remaining > 0:
+        augmenting: list[int] | None = g.shortest_path(source, sink)
+        if augmenting is None:
+            break
+        amount: int = min([remaining] + [g.cap[arc] for arc in augmenting])
+        for arc in augmenting:
+            g.cap[arc] -= amount
+            g.cap[arc ^ 1] += amount
+        remaining -= amount
+
+    # flow on a forward arc is the capacity moved to its reverse arc
+    flow: list[int] = [
+        g.cap[arc ^ 1] if arc % 2 == 0 else 0 for arc in range(len(g.to))
+    ]
+    routes: list[tuple[list[Hub | Connection], int]] = []
+    while True:
+        vertex: int = source
+        arcs: list[int] = []
+        while vertex != sink and len(arcs) < len(g.to):
+            used: list[int] = [
+                arc for arc in g.adj[vertex] if arc % 2 == 0 and flow[arc] > 0
+            ]
+            if not used:
+                break
+            arcs.append(used[0])
+            vertex = g.to[used[0]]
+        if vertex != sink or not arcs:
+            break
+        amount = min(flow[arc] for arc in arcs)
+        for arc in arcs:
+            flow[arc] -= amount
+
+        route: list[Hub | Connection] = [m.start_hub]
+        for arc in arcs:
+            link: Connection | None = g.connection[arc]
+            if link is None:
+                continue
+            dest: Hub = hubs[g.to[arc] // 2]
+            route.extend([link] * (dest.cost - 1))
+            route.append(dest)
+        routes.append((route, amount))
+
+    routes.sort(key=lambda r: len(r[0]))
+    return routes
+
+
+def min_cost_routes(m: "Map") -> list[list[Hub | Connection]]:
+    """
+    Compute routes from a min-cost flow between start and end.
+
+    Parameters
+    ----------
+    m
+        Map to route on.
+
+    Returns
+    -------
+    list[list[Hub | Connection]]
+        Routes of min_cost_flow, cheapest first.
+    """
+    return [route for route, _ in min_cost_flow(m)]
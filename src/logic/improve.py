@@ -0,0 +1,219 @@
+import time
+import random
+import logging
+from typing import TYPE_CHECKING, Callable, Iterator
+
+from src.logic import Drone, Hub, Connection
+from src.logic.route import Route
+from src.logic.analytics import Congestion, TOP
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# seconds spent improving a schedule by default
+BUDGET: float = 5
+# drones removed and planned again at each step
+NEIGHBOURHOOD: int = 8
+# planner used to plan drones again, for strategies planning every drone
+# at once
+FALLBACK: dict[str, str] = {"windowed": "sipp"}
+
+
+class Improver():
+    """
+    Anytime large neighbourhood search (LNS) over a planned schedule.
+
+    Each step removes a few drones from the reservations, either among
+    the last ones to arrive, among those going through one of the most
+    saturated nodes, or at random, and plans them again one after the
+    other, in a random order, around the others. The new routes are kept
+    if the schedule is not longer, compared by turn count then by total
+    of arrival turns, and the old ones are reserved again otherwise. The
+    current schedule is always the best one found, so the search can be
+    stopped at any time.
+    """
+    def __init__(
+        self,
+        m: "Map",
+        drones: list[Drone],
+        routes: dict[Drone, Route],
+        strategy: str = "bfs",
+        seed: int = 0
+    ) -> None:
+        """
+        Prepare the improvement of a schedule.
+
+        Parameters
+        ----------
+        m
+            Map the routes are reserved on, planned with strategy.
+        drones
+            Planned drones.
+        routes
+            Route of each drone, replaced in place by improvements.
+        strategy
+            Planning strategy of the schedule, one of STRATEGIES.
+        seed
+            Seed of the neighbourhood choices.
+        """
+        self.map: "Map" = m
+        self.drones: list[Drone] = drones
+        self.routes: dict[Drone, Route] = routes
+        self.planner: Callable[[Drone], Route] = m.planners()[
+            FALLBACK.get(strategy, strategy)
+        ]
+        self.random: random.Random = random.Random(seed)
+        self.lower_bound: int = m.lower_bound()
+        # best schedule so far, which is the current one
+        self.turn_count: int = max(len(r) for r in routes.values())
+        self.total: int = sum(r.arrival for r in routes.values())
+        m.turn_count = self.turn_count
+        self.hot: list[Hub | Connection] = self.hot_nodes()
+
+    def hot_nodes(self) -> list[Hub | Connection]:
+        """
+        Find the nodes spending the most turns at capacity.
+
+        Returns
+        -------
+        list[Hub | Connection]
+            Up to TOP saturated nodes, terminals excluded, most saturated
+            first.
+        """
+        m: "Map" = self.map
+        saturated: list[float] = Congestion(m).saturated.tolist()
+        nodes: list[Hub | Connection] = [
+            n for n in m.nodes
+            if saturated[n.id] > 0
+            and n is not m.start_hub and n is not m.end_hub
+        ]
+        nodes.sort(key=lambda n: -saturated[n.id])
+        return nodes[:TOP]
+
+    def neighbourhood(self) -> list[Drone]:
+        """
+        Pick the drones to plan again.
+
+        Returns
+        -------
+        list[Drone]
+            Up to NEIGHBOURHOOD drones, in a random order.
+        """
+        size: int = min(NEIGHBOURHOOD, len(self.drones))
+        kind: int = self.random.randrange(3 if self.hot else 2)
+        pool: list[Drone]
+        if kind == 0:
+            # the last ones to arrive, a few more to vary the steps
+            pool = sorted(
+                self.drones, key=lambda d: -self.routes[d].arrival
+            )[:2 * size]
+        elif kind == 1:
+            pool = self.drones
+        else:
+            node: Hub | Connection = self.random.choice(self.hot)
+            pool = [
+                d for d in self.drones if self.uses(self.routes[d], node)
+            ]
+        return self.random.sample(pool, min(size, len(pool)))
+
+    def uses(self, route: Route, node: Hub | Connection) -> bool:
+        """
+        Check if a route goes through a node.
+
+        Parameters
+        ----------
+        route
+            Route of a drone.
+        node
+            Hub or connection.
+
+        Returns
+        -------
+        bool
+            True if the route enters node, or crosses it from hub to hub.
+        """
+        prev: Hub | Connection = route.start
+        for n, _ in route.hops:
+            if n is node or (
+                isinstance(prev, Hub) and isinstance(n, Hub)
+                and self.map.get_connection(prev, n) is node
+            ):
+                return True
+            prev = n
+        return False
+
+    def step(self) -> list[tuple[Drone, Route]]:
+        """
+        Plan a neighbourhood again and keep it if it is not worse.
+
+        Returns
+        -------
+        list[tuple[Drone, Route]]
+            New route of each drone planned again, empty if the old
+            routes were kept.
+        """
+        m: "Map" = self.map
+        removed: list[Drone] = self.neighbourhood()
+        old: dict[Drone, Route] = {d: self.routes[d] for d in removed}
+        for d in removed:
+            m.release_path(d, old[d])
+        for d in removed:
+            self.routes[d] = self.planner(d)
+            m.reserve_path(d, self.routes[d])
+
+        turn_count: int = max(len(r) for r in self.routes.values())
+        total: int = sum(r.arrival for r in self.routes.values())
+        if (turn_count, total) > (self.turn_count, self.total):
+            for d in removed:
+                m.release_path(d, self.routes[d])
+                m.reserve_path(d, old[d])
+                self.routes[d] = old[d]
+            return []
+
+        if turn_count < self.turn_count:
+            logger.info(f"schedule improved to {turn_count} turns")
+            m.turn_count = turn_count
+            self.hot = self.hot_nodes()
+        self.turn_count = turn_count
+        self.total = total
+        return [(d, self.routes[d]) for d in removed]
+
+    def improve_iter(
+        self, budget: float = BUDGET
+    ) -> Iterator[tuple[Drone, Route]]:
+        """
+        Improve the schedule until the budget expires.
+
+        The search also stops once the turn count reaches the map lower
+        bound.
+
+        Parameters
+        ----------
+        budget
+            Time budget in seconds.
+
+        Yields
+        ------
+        tuple[Drone, Route]
+            Drone and its new route, each time a step is kept.
+        """
+        end_time: float = time.monotonic() + budget
+        while (
+            time.monotonic() < end_time
+            and self.turn_count > self.lower_bound
+        ):
+            yield from self.step()
+
+    def improve(self, budget: float = BUDGET) -> None:
+        """
+        Improve the schedule until the budget expires.
+
+        Parameters
+        ----------
+        budget
+            Time budget in seconds.
+        """
+        for _ in self.improve_iter(budget):
+            continue
@@ -0,0 +1,351 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+
+from src.logic import Hub, Connection
+from src.logic.timeline import FOREVER
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+IntArray = npt.NDArray[np.int64]
+BoolArray = npt.NDArray[np.bool_]
+# interval keys of every reserved node, and the drone count of each
+Table = tuple[IntArray, IntArray]
+
+# turns are packed below the node id in interval keys
+TURN_BITS: int = 32
+
+
+class LayeredSearch():
+    """
+    Level-synchronous version of the bucket queue search of bfs.
+
+    The reduced graph is compiled into adjacency arrays, and each bucket
+    of hubs reached after the same number of turns is expanded at once:
+    moves of the whole layer are gathered from the arrays, checked
+    against the reservations with NumPy masks, and the best parent of
+    each hub reached is kept with the same (turns, -priority) order and
+    the same ties as bfs, so routes are the same. Each call costs a few
+    array operations per layer instead of a few dict lookups per move,
+    which pays off once layers hold thousands of hubs.
+    """
+    def __init__(
+        self, m: "Map", graph: dict[str, IntArray] | None = None
+    ) -> None:
+        """
+        Prepare the search of a map.
+
+        Parameters
+        ----------
+        m
+            Map to search, reduced first.
+        graph
+            Arrays of the reduced graph as given by compile, such as views
+            of a shared map, compiled from m if None.
+        """
+        assert m.start_hub is not None
+        assert m.end_hub is not None
+
+        if graph is None:
+            graph = self.compile(m)
+        self.nodes: list[Hub | Connection] = m.nodes
+        self.start: int = m.start_hub.id
+        self.end: int = m.end_hub.id
+        self.size: int = len(m.hubs)
+        self.offsets: IntArray = graph["offsets"]
+        self.conn: IntArray = graph["conn"]
+        self.dest: IntArray = graph["dest"]
+        self.cost: IntArray = graph["cost"]
+        # turns the connection is held, crossed on arrival at cost 1
+        self.hold: IntArray = np.maximum(self.cost - 1, 1)
+        self.bonus: IntArray = graph["bonus"]
+        self.capacity: IntArray = graph["capacity"]
+
+    @staticmethod
+    def compile(m: "Map") -> dict[str, IntArray]:
+        """
+        Compile the reduced graph of a map into adjacency arrays.
+
+        Parameters
+        ----------
+        m
+            Map to compile, reduced first.
+
+        Returns
+        -------
+        dict[str, IntArray]
+            Moves leaving each hub from offsets[id] to offsets[id + 1], as
+            the conn crossed, the dest hub, its cost and its priority
+            bonus, then the capacity of every node by id.
+        """
+        m.reduce()
+        hubs: list[Hub] = list(m.hubs.values())
+        offsets: IntArray = np.zeros(len(hubs) + 1, dtype=np.int64)
+        np.cumsum([len(m.links[h]) for h in hubs], out=offsets[1:])
+        conns: list[Connection] = [c for h in hubs for c in m.links[h]]
+        dests: list[Hub] = [
+            c.linked[1] if c.linked[0] is h else c.linked[0]
+            for h in hubs for c in m.links[h]
+        ]
+        return {
+            "offsets": offsets,
+            "conn": np.array([c.id for c in conns], dtype=np.int64),
+            "dest": np.array([d.id for d in dests], dtype=np.int64),
+            "cost": np.array([d.cost for d in dests], dtype=np.int64),
+            "bonus": np.array(
+                [d.zone == "priority" for d in dests], dtype=np.int64
+            ),
+            # blocked hubs never hold a drone
+            "capacity": np.array([
+                0 if isinstance(n, Hub) and n.zone == "blocked"
+                else n.max_drones
+                for n in m.nodes
+            ], dtype=np.int64),
+        }
+
+    @staticmethod
+    def table(m: "Map") -> Table:
+        """
+        Flatten the reservations of a map for count lookups.
+
+        Parameters
+        ----------
+        m
+            Map whose reservations are read.
+
+        Returns
+        -------
+        Table
+            Sorted keys of every interval, node id above TURN_BITS bits
+            of start turn, and the drone count of each.
+        """
+        ids, starts, counts = m.context.reserved.intervals()
+        # starts past the turn bits are never looked up
+        limit: int = (1 << TURN_BITS) - 1
+        return (ids << TURN_BITS) | np.minimum(starts, limit), counts
+
+    @staticmethod
+    def count(table: Table, nodes: IntArray, turns: IntArray) -> IntArray:
+        """
+        Look up drone counts of several nodes at once.
+
+        Parameters
+        ----------
+        table
+            Reservations, see table.
+        nodes
+            Node ids.
+        turns
+            Turn of each lookup.
+
+        Returns
+        -------
+        IntArray
+            Drones reserved on each node at its turn.
+        """
+        keys, counts = table
+        if not len(keys):
+            return np.zeros(len(nodes), dtype=np.int64)
+        queries: IntArray = (nodes << TURN_BITS) | turns
+        i: IntArray = np.searchsorted(keys, queries, side="right") - 1
+        # before the first interval of the node, nothing is reserved
+        found: BoolArray = i >= 0
+        found[found] = (keys[i[found]] >> TURN_BITS) == nodes[found]
+        return np.where(found, counts[np.maximum(i, 0)], 0)
+
+    def search(
+        self, table: Table, start_turn: int
+    ) -> dict[Hub, tuple[Hub, Connection]] | None:
+        """
+        Search a route leaving the start hub at a given turn.
+
+        Parameters
+        ----------
+        table
+            Reservations, see table.
+        start_turn
+            Last turn spent on the start hub.
+
+        Returns
+        -------
+        dict[Hub, tuple[Hub, Connection]] | None
+            Previous hub and connection of each hub on the route, None if
+            the end hub can't be reached leaving at start_turn.
+        """
+        step: IntArray = np.full(self.size, FOREVER, dtype=np.int64)
+        priority: IntArray = np.zeros(self.size, dtype=np.int64)
+        parent: IntArray = np.full(self.size, -1, dtype=np.int64)
+        step[self.start] = 0
+        # buckets[g]: chunks of hubs reached g turns after leaving
+        buckets: list[list[IntArray]] = [
+            [np.array([self.start], dtype=np.int64)]
+        ]
+
+        g: int = 0
+        while g < min(len(buckets), int(step[self.end])):
+            if not buckets[g]:
+                g += 1
+                continue
+            layer: IntArray = np.concatenate(buckets[g])
+            # stale, reached earlier through another hub
+            layer = layer[step[layer] == g]
+            if len(layer):
+                self.expand(
+                    table, layer, start_turn + g + 1, g,
+                    step, priority, parent, buckets
+                )
+            g += 1
+
+        if step[self.end] == FOREVER:
+            return None
+        parents: dict[Hub, tuple[Hub, Connection]] = {}
+        hub: int = self.end
+        while hub != self.start:
+            arc: int = int(parent[hub])
+            prev: Hub | Connection = self.nodes[self.source(arc)]
+            dest: Hub | Connection = self.nodes[hub]
+            c: Hub | Connection = self.nodes[int(self.conn[arc])]
+            assert isinstance(prev, Hub) and isinstance(dest, Hub)
+            assert isinstance(c, Connection)
+            parents[dest] = (prev, c)
+            hub = prev.id
+        return parents
+
+    def source(self, arc: int) -> int:
+        """
+        Get the hub a move leaves.
+
+        Parameters
+        ----------
+        arc
+            Index of the move in the adjacency arrays.
+
+        Returns
+        -------
+        int
+            Id of the hub.
+        """
+        return int(np.searchsorted(self.offsets, arc, side="right")) - 1
+
+    def expand(
+        self,
+        table: Table,
+        layer: IntArray,
+        turn: int,
+        g: int,
+        step: IntArray,
+        priority: IntArray,
+        parent: IntArray,
+        buckets: list[list[IntArray]]
+    ) -> None:
+        """
+        Expand every hub of a layer at once.
+
+        Parameters
+        ----------
+        table
+            Reservations, see table.
+        layer
+            Hubs reached g turns after leaving the start hub.
+        turn
+            First turn after leaving the layer.
+        g
+            Turns from leaving the start hub to the layer.
+        step
+            Turns to reach each hub, updated.
+        priority
+            Priority hubs on the way to each hub, updated.
+        parent
+            Move reaching each hub, updated.
+        buckets
+            Hubs by turns to reach them, extended.
+        """
+        # moves of the whole layer, in hub then link order
+        first: IntArray = self.offsets[layer]
+        lengths: IntArray = self.offsets[layer + 1] - first
+        ends: IntArray = np.cumsum(lengths)
+        arcs: IntArray = np.arange(int(ends[-1])) + np.repeat(
+            first - ends + lengths, lengths
+        )
+        src: IntArray = np.repeat(layer, lengths)
+
+        # the hub entered has room on arrival, see Map.moves
+        dest: IntArray = self.dest[arcs]
+        valid: BoolArray = self.count(
+            table, dest, turn + self.cost[arcs] - 1
+        ) < self.capacity[dest]
+        # and the connection for every turn it is held
+        hold: IntArray = self.hold[arcs]
+        for k in range(int(hold.max(initial=0))):
+            held: BoolArray = valid & (hold > k)
+            conn: IntArray = self.conn[arcs[held]]
+            valid[held] = self.count(
+                table, conn, np.full(len(conn), turn + k, dtype=np.int64)
+            ) < self.capacity[conn]
+        if valid.any():
+            self.relax(
+                arcs[valid], src[valid], g, step, priority, parent, buckets
+            )
+
+    def relax(
+        self,
+        arcs: IntArray,
+        src: IntArray,
+        g: int,
+        step: IntArray,
+        priority: IntArray,
+        parent: IntArray,
+        buckets: list[list[IntArray]]
+    ) -> None:
+        """
+        Update the hubs reached by the free moves of a layer.
+
+        Parameters
+        ----------
+        arcs
+            Free moves, in the order bfs would try them.
+        src
+            Hub each move leaves.
+        g
+            Turns from leaving the start hub to the layer.
+        step
+            Turns to reach each hub, updated.
+        priority
+            Priority hubs on the way to each hub, updated.
+        parent
+            Move reaching each hub, updated.
+        buckets
+            Hubs by turns to reach them, extended.
+        """
+        dest: IntArray = self.dest[arcs]
+        g_dest: IntArray = g + self.cost[arcs]
+        prio: IntArray = priority[src] + self.bonus[arcs]
+        order: IntArray = np.arange(len(arcs))
+
+        # the first move with the best (turns, -priority) is kept
+        best: IntArray = np.lexsort((order, -prio, g_dest, dest))
+        head: BoolArray = np.ones(len(best), dtype=np.bool_)
+        head[1:] = dest[best[1:]] != dest[best[:-1]]
+        best = best[head]
+        # bfs files a hub in a bucket on the first move reaching it in
+        # that many turns
+        filed: IntArray = np.lexsort((order, g_dest, dest))
+        filed = filed[head]
+
+        hubs: IntArray = dest[best]
+        better: BoolArray = (g_dest[best] < step[hubs]) | (
+            (g_dest[best] == step[hubs]) & (prio[best] > priority[hubs])
+        )
+        moved: BoolArray = better & (g_dest[best] != step[hubs])
+        step[hubs[better]] = g_dest[best[better]]
+        priority[hubs[better]] = prio[best[better]]
+        parent[hubs[better]] = arcs[best[better]]
+
+        new: IntArray = filed[moved]
+        new = new[np.argsort(new, kind="stable")]
+        for turns in np.unique(g_dest[new]).tolist():
+            while len(buckets) <= turns:
+                buckets.append([])
+            buckets[turns].append(dest[new[g_dest[new] == turns]])
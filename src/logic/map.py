@@ -1,17 +1,39 @@
-from typing import Any, Annotated
+import copy
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Annotated, Callable, Iterator
 from collections import deque
 
 from pydantic import BaseModel, Field
 
-from src.logic import Drone, Hub, Connection
+from src.logic import Drone, Hub, Connection, SolveContext
+from src.logic.flow import min_cost_routes
+from src.logic.corridor import Corridor, compress
+from src.logic.cluster import Clusters
+from src.logic.windowed import WindowedPlanner
+from src.logic.layered import LayeredSearch, Table
+from src.logic.improve import Improver
+from src.logic.route import Route
+from src.logic.timeline import FOREVER, MAX_TURN, Timelines
+from src.logic.trace import write_trace
 
 
-MAX_TURN: int = 10000
+STRATEGIES: tuple[str, ...] = (
+    "bfs", "bidirectional", "corridor", "astar", "flow", "sipp",
+    "hierarchical", "windowed", "layered"
+)
+
+# pairs of hub ids are packed above and below this many bits
+ID_BITS: int = 32
 
 
 class Map():
     """
     Map model with hubs, connections, and routing logic.
+
+    Hubs, connections and the static analyses derived from them are never
+    written by a solve; reservations, drone ids and the turn count live in
+    the solve context. Concurrent solves each plan on their own fork.
     """
     def __init__(
         self,
@@ -35,27 +57,70 @@ class Map():
         """
         self.hubs: dict[str, Hub] = {}
         self.connections: list[Connection] = []
-        self.turn_count: int = 0
         self.start_hub: Hub | None = None
         self.end_hub: Hub | None = None
         self.nb_drones: int = nb_drones
+        # specs the map was built from, stored in traces
+        self.specs: dict[str, Any] = {
+            "nb_drones": nb_drones, "hubs": hubs, "connections": connections
+        }
+
+        # hubs first, then connections, indexed by their id
+        self.nodes: list[Hub | Connection] = []
+        self.flow_routes: list[list[Hub | Connection]] | None = None
+        self.end_distances: dict[Hub | Connection, int] | None = None
+        self.corridors: dict[Hub, list[Corridor]] | None = None
+        self.clusters: Clusters | None = None
+        self.layered: LayeredSearch | None = None
+        self.reduced: bool = False
 
         for name, data in hubs.items():
-            self.hubs[name] = Hub(name, **data)
-            self.hubs[name].drones[0] = []
-            if "start_hub" in data:
-                self.start_hub = self.hubs[name]
-            if "end_hub" in data:
-                self.end_hub = self.hubs[name]
-
+            self.add_hub(Hub(name, **data))
         for h1, h2, max_drones in connections:
-            c: Connection = Connection(
-                self.hubs[h1], self.hubs[h2], max_drones
+            self.add_connection(
+                Connection(self.hubs[h1], self.hubs[h2], max_drones)
             )
-            c.drones[0] = []
-            self.connections.append(c)
-            self.hubs[h1].linked.append(c)
-            self.hubs[h2].linked.append(c)
+
+        # graph searched by the planners, narrowed by reduce()
+        self.links: dict[Hub, list[Connection]] = {
+            h: list(h.linked) for h in self.hubs.values()
+        }
+        self.active: set[Hub | Connection] = set(self.nodes)
+        self.context: SolveContext = SolveContext()
+
+    def add_hub(self, hub: Hub) -> None:
+        """
+        Number a hub and add it to the map.
+
+        Hubs are all added before any connection.
+
+        Parameters
+        ----------
+        hub
+            New hub.
+        """
+        hub.id = len(self.nodes)
+        self.nodes.append(hub)
+        self.hubs[hub.name] = hub
+        if hub.start_hub:
+            self.start_hub = hub
+        if hub.end_hub:
+            self.end_hub = hub
+
+    def add_connection(self, c: Connection) -> None:
+        """
+        Number a connection and link it to its hubs.
+
+        Parameters
+        ----------
+        c
+            New connection, between hubs of the map.
+        """
+        c.id = len(self.nodes)
+        self.nodes.append(c)
+        self.connections.append(c)
+        for h in c.linked:
+            h.linked.append(c)
 
     class Validate(BaseModel):
         """
@@ -74,86 +139,525 @@ class Map():
         hubs: dict[str, Hub.Validate]
         connections: list[tuple[str, str, Annotated[int, Field(ge=0)]]]
 
+    @property
+    def turn_count(self) -> int:
+        """
+        Get the turn count of the current solve.
+
+        Returns
+        -------
+        int
+            Turns from turn 0 to the last arrival, both included.
+        """
+        return self.context.turn_count
+
+    @turn_count.setter
+    def turn_count(self, value: int) -> None:
+        """
+        Set the turn count of the current solve.
+
+        Parameters
+        ----------
+        value
+            New turn count.
+        """
+        self.context.turn_count = value
+
+    def fork(self) -> "Map":
+        """
+        Get a map sharing this topology with an empty solve context.
+
+        The graph is reduced first, so forks share the reduced graph and
+        never write to anything they have in common. Each fork can then
+        be planned on its own thread.
+
+        Returns
+        -------
+        Map
+            Shallow copy of this map with its own reservations.
+        """
+        self.reduce()
+        m: Map = copy.copy(self)
+        m.context = SolveContext()
+        return m
+
     def display_logs(
-        self, drones: list[Drone], paths: dict[Drone, list[Hub | Connection]]
+        self, drones: list[Drone], routes: dict[Drone, Route]
     ) -> None:
         """
         Print per-turn movement logs.
 
-        Format and print the computed path for each drone.
+        Format and print the computed route for each drone.
 
         Parameters
         ----------
         drones
             List of drones to display.
-        paths
-            Computed path for each drone.
+        routes
+            Computed route for each drone.
+        """
+        for line in self.log_lines(drones, routes):
+            print(line)
+
+    def log_lines(
+        self, drones: list[Drone], routes: dict[Drone, Route]
+    ) -> list[str]:
+        """
+        Format the per-turn movement logs.
+
+        Parameters
+        ----------
+        drones
+            Drones to log, in order.
+        routes
+            Computed route for each drone.
+
+        Returns
+        -------
+        list[str]
+            Moves of each turn from turn 1 to the last arrival, as
+            space-separated D<id>-<node> entries.
         """
         logs: dict[int, list[str]] = {}
         for d in drones:
-            for turn in range(1, len(paths[d])):
-                node: Hub | Connection = paths[d][turn]
-                prev_node: Hub | Connection = paths[d][turn - 1]
-                if node == prev_node:
-                    continue
+            for turn, node, _ in routes[d].steps():
                 logs.setdefault(turn, []).append(
                     f"D{d.id}-{node.name}"
                 )
-        for turn in range(1, self.turn_count):
-            print(" ".join(logs.get(turn, [])))
+        return [
+            " ".join(logs.get(turn, [])) for turn in range(1, self.turn_count)
+        ]
 
-    def compute_paths(self) -> None:
+    def compute_paths(
+        self,
+        strategy: str = "bfs",
+        trace_out: str | None = None,
+        budget: float = 0
+    ) -> None:
         """
         Compute paths for all drones.
 
-        Compute each drone path and update per-turn occupancy.
+        Compute each drone route, update per-turn occupancy and print logs.
+
+        Parameters
+        ----------
+        strategy
+            Planning strategy, one of STRATEGIES.
+        trace_out
+            Trace file to write the schedule to, if any.
+        budget
+            Seconds spent improving the schedule once planned, see
+            Improver.
         """
-        assert self.start_hub is not None
+        drones, routes = self.plan(strategy)
+        if budget > 0:
+            Improver(self, drones, routes, strategy).improve(budget)
+        self.finalize(routes)
+        self.display_logs(drones, routes)
+        if trace_out is not None:
+            write_trace(trace_out, self, drones, routes)
+
+    def plan(
+        self, strategy: str = "bfs"
+    ) -> tuple[list[Drone], dict[Drone, Route]]:
+        """
+        Plan every drone with one strategy.
 
-        drones: list[Drone] = [Drone() for _ in range(self.nb_drones)]
-        paths: dict[Drone, list[Hub | Connection]] = {}
-        self.start_hub.drones.setdefault(0, [])
-        self.start_hub.drones[0].extend(drones)
+        Route drones one after the other, reserving each computed route
+        before planning the next one.
 
-        if not self.has_path():
-            raise RuntimeError("can't find any existing path")
+        Parameters
+        ----------
+        strategy
+            Planning strategy, one of STRATEGIES.
+
+        Returns
+        -------
+        tuple[list[Drone], dict[Drone, Route]]
+            Planned drones and their routes.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised if the strategy is unknown or no path exists.
+        """
+        drones: list[Drone] = []
+        routes: dict[Drone, Route] = {}
+        for d, route in self.plan_iter(strategy):
+            drones.append(d)
+            routes[d] = route
+        return drones, routes
+
+    def planners(self) -> dict[str, Callable[[Drone], Route]]:
+        """
+        Get the planner of each strategy routing one drone at a time.
+
+        Returns
+        -------
+        dict[str, Callable[[Drone], Route]]
+            Planners by strategy, windowed planning every drone at once.
+        """
+        return {
+            "bfs": self.find_best_path,
+            "bidirectional": self.find_best_path_bidirectional,
+            "corridor": self.find_compressed_path,
+            "astar": self.find_goal_directed_path,
+            "flow": self.find_flow_path,
+            "sipp": self.find_safe_interval_path,
+            "hierarchical": self.find_clustered_path,
+            "layered": self.find_layered_path,
+        }
+
+    def plan_iter(
+        self, strategy: str = "bfs", kept: dict[int, Route] | None = None
+    ) -> Iterator[tuple[Drone, Route]]:
+        """
+        Plan drones one at a time with one strategy.
 
-        # compute path for each drone
+        Each route is reserved before being yielded, so the caller can use
+        it while the next drones are planned. Kept routes are reserved and
+        yielded first, the other drones being planned around them.
+
+        Parameters
+        ----------
+        strategy
+            Planning strategy, one of STRATEGIES.
+        kept
+            Routes already known, by drone id.
+
+        Yields
+        ------
+        tuple[Drone, Route]
+            Planned drone and its route, in planning order.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised if the strategy is unknown or no path exists.
+        """
+        planners: dict[str, Callable[[Drone], Route]] = self.planners()
+        # every drone is planned at once, window by window
+        if strategy not in planners and strategy != "windowed":
+            raise RuntimeError(f"unknown strategy ({strategy})")
+
+        drones: list[Drone] = [
+            self.context.new_drone() for _ in range(self.nb_drones)
+        ]
+
+        self.check_feasible()
+        # corridors keep every route of the checked reduced graph
+        if strategy == "corridor":
+            self.corridors = compress(self)
+
+        kept = kept or {}
         for d in drones:
-            paths[d] = self.find_best_path(d)
+            if d.id in kept:
+                self.reserve_path(d, kept[d.id])
+                yield d, kept[d.id]
 
-            # fill path
-            for i, node in enumerate(paths[d]):
-                if node == self.start_hub:
-                    continue
-                prev_node: Hub | Connection = paths[d][i - 1]
-                if isinstance(prev_node, Hub) and isinstance(node, Hub):
-                    c: Connection = self.get_connection(prev_node, node)
-                    c.drones.setdefault(i, []).append(d)
-
-                if isinstance(node, Connection):
-                    node.drone_count[i] = node.drone_count.get(i, 0) + 1
-                    node.drones.setdefault(i, []).append(d)
-                else:
-                    node.drones.setdefault(i, []).append(d)
+        windowed: Iterator[Route] | None = None
+        if strategy == "windowed":
+            windowed = iter(WindowedPlanner(self, list(kept.values())).plan(
+                len(drones) - sum(1 for d in drones if d.id in kept)
+            ))
 
-        # get turn_count
-        self.turn_count = max(len(p) for p in paths.values())
+        # compute route for each drone
+        for d in drones:
+            if d.id in kept:
+                continue
+            route: Route = (
+                next(windowed) if windowed is not None
+                else planners[strategy](d)
+            )
+            self.reserve_path(d, route)
+            yield d, route
 
-        # for each turn, fill the end hub with drones that already reached it
-        for i in range(1, self.turn_count):
-            for h in self.hubs.values():
-                if h == self.end_hub:
-                    prev: list[Drone] = h.drones.get(i - 1, [])
-                    cur: list[Drone] = h.drones.setdefault(i, [])
-                    for d in prev:
-                        if d not in cur:
-                            cur.append(d)
+    def reserve_path(self, drone: Drone, route: Route) -> None:
+        """
+        Reserve a route in the node timelines.
 
-        self.display_logs(drones, paths)
+        Waits on the start hub are not stored, see occupancy.
 
-    @staticmethod
-    def is_node_valid(n: Hub | Connection, turn: int) -> bool:
+        Parameters
+        ----------
+        drone
+            Drone following the route.
+        route
+            Route of the drone.
+        """
+        reserved: Timelines = self.context.reserved
+        prev_node: Hub | Connection = route.start
+        for turn, node, dwell in route.steps():
+            if isinstance(prev_node, Hub) and isinstance(node, Hub):
+                c: Connection = self.get_connection(prev_node, node)
+                reserved[c.id].reserve(turn, turn + 1)
+
+            if isinstance(node, Connection):
+                self.context.transit[node.id].reserve(turn, turn + dwell)
+            reserved[node.id].reserve(turn, turn + dwell)
+            prev_node = node
+        insort(self.context.departures, route.departure)
+        insort(self.context.arrivals, route.arrival)
+
+    def release_path(self, drone: Drone, route: Route) -> None:
+        """
+        Remove a reserved route from the node timelines.
+
+        Parameters
+        ----------
+        drone
+            Drone following the route.
+        route
+            Route of the drone, as reserved by reserve_path.
+        """
+        reserved: Timelines = self.context.reserved
+        prev_node: Hub | Connection = route.start
+        for turn, node, dwell in route.steps():
+            if isinstance(prev_node, Hub) and isinstance(node, Hub):
+                c: Connection = self.get_connection(prev_node, node)
+                reserved[c.id].release(turn, turn + 1)
+
+            if isinstance(node, Connection):
+                self.context.transit[node.id].release(turn, turn + dwell)
+            reserved[node.id].release(turn, turn + dwell)
+            prev_node = node
+        departures: list[int] = self.context.departures
+        del departures[bisect_left(departures, route.departure)]
+        arrivals: list[int] = self.context.arrivals
+        del arrivals[bisect_left(arrivals, route.arrival)]
+
+    def finalize(self, routes: dict[Drone, Route]) -> None:
+        """
+        Set the turn count.
+
+        Parameters
+        ----------
+        routes
+            Reserved route for each drone.
+        """
+        self.turn_count = max(len(r) for r in routes.values())
+
+    def occupancy(self, node: Hub | Connection, turn: int) -> int:
+        """
+        Count the drones displayed on a node at a given turn.
+
+        Drones waiting on the start hub or parked on the end hub are
+        derived from departure and arrival turns instead of being stored
+        for every turn.
+
+        Parameters
+        ----------
+        node
+            Hub or connection to count.
+        turn
+            Turn index.
+
+        Returns
+        -------
+        int
+            Drones on the hub, or drones in transit on the connection.
+        """
+        departures: list[int] = self.context.departures
+        if node is self.start_hub:
+            return len(departures) - bisect_left(departures, turn)
+        if node is self.end_hub:
+            return bisect_right(self.context.arrivals, turn)
+        if isinstance(node, Connection):
+            return self.context.transit[node.id].count(turn)
+        return self.context.reserved[node.id].count(turn)
+
+    def occupancy_row(self, turn: int) -> list[int]:
+        """
+        Count the drones displayed on every node at a given turn.
+
+        Parameters
+        ----------
+        turn
+            Turn index.
+
+        Returns
+        -------
+        list[int]
+            Drone count of each node, indexed by node id.
+        """
+        return [self.occupancy(node, turn) for node in self.nodes]
+
+    def decode_route(
+        self, encoded: tuple[int, list[tuple[int, int]]]
+    ) -> Route:
+        """
+        Rebuild a route from node ids.
+
+        Parameters
+        ----------
+        encoded
+            Route, as given by Route.encode.
+
+        Returns
+        -------
+        Route
+            Route on the nodes of this map.
+        """
+        assert self.start_hub is not None
+
+        departure, hops = encoded
+        return Route(
+            self.start_hub, departure,
+            [(self.nodes[i], dwell) for i, dwell in hops]
+        )
+
+    def apply_paths(
+        self, encoded: list[tuple[int, list[tuple[int, int]]]]
+    ) -> tuple[list[Drone], dict[Drone, Route]]:
+        """
+        Load routes computed elsewhere.
+
+        Rebuild drones and routes from node ids, then reserve and finalize
+        them as if they had been planned by this map.
+
+        Parameters
+        ----------
+        encoded
+            Per-drone routes, as given by Route.encode.
+
+        Returns
+        -------
+        tuple[list[Drone], dict[Drone, Route]]
+            Drones and their routes.
+        """
+        drones: list[Drone] = [self.context.new_drone() for _ in encoded]
+        routes: dict[Drone, Route] = {}
+        for d, route in zip(drones, encoded):
+            routes[d] = self.decode_route(route)
+            self.reserve_path(d, routes[d])
+        self.finalize(routes)
+        return drones, routes
+
+    def lower_bound(self) -> int:
+        """
+        Compute a lower bound of the turn count.
+
+        Combine the shortest route length with the number of drones that
+        can leave the start hub or enter the end hub per turn.
+
+        Returns
+        -------
+        int
+            Turn count no schedule can go below.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
+
+        distances: dict[Hub | Connection, int] = self.distances_to_end()
+        if self.start_hub not in distances:
+            return 0
+
+        out_rate: int = 0
+        for c in self.links[self.start_hub]:
+            a, b = c.linked
+            dest: Hub = b if self.start_hub is a else a
+            if dest.zone == "blocked":
+                continue
+            if dest.cost > 1:
+                out_rate += c.max_drones
+            else:
+                out_rate += min(c.max_drones, dest.max_drones)
+        in_rate: int = sum(c.max_drones for c in self.links[self.end_hub])
+
+        rate: int = min(out_rate, in_rate)
+        if rate <= 0:
+            return 0
+        return distances[self.start_hub] - (-self.nb_drones // rate)
+
+    def reduce(self) -> None:
+        """
+        Narrow the searched graph to the hubs that can be on a route.
+
+        Drop blocked hubs, hubs without capacity and empty connections,
+        then keep the biconnected component holding a virtual start-end
+        edge: its hubs are exactly the ones lying on a simple start to end
+        route, so dead-end branches and components disconnected from a
+        terminal go away. hubs, connections and node ids are left untouched
+        for display. The topology never changes, so later calls do nothing.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
+
+        if self.reduced:
+            return
+        self.reduced = True
+
+        start: Hub = self.start_hub
+        live: set[Hub] = {
+            h for h in self.hubs.values()
+            if h is start or h is self.end_hub
+            or (h.zone != "blocked" and h.max_drones > 0)
+        }
+        adj: dict[Hub, list[tuple[Hub, int]]] = {h: [] for h in live}
+        for c in self.connections:
+            a, b = c.linked
+            if c.max_drones > 0 and a is not b and a in live and b in live:
+                adj[a].append((b, c.id))
+                adj[b].append((a, c.id))
+        # virtual edge, id -1
+        adj[start].append((self.end_hub, -1))
+        adj[self.end_hub].append((start, -1))
+
+        # iterative Tarjan, keeping the block holding the virtual edge
+        kept: set[int] = set()
+        disc: dict[Hub, int] = {start: 0}
+        low: dict[Hub, int] = {start: 0}
+        edges: list[int] = []
+        stack: list[tuple[Hub, int, Iterator[tuple[Hub, int]]]] = [
+            (start, -2, iter(adj[start]))
+        ]
+        while stack:
+            node, parent_edge, it = stack[-1]
+            child: tuple[Hub, int] | None = None
+            for dest, edge in it:
+                if edge == parent_edge:
+                    continue
+                if dest not in disc:
+                    child = (dest, edge)
+                    break
+                if disc[dest] < disc[node]:
+                    low[node] = min(low[node], disc[dest])
+                    edges.append(edge)
+            if child is not None:
+                dest, edge = child
+                disc[dest] = low[dest] = len(disc)
+                edges.append(edge)
+                stack.append((dest, edge, iter(adj[dest])))
+                continue
+
+            stack.pop()
+            if not stack:
+                break
+            parent: Hub = stack[-1][0]
+            low[parent] = min(low[parent], low[node])
+            if low[node] >= disc[parent]:
+                block: list[int] = []
+                while not block or block[-1] != parent_edge:
+                    block.append(edges.pop())
+                if -1 in block:
+                    kept = set(block)
+
+        kept.discard(-1)
+        self.active = {start, self.end_hub}
+        for h in self.hubs.values():
+            self.links[h] = [c for c in h.linked if c.id in kept]
+            if self.links[h]:
+                self.active.add(h)
+        self.active.update(self.nodes[i] for i in kept)
+
+        # cached results may rely on pruned nodes
+        self.end_distances = None
+        self.flow_routes = None
+        self.corridors = None
+        self.clusters = None
+        self.layered = None
+
+    def is_node_valid(self, n: Hub | Connection, turn: int) -> bool:
         """
         Check if a node is available.
 
@@ -173,7 +677,34 @@ class Map():
         """
         if isinstance(n, Hub) and n.zone == "blocked":
             return False
-        return len(n.drones.get(turn, [])) < n.max_drones
+        return self.context.reserved[n.id].count(turn) < n.max_drones
+
+    def earliest_free(
+        self, n: Hub | Connection, turn: int, length: int = 1
+    ) -> int:
+        """
+        Find the earliest turn a node is available.
+
+        Parameters
+        ----------
+        n
+            Hub or connection to check.
+        turn
+            Turn to search from.
+        length
+            Number of consecutive turns the node must be available.
+
+        Returns
+        -------
+        int
+            First turn not before turn from which the node can accept a
+            drone for length turns, or FOREVER if there is none.
+        """
+        if isinstance(n, Hub) and n.zone == "blocked":
+            return FOREVER
+        return self.context.reserved[n.id].earliest_free(
+            turn, n.max_drones, length
+        )
 
     @staticmethod
     def get_connection(u: Hub, v: Hub) -> Connection:
@@ -205,53 +736,222 @@ class Map():
                 return c
         raise RuntimeError("no connection between hubs")
 
+    def moves(self, hub: Hub, turn: int) -> Iterator[tuple[Connection, Hub]]:
+        """
+        Iterate over the moves leaving a hub at a given turn.
+
+        Entering a hub takes as many turns as its cost: the drone stays on
+        the connection for all of them but the last one. A hub of cost 1
+        is entered directly, its connection being crossed on arrival.
+
+        Parameters
+        ----------
+        hub
+            Hub the drone is leaving.
+        turn
+            First turn after leaving hub.
+
+        Yields
+        ------
+        tuple[Connection, Hub]
+            Connection taken and hub reached, at turn + cost - 1.
+        """
+        for c in self.links[hub]:
+            a, b = c.linked
+            dest: Hub = b if hub is a else a
+            if self.earliest_free(c, turn, max(dest.cost - 1, 1)) != turn:
+                continue
+            if not self.is_node_valid(dest, turn + dest.cost - 1):
+                continue
+            yield c, dest
+
     @staticmethod
-    def add_queue(
-        dest_node: Hub | Connection,
-        step_count: int,
-        from_node: Hub | Connection,
-        priority_count: int,
-        queue: deque[Hub | Connection],
-        step: dict[Hub | Connection, int],
-        parents: dict[Hub | Connection, list[tuple[Hub | Connection, int]]]
-    ) -> None:
+    def scanned_before(
+        step: dict[Hub, int],
+        first: dict[Hub, tuple[Hub, int]],
+        order: dict[int, bool],
+        a: tuple[Hub, int],
+        b: tuple[Hub, int]
+    ) -> bool:
         """
-        Update search state for a queued node.
+        Check if find_best_path tries a move before another one.
 
-        Record steps and parents, then enqueue nodes when needed.
+        find_best_path scans hubs by turns to reach them, then in the
+        order they were first reached, and tries the moves of each hub in
+        order. Searches settling hubs in another order use this to keep
+        the parent find_best_path keeps among equally good ones.
 
         Parameters
         ----------
-        dest_node
-            Candidate node to enqueue.
-        step_count
-            Step count to reach dest_node.
-        from_node
-            Parent node for dest_node.
-        priority_count
-            Priority used to break ties.
-        queue
-            Search queue.
         step
-            Best step count per node.
-        parents
-            Parent tracking per node.
-        """
-        if dest_node not in step:
-            step[dest_node] = step_count
-            parents[dest_node] = [(from_node, priority_count)]
-            queue.append(dest_node)
-        elif step[dest_node] == step_count:
-            prev_priority: int = max(p for _, p in parents[dest_node])
-            parents[dest_node].append((from_node, priority_count))
-            if priority_count > prev_priority:
-                queue.append(dest_node)
-
-    def find_best_path(self, drone: Drone) -> list[Hub | Connection]:
+            Turns to reach each node.
+        first
+            Node each node was first reached from, and the index of the
+            move among the moves of that node.
+        order
+            Whether a hub is scanned before another one, by pair of hub
+            ids packed above and below ID_BITS bits, filled as hubs are
+            compared.
+        a
+            Node left and index of the first move.
+        b
+            Node left and index of the second move, the node being
+            reached after as many turns as the one of a.
+
+        Returns
+        -------
+        bool
+            True if a is tried before b.
+        """
+        (x, i), (y, j) = a, b
+        # two hubs are scanned in the order of the hubs they were first
+        # reached from, up to the first one reached earlier
+        pairs: list[tuple[int, int]] = []
+        before: bool
+        while x is not y and step[x] == step[y]:
+            if x.id << ID_BITS | y.id in order:
+                before = order[x.id << ID_BITS | y.id]
+                break
+            pairs.append((x.id, y.id))
+            (x, i), (y, j) = first[x], first[y]
+        else:
+            before = i < j if x is y else step[x] < step[y]
+        for u, v in pairs:
+            order[u << ID_BITS | v] = before
+            order[v << ID_BITS | u] = not before
+        return before
+        return before
+
+    def route_from_parents(
+        self, parent: dict[Hub, tuple[Hub, Connection]], start_turn: int
+    ) -> Route:
+        """
+        Build the route ending on the end hub from search parents.
+
+        Parameters
+        ----------
+        parent
+            Previous hub and connection taken, for each reached hub.
+        start_turn
+            Last turn spent on the start hub.
+
+        Returns
+        -------
+        Route
+            Route of the drone, connections being held before costly hubs.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
+
+        nodes: list[Hub | Connection] = []
+        hub: Hub = self.end_hub
+        while hub is not self.start_hub:
+            prev, c = parent[hub]
+            nodes.append(hub)
+            nodes.extend([c] * (hub.cost - 1))
+            hub = prev
+        nodes.reverse()
+        return Route.from_nodes(self.start_hub, start_turn, nodes)
+
+    def successors(
+        self, node: Hub | Connection, turn: int
+    ) -> Iterator[tuple[Hub | Connection, int]]:
+        """
+        Iterate over the nodes reachable from a node at a given turn.
+
+        A hub costing more than 1 turn is reached through its connection
+        first, held for a single turn: these unit steps model costs of 1
+        and 2 only, costlier hubs are handled by moves.
+
+        Parameters
+        ----------
+        node
+            Node the drone is leaving.
+        turn
+            Turn at which the drone arrives on the next node.
+
+        Yields
+        ------
+        tuple[Hub | Connection, int]
+            Next node and the priority bonus earned by entering it.
+        """
+        # process Hub
+        if isinstance(node, Hub):
+            for c in self.links[node]:
+                a, b = c.linked
+                dest: Hub = b if node is a else a
+
+                if not self.is_node_valid(c, turn):
+                    continue
+
+                if dest.cost > 1:
+                    yield c, 0
+                    continue
+
+                if not self.is_node_valid(dest, turn):
+                    continue
+
+                yield dest, 1 if dest.zone == "priority" else 0
+        # process Connection
+        else:
+            for dest in node.linked:
+                if not self.is_node_valid(dest, turn):
+                    continue
+
+                yield dest, 1 if dest.zone == "priority" else 0
+
+    def predecessors(
+        self, node: Hub | Connection, turn: int
+    ) -> Iterator[tuple[Hub | Connection, int]]:
+        """
+        Iterate over the nodes a node can be reached from at a given turn.
+
+        Reverse of successors: node is yielded by successors(pred, turn)
+        for every pred yielded here. The validity of pred itself, one turn
+        earlier, is left to the caller.
+
+        Parameters
+        ----------
+        node
+            Node the drone is entering.
+        turn
+            Turn at which the drone arrives on node.
+
+        Yields
+        ------
+        tuple[Hub | Connection, int]
+            Previous node and the priority bonus earned by entering node.
+        """
+        if not self.is_node_valid(node, turn):
+            return
+        # process Hub
+        if isinstance(node, Hub):
+            bonus: int = 1 if node.zone == "priority" else 0
+            for c in self.links[node]:
+                a, b = c.linked
+                src: Hub = b if node is a else a
+                if node.cost > 1:
+                    yield c, bonus
+                    continue
+                if self.is_node_valid(c, turn):
+                    yield src, bonus
+        # process Connection, only entered towards a costly hub
+        else:
+            a, b = node.linked
+            if b.cost > 1:
+                yield a, 0
+            if a.cost > 1 and a is not b:
+                yield b, 0
+
+    def find_best_path(self, drone: Drone) -> Route:
         """
         Find the best path for one drone.
 
-        Search a valid route from start to end with constraints.
+        Search a valid route from start to end with constraints. Hubs are
+        settled in (turns, -priority) order with a bucket queue (Dial's
+        algorithm): moves take the integer cost of the hub they enter, so
+        every parent of a hub is settled before it and its priority is
+        final when its bucket is reached.
 
         Parameters
         ----------
@@ -260,8 +960,8 @@ class Map():
 
         Returns
         -------
-        list[Hub | Connection]
-            Sequence of hubs and connections for this drone.
+        Route
+            Route of this drone.
 
         Raises
         ------
@@ -273,105 +973,440 @@ class Map():
 
         start_turn: int = 0
         while True:
+            # buckets[g]: hubs reached g turns after leaving the start hub
+            buckets: list[list[Hub]] = [[self.start_hub]]
+            step: dict[Hub, int] = {self.start_hub: 0}
+            priority: dict[Hub, int] = {self.start_hub: 0}
+            parent: dict[Hub, tuple[Hub, Connection]] = {}
+
+            # the end hub is settled once its bucket is reached
+            g: int = 0
+            while g < min(len(buckets), step.get(self.end_hub, FOREVER)):
+                for hub in buckets[g]:
+                    # stale, reached earlier through another hub
+                    if step[hub] != g:
+                        continue
+                    for c, dest in self.moves(hub, start_turn + g + 1):
+                        g_dest: int = g + dest.cost
+                        prio: int = priority[hub] + (
+                            1 if dest.zone == "priority" else 0
+                        )
+                        if dest in step and (step[dest], -priority[dest]) <= (
+                            g_dest, -prio
+                        ):
+                            continue
+                        if dest not in step or step[dest] != g_dest:
+                            while len(buckets) <= g_dest:
+                                buckets.append([])
+                            buckets[g_dest].append(dest)
+                        step[dest] = g_dest
+                        priority[dest] = prio
+                        parent[dest] = (hub, c)
+                g += 1
 
-            max_step: float = float("inf")
+            # must wait
+            if self.end_hub not in step:
+                start_turn = self.delay(start_turn)
+                continue
+
+            return self.route_from_parents(parent, start_turn)
+
+    def distances_to_end(self) -> dict[Hub | Connection, int]:
+        """
+        Compute static distances to the end hub.
 
-            queue: deque[Hub | Connection] = deque()
-            step: dict[Hub | Connection, int] = {}
-            parents: dict[
-                Hub | Connection, list[tuple[Hub | Connection, int]]
-            ] = {}
+        Run a reverse Dijkstra ignoring reservations. Entering a hub takes
+        its cost, blocked hubs and empty connections are skipped. The result
+        is cached since the topology does not change.
+
+        Returns
+        -------
+        dict[Hub | Connection, int]
+            Minimal number of turns from each node to the end hub, for the
+            nodes that can reach it.
+        """
+        assert self.end_hub is not None
 
-            queue.append(self.start_hub)
-            step[self.start_hub] = 0
-            parents[self.start_hub] = [(self.start_hub, 0)]
+        if self.end_distances is not None:
+            return self.end_distances
 
-            # BFS
-            while queue:
-                node: Hub | Connection = queue.popleft()
-                if step[node] > max_step:
+        dist: dict[Hub | Connection, int] = {self.end_hub: 0}
+        heap: list[tuple[int, int, Hub]] = [(0, self.end_hub.id, self.end_hub)]
+        while heap:
+            d, _, hub = heapq.heappop(heap)
+            if d > dist[hub] or hub.zone == "blocked" or hub.max_drones <= 0:
+                continue
+            cost: int = hub.cost
+            for c in self.links[hub]:
+                if c.max_drones <= 0:
                     continue
+                a, b = c.linked
+                src: Hub = b if hub is a else a
+                if src not in dist or d + cost < dist[src]:
+                    dist[src] = d + cost
+                    heapq.heappush(heap, (d + cost, src.id, src))
+
+        # a connection node always leads to one of its hubs
+        for c in self.connections:
+            if c not in self.active:
+                continue
+            reachable: list[int] = [
+                dist[h] + max(h.cost - 1, 1) for h in c.linked if h in dist
+            ]
+            if reachable and c.max_drones > 0:
+                dist[c] = min(reachable) + 1
 
-                if node == self.end_hub:
-                    max_step = step[node]
+        self.end_distances = dist
+        return dist
 
-                node_priority: int = max(p for _, p in parents[node])
-                step_count: int = step[node] + 1
-                turn: int = start_turn + step_count
+    def find_goal_directed_path(self, drone: Drone) -> Route:
+        """
+        Find a path for one drone with a goal-directed search.
 
-                # process Hub
-                if isinstance(node, Hub):
-                    for c in node.linked:
-                        a, b = c.linked
-                        dest: Hub = b if node is a else a
+        Same rules and tie-breaking as find_best_path, so routes are the
+        same, but nodes are expanded in A* order using distances_to_end as
+        heuristic, so the search stops before exploring nodes leading away
+        from the end hub.
 
-                        if not self.is_node_valid(c, turn):
-                            continue
+        Parameters
+        ----------
+        drone
+            Drone to route.
 
-                        if dest.zone == "restricted":
-                            self.add_queue(
-                                c, step_count, node, node_priority,
-                                queue, step, parents
-                            )
-                            continue
+        Returns
+        -------
+        Route
+            Route of this drone.
+        """
+        start_turn: int = 0
+        while True:
+            parent: dict[Hub, tuple[Hub, Connection]] | None = (
+                self.goal_directed_search(start_turn)
+            )
+            # must wait
+            if parent is None:
+                start_turn = self.delay(start_turn)
+                continue
 
-                        if not self.is_node_valid(dest, turn):
-                            continue
+            return self.route_from_parents(parent, start_turn)
 
-                        dest_prio: int = node_priority + (
-                            1 if dest.zone == "priority" else 0
-                        )
-                        self.add_queue(
-                            dest, step_count, node, dest_prio,
-                            queue, step, parents
-                        )
-                # process Connection
-                else:
-                    for dest in node.linked:
-                        if not self.is_node_valid(dest, turn):
-                            continue
+    def goal_directed_search(
+        self, start_turn: int, within: set[Hub] | None = None
+    ) -> dict[Hub, tuple[Hub, Connection]] | None:
+        """
+        Search a route leaving the start hub at a given turn, in A* order.
 
-                        dest_prio = node_priority + (
-                            1 if dest.zone == "priority" else 0
-                        )
-                        self.add_queue(
-                            dest, step_count, node, dest_prio,
-                            queue, step, parents
+        Parameters
+        ----------
+        start_turn
+            Last turn spent on the start hub.
+        within
+            Hubs the route may enter, every hub if None.
+
+        Returns
+        -------
+        dict[Hub, tuple[Hub, Connection]] | None
+            Search parents, see route_from_parents, None if the end hub
+            cannot be reached without waiting.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
+
+        h: dict[Hub | Connection, int] = self.distances_to_end()
+        # (f, step, -priority, hub id) keeps parents before children
+        heap: list[tuple[int, int, int, int]] = []
+        step: dict[Hub, int] = {self.start_hub: 0}
+        priority: dict[Hub, int] = {self.start_hub: 0}
+        parent: dict[Hub, tuple[Hub, Connection]] = {}
+        # equal parents are told apart as find_best_path does, see
+        # scanned_before
+        first: dict[Hub, tuple[Hub, int]] = {}
+        kept: dict[Hub, tuple[Hub, int]] = {}
+        order: dict[int, bool] = {}
+        closed: set[Hub] = set()
+
+        heapq.heappush(heap, (h[self.start_hub], 0, 0, self.start_hub.id))
+        while heap:
+            _, g, neg_prio, hub_id = heapq.heappop(heap)
+            hub: Hub | Connection = self.nodes[hub_id]
+            assert isinstance(hub, Hub)
+            if hub in closed or (g, -neg_prio) != (
+                step[hub], priority[hub]
+            ):
+                continue
+            closed.add(hub)
+            if hub == self.end_hub:
+                return parent
+
+            for i, (c, dest) in enumerate(
+                self.moves(hub, start_turn + g + 1)
+            ):
+                if dest in closed or dest not in h or (
+                    within is not None and dest not in within
+                ):
+                    continue
+                g_dest: int = g + dest.cost
+                if dest in step and step[dest] < g_dest:
+                    continue
+                move: tuple[Hub, int] = (hub, i)
+                prio: int = priority[hub] + (
+                    1 if dest.zone == "priority" else 0
+                )
+                new: bool = dest not in step or step[dest] > g_dest
+                earlier: bool = new or self.scanned_before(
+                    step, first, order, move, first[dest]
+                )
+                better: bool = new or prio > priority[dest] or (
+                    prio == priority[dest] and (
+                        earlier or kept[dest] is not first[dest]
+                        and self.scanned_before(
+                            step, first, order, move, kept[dest]
                         )
+                    )
+                )
+                if earlier:
+                    first[dest] = move
+                if not better:
+                    continue
+                if new or prio != priority[dest]:
+                    heapq.heappush(
+                        heap, (g_dest + h[dest], g_dest, -prio, dest.id)
+                    )
+                step[dest] = g_dest
+                priority[dest] = prio
+                parent[dest] = (hub, c)
+                kept[dest] = move
+        return None
+
+    def find_clustered_path(self, drone: Drone) -> Route:
+        """
+        Find a path for one drone with a hierarchical search.
+
+        An abstract route is searched over the entrances of the clusters
+        first, then the drone is planned as find_goal_directed_path on
+        the hubs of the clusters along it only, so the search does not
+        grow with the size of the map.
+
+        Parameters
+        ----------
+        drone
+            Drone to route.
+
+        Returns
+        -------
+        Route
+            Route of this drone.
+        """
+        if self.clusters is None:
+            self.clusters = Clusters(self)
 
+        start_turn: int = 0
+        while True:
+            within: set[Hub] | None = self.clusters.corridor(
+                self, start_turn
+            )
+            parent: dict[Hub, tuple[Hub, Connection]] | None = (
+                self.goal_directed_search(start_turn, within)
+                if within is not None else None
+            )
             # must wait
-            if self.end_hub not in parents:
-                start_turn += 1
+            if parent is None:
+                start_turn = self.delay(start_turn)
                 continue
 
-            # fill wait at start hub
-            for wait_turn in range(1, start_turn + 1):
-                self.start_hub.drones.setdefault(wait_turn, []).append(drone)
+            return self.route_from_parents(parent, start_turn)
 
-            # recreate best path
-            path: list[Hub | Connection] = []
+    def find_layered_path(self, drone: Drone) -> Route:
+        """
+        Find the best path for one drone, one layer of hubs at a time.
 
-            prev: Hub | Connection = self.end_hub
-            path.append(prev)
+        Same route as find_best_path, each bucket being expanded at once
+        with NumPy, see LayeredSearch.
 
-            while prev != self.start_hub:
-                # care about priority
-                prev = max(parents[prev], key=lambda x: x[1])[0]
-                path.append(prev)
-            path.reverse()
-            start_padding: list[Hub | Connection] = [
-                self.start_hub
-            ] * (start_turn + 1)
-            path = start_padding + path[1:]
+        Parameters
+        ----------
+        drone
+            Drone to route.
+
+        Returns
+        -------
+        Route
+            Route of this drone.
+        """
+        if self.layered is None:
+            self.layered = LayeredSearch(self)
+        # reservations do not change while the drone is searched
+        table: Table = self.layered.table(self)
+
+        start_turn: int = 0
+        while True:
+            parent: dict[Hub, tuple[Hub, Connection]] | None = (
+                self.layered.search(table, start_turn)
+            )
+            # must wait
+            if parent is None:
+                start_turn = self.delay(start_turn)
+                continue
+
+            return self.route_from_parents(parent, start_turn)
+
+    def find_flow_path(self, drone: Drone) -> Route:
+        """
+        Find a path for one drone along precomputed flow routes.
+
+        Routes come from a min-cost flow decomposition of the static graph.
+        The drone takes the route and departure turn giving the earliest
+        arrival, preferring routes through priority hubs on ties.
+
+        Parameters
+        ----------
+        drone
+            Drone to route.
+
+        Returns
+        -------
+        Route
+            Route of this drone.
+        """
+        assert self.start_hub is not None
+
+        if self.flow_routes is None:
+            self.flow_routes = min_cost_routes(self)
+        if not self.flow_routes:
+            raise RuntimeError("can't find any existing path")
+
+        shortest: int = min(len(r) for r in self.flow_routes)
+        best: tuple[int, int] | None = None
+        best_route: Route = Route(self.start_hub, 0, [])
+        start_turn: int = 0
+        while best is None or start_turn + shortest - 1 < best[0]:
+            for route in self.flow_routes:
+                if not self.is_route_free(route, start_turn):
+                    continue
+                key: tuple[int, int] = (
+                    start_turn + len(route) - 1,
+                    -sum(
+                        1 for n in route
+                        if isinstance(n, Hub) and n.zone == "priority"
+                    )
+                )
+                if best is None or key < best:
+                    best = key
+                    best_route = Route.from_nodes(
+                        self.start_hub, start_turn, route[1:]
+                    )
+            start_turn = (
+                self.delay(start_turn) if best is None else start_turn + 1
+            )
+        return best_route
+
+    def is_route_free(
+        self, route: list[Hub | Connection], start_turn: int
+    ) -> bool:
+        """
+        Check if a route can be followed without waiting.
+
+        Parameters
+        ----------
+        route
+            Route from the start hub to the end hub.
+        start_turn
+            Last turn spent on the start hub.
+
+        Returns
+        -------
+        bool
+            True if every node of the route is available on time.
+        """
+        for i in range(1, len(route)):
+            turn: int = start_turn + i
+            node: Hub | Connection = route[i]
+            prev: Hub | Connection = route[i - 1]
+            if isinstance(prev, Hub) and isinstance(node, Hub):
+                if not self.is_node_valid(
+                    self.get_connection(prev, node), turn
+                ):
+                    return False
+            if not self.is_node_valid(node, turn):
+                return False
+        return True
+
+    def check_feasible(self) -> None:
+        """
+        Reject a map no schedule can solve, before planning any drone.
+
+        Checks are static and linear in the size of the map: the end hub
+        must be linked to the start hub, then reachable through hubs and
+        connections able to hold a drone, and the lower bound of the turn
+        count must fit in MAX_TURN turns.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised with the reason the map can't be solved.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
 
-            return path
+        self.reduce()
+        linked: set[Hub] = {self.start_hub}
+        queue: deque[Hub] = deque([self.start_hub])
+        while queue:
+            hub: Hub = queue.popleft()
+            for c in hub.linked:
+                for dest in c.linked:
+                    if dest not in linked:
+                        linked.add(dest)
+                        queue.append(dest)
+        if self.end_hub not in linked:
+            raise RuntimeError("can't find any existing path")
+        # every route crosses a blocked hub or a node without capacity
+        if not self.has_path_bidirectional():
+            raise RuntimeError(
+                "can't find any existing path, every route goes through a"
+                " blocked hub or a node without capacity"
+            )
+        bound: int = self.lower_bound()
+        if bound > MAX_TURN:
+            raise RuntimeError(
+                f"can't plan within {MAX_TURN} turns, at least {bound}"
+                " are needed"
+            )
 
-    def has_path(self) -> bool:
+    @staticmethod
+    def delay(start_turn: int) -> int:
+        """
+        Get the next turn to try leaving the start hub on.
+
+        Parameters
+        ----------
+        start_turn
+            Last departure turn tried.
+
+        Returns
+        -------
+        int
+            Following turn.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised past MAX_TURN, so that a drone whose way is never freed
+            fails instead of waiting forever.
+        """
+        if start_turn >= MAX_TURN:
+            raise RuntimeError(
+                f"can't find any path leaving before turn {MAX_TURN}"
+            )
+        return start_turn + 1
+
+    def has_path_bidirectional(self) -> bool:
         """
         Check if any valid route exists from start to end.
 
-        Run a simple BFS at turn 0 to verify reachability, applying the same
-        node/edge validity rules as the routing algorithm.
+        Search at turn 0 with the same node and edge validity rules as the
+        routing algorithm. Frontiers grow from both ends, always expanding
+        the smaller one, and the search stops when they meet.
 
         Returns
         -------
@@ -381,40 +1416,432 @@ class Map():
         assert self.start_hub is not None
         assert self.end_hub is not None
 
-        queue: deque[Hub | Connection] = deque([self.start_hub])
-        visited: set[Hub | Connection] = {self.start_hub}
+        forward: set[Hub | Connection] = {self.start_hub}
+        backward: set[Hub | Connection] = {self.end_hub}
+        forward_front: list[Hub | Connection] = [self.start_hub]
+        backward_front: list[Hub | Connection] = [self.end_hub]
+
+        while forward_front and backward_front:
+            front: list[Hub | Connection] = []
+            if len(forward_front) <= len(backward_front):
+                for node in forward_front:
+                    for dest, _ in self.successors(node, 0):
+                        if dest in backward:
+                            return True
+                        if dest not in forward:
+                            forward.add(dest)
+                            front.append(dest)
+                forward_front = front
+            else:
+                for node in backward_front:
+                    for src, _ in self.predecessors(node, 0):
+                        if src in forward:
+                            return True
+                        if src not in backward and self.is_node_valid(src, 0):
+                            backward.add(src)
+                            front.append(src)
+                backward_front = front
+        return False
 
-        while queue:
-            node: Hub | Connection = queue.popleft()
+    def expand_forward(
+        self,
+        layers: list[dict[Hub | Connection, tuple[int, Hub | Connection]]],
+        depth: dict[Hub | Connection, int],
+        start_turn: int
+    ) -> None:
+        """
+        Add one forward layer to a bidirectional search.
+
+        Parameters
+        ----------
+        layers
+            Forward layers, mapping nodes to (priority, parent).
+        depth
+            Layer index of every node reached so far.
+        start_turn
+            Last turn spent on the start hub.
+        """
+        front: dict[Hub | Connection, tuple[int, Hub | Connection]] = {}
+        for node, (prio, _) in layers[-1].items():
+            for dest, bonus in self.successors(node, start_turn + len(layers)):
+                if dest in depth and dest not in front:
+                    continue
+                if dest not in front or prio + bonus > front[dest][0]:
+                    front[dest] = (prio + bonus, node)
+                    depth[dest] = len(layers)
+        layers.append(front)
 
-            if node == self.end_hub:
-                return True
+    def expand_backward(
+        self,
+        layers: list[dict[Hub | Connection, tuple[int, Hub | Connection]]],
+        depth: dict[Hub | Connection, int],
+        start_turn: int,
+        end_turn: int
+    ) -> None:
+        """
+        Add one backward layer to a bidirectional search.
 
-            if isinstance(node, Hub):
-                for c in node.linked:
-                    if not self.is_node_valid(c, 0):
+        Parameters
+        ----------
+        layers
+            Backward layers, mapping nodes to (priority gain, next node).
+        depth
+            Layer index of every node reached so far.
+        start_turn
+            Last turn spent on the start hub.
+        end_turn
+            Turn at which the drone must reach the end hub.
+        """
+        turn: int = end_turn - len(layers)
+        front: dict[Hub | Connection, tuple[int, Hub | Connection]] = {}
+        for node, (gain, _) in layers[-1].items():
+            for src, bonus in self.predecessors(node, turn + 1):
+                if src in depth and src not in front:
+                    continue
+                # the start hub is only left at start_turn
+                if src == self.start_hub:
+                    if turn != start_turn:
                         continue
+                elif not self.is_node_valid(src, turn):
+                    continue
+                if src not in front or gain + bonus > front[src][0]:
+                    front[src] = (gain + bonus, node)
+                    depth[src] = len(layers)
+        layers.append(front)
 
-                    a, b = c.linked
-                    dest: Hub = b if node is a else a
+    def find_best_path_bidirectional(self, drone: Drone) -> Route:
+        """
+        Find the best path for one drone with a bidirectional search.
+
+        For each start turn, first try to connect start and end with a path
+        of the static shortest length, growing a forward frontier from the
+        start hub and a backward frontier from the end hub at the matching
+        arrival turn until they meet. If they do not, the forward layers
+        already built are extended into the regular search of
+        find_best_path. Maps with hubs costing more than 2 turns are
+        planned by find_best_path.
+
+        Parameters
+        ----------
+        drone
+            Drone to route.
 
-                    if dest.zone == "restricted":
-                        if c not in visited:
-                            visited.add(c)
-                            queue.append(c)
+        Returns
+        -------
+        Route
+            Route of this drone.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised if the end hub cannot be reached.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
+
+        # layers move one turn at a time, which only models costs up to 2
+        if any(isinstance(n, Hub) and n.cost > 2 for n in self.active):
+            return self.find_best_path(drone)
+
+        distances: dict[Hub | Connection, int] = self.distances_to_end()
+        if self.start_hub not in distances:
+            raise RuntimeError("can't find any existing path")
+        length: int = distances[self.start_hub]
+
+        start_turn: int = 0
+        while True:
+            forward: list[
+                dict[Hub | Connection, tuple[int, Hub | Connection]]
+            ] = [{self.start_hub: (0, self.start_hub)}]
+            forward_depth: dict[Hub | Connection, int] = {self.start_hub: 0}
+            backward: list[
+                dict[Hub | Connection, tuple[int, Hub | Connection]]
+            ] = [{self.end_hub: (0, self.end_hub)}]
+            backward_depth: dict[Hub | Connection, int] = {self.end_hub: 0}
+            if not self.is_node_valid(self.end_hub, start_turn + length):
+                backward[0].clear()
+
+            # meet in the middle with a path of the shortest length
+            while (
+                forward[-1] and backward[-1]
+                and len(forward) + len(backward) - 2 < length
+            ):
+                if len(forward[-1]) <= len(backward[-1]):
+                    self.expand_forward(forward, forward_depth, start_turn)
+                else:
+                    self.expand_backward(
+                        backward, backward_depth, start_turn,
+                        start_turn + length
+                    )
+
+            meet: Hub | Connection | None = None
+            best: int = -1
+            for node, b in backward_depth.items():
+                a: int | None = forward_depth.get(node)
+                if a is None or a + b != length:
+                    continue
+                score: int = forward[a][node][0] + backward[b][node][0]
+                if score > best:
+                    meet, best = node, score
+
+            # otherwise keep searching forward only
+            if meet is None:
+                while forward[-1] and self.end_hub not in forward_depth:
+                    self.expand_forward(forward, forward_depth, start_turn)
+                if self.end_hub not in forward_depth:
+                    start_turn = self.delay(start_turn)
+                    continue
+                meet = self.end_hub
+
+            path: list[Hub | Connection] = [meet]
+            for layer in reversed(forward[1:forward_depth[meet] + 1]):
+                path.append(layer[path[-1]][1])
+            path.reverse()
+            if meet in backward_depth and meet != self.end_hub:
+                for layer in reversed(backward[1:backward_depth[meet] + 1]):
+                    path.append(layer[path[-1]][1])
+            return Route.from_nodes(self.start_hub, start_turn, path[1:])
+
+    def find_compressed_path(self, drone: Drone) -> Route:
+        """
+        Find the best path for one drone on the compressed graph.
+
+        Same rules and tie-breaking as find_best_path, so routes are the
+        same, but hub chains are crossed in one move, each move being
+        checked turn by turn. The result is expanded back into per-turn
+        hubs and connections.
+
+        Parameters
+        ----------
+        drone
+            Drone to route.
+
+        Returns
+        -------
+        Route
+            Route of this drone.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
+
+        if self.corridors is None:
+            self.corridors = compress(self)
+
+        start_turn: int = 0
+        while True:
+            # (turns, order of the hub first reached from, move index, hub
+            # id) pops hubs in the order find_best_path scans them, so
+            # the first parent found is the one it keeps on ties
+            heap: list[tuple[int, int, int, int]] = [
+                (0, 0, 0, self.start_hub.id)
+            ]
+            step: dict[Hub, int] = {self.start_hub: 0}
+            priority: dict[Hub, int] = {self.start_hub: 0}
+            parent: dict[Hub, Corridor] = {}
+            # chain hubs are scanned one by one, already checked, to keep
+            # the order of the hubs reached from them
+            chain: dict[Hub, tuple[Corridor, int]] = {}
+            closed: set[Hub] = set()
+
+            while heap:
+                g, _, _, hub_id = heapq.heappop(heap)
+                hub: Hub | Connection = self.nodes[hub_id]
+                assert isinstance(hub, Hub)
+                closed.add(hub)
+                scanned: int = len(closed)
+                if hub == self.end_hub:
+                    break
+
+                # corridors to follow, from their n-th chain hub
+                ahead: list[tuple[Corridor, int, int]] = []
+                if hub in chain:
+                    corridor, n = chain[hub]
+                    ahead.append((corridor, n + 1, 0))
+                for k, corridor in enumerate(self.corridors.get(hub, [])):
+                    dest: Hub = corridor.dest
+                    g_dest: int = g + corridor.length
+                    if dest in closed or (
+                        dest in step and step[dest] < g_dest
+                    ):
                         continue
-                    else:
-                        if not self.is_node_valid(dest, 0):
+                    prio: int = priority[hub] + (
+                        1 if dest.zone == "priority" else 0
+                    )
+                    if dest in step and step[dest] == g_dest and (
+                        prio <= priority[dest]
+                    ):
+                        continue
+                    if corridor.is_free(self, start_turn + g):
+                        ahead.append((corridor, 0, k))
+
+                for corridor, n, k in ahead:
+                    if n < len(corridor.hubs):
+                        chain_hub: Hub = corridor.hubs[n]
+                        # reached from the other end first
+                        if chain_hub in step:
                             continue
+                        step[chain_hub] = g + 1
+                        priority[chain_hub] = priority[hub]
+                        chain[chain_hub] = (corridor, n)
+                        heapq.heappush(
+                            heap, (g + 1, scanned, k, chain_hub.id)
+                        )
+                        continue
+                    dest = corridor.dest
+                    g_dest = g + dest.cost
+                    prio = priority[hub] + (
+                        1 if dest.zone == "priority" else 0
+                    )
+                    if dest in closed or dest in step and (
+                        step[dest], -priority[dest]
+                    ) <= (g_dest, -prio):
+                        continue
+                    if dest not in step or step[dest] > g_dest:
+                        heapq.heappush(heap, (g_dest, scanned, k, dest.id))
+                    step[dest] = g_dest
+                    priority[dest] = prio
+                    parent[dest] = corridor
 
-                    if dest not in visited:
-                        visited.add(dest)
-                        queue.append(dest)
-            else:
-                for dest in node.linked:
-                    if not self.is_node_valid(dest, 0):
+            # must wait
+            if self.end_hub not in closed:
+                start_turn = self.delay(start_turn)
+                continue
+
+            moves: list[Corridor] = []
+            node: Hub = self.end_hub
+            while node != self.start_hub:
+                moves.append(parent[node])
+                node = parent[node].origin
+            path: list[Hub | Connection] = []
+            for corridor in reversed(moves):
+                path.extend(corridor.nodes())
+            return Route.from_nodes(self.start_hub, start_turn, path)
+
+    def find_safe_interval_path(self, drone: Drone) -> Route:
+        """
+        Find the earliest arrival path for one drone with SIPP.
+
+        Safe Interval Path Planning: a state is a hub and one of its safe
+        intervals, a maximal range of turns with room left. Waiting is
+        allowed on hubs, so a drone can let a congested connection clear
+        on the way instead of delaying its departure. States are expanded
+        in A* order using distances_to_end as heuristic.
+
+        Parameters
+        ----------
+        drone
+            Drone to route.
+
+        Returns
+        -------
+        Route
+            Route of this drone.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised if the end hub cannot be reached by moves starting up
+            to MAX_TURN.
+        """
+        assert self.start_hub is not None
+        assert self.end_hub is not None
+
+        h: dict[Hub | Connection, int] = self.distances_to_end()
+        intervals: dict[Hub, list[tuple[int, int]]] = {}
+
+        def safe(hub: Hub) -> list[tuple[int, int]]:
+            if hub not in intervals:
+                intervals[hub] = (
+                    [] if hub.zone == "blocked"
+                    else self.context.reserved[hub.id].safe_intervals(
+                        hub.max_drones
+                    )
+                )
+            return intervals[hub]
+
+        # state: hub and the first turn of its safe interval
+        State = tuple[Hub, int]
+        # waits on the start hub are never stored, so it is always safe
+        start: State = (self.start_hub, 0)
+        ends: dict[State, int] = {start: FOREVER}
+        arrival: dict[State, int] = {start: 0}
+        priority: dict[State, int] = {start: 0}
+        # state -> (previous state, connection, turn it is entered)
+        parent: dict[State, tuple[State, Connection, int]] = {}
+        closed: set[State] = set()
+
+        count: int = 0
+        heap: list[tuple[int, int, int, int, State]] = [
+            (h[self.start_hub], 0, 0, count, start)
+        ]
+        goal: State | None = None
+        while heap:
+            _, t, neg_prio, _, state = heapq.heappop(heap)
+            if state in closed or (t, -neg_prio) != (
+                arrival[state], priority[state]
+            ):
+                continue
+            closed.add(state)
+            hub: Hub = state[0]
+            if hub is self.end_hub:
+                goal = state
+                break
+
+            # latest turn the drone can move off hub
+            leave_by: int = ends[state]
+            for c in self.links[hub]:
+                a, b = c.linked
+                dest: Hub = b if hub is a else a
+                if dest not in h:
+                    continue
+                # turns from leaving hub to being on dest
+                offset: int = dest.cost
+                for begin, end in safe(dest):
+                    if begin - offset + 1 > leave_by:
+                        break
+                    if end - offset < t + 1:
                         continue
-                    if dest not in visited:
-                        visited.add(dest)
-                        queue.append(dest)
-        return False
+                    x: int = self.earliest_free(
+                        c, max(t + 1, begin - offset + 1), max(offset - 1, 1)
+                    )
+                    # no move starts past the horizon
+                    if x > min(leave_by, end - offset, MAX_TURN):
+                        continue
+                    key: State = (dest, begin)
+                    reached: int = x + offset - 1
+                    prio: int = priority[state] + (
+                        1 if dest.zone == "priority" else 0
+                    )
+                    if key in closed or key in arrival and (
+                        (arrival[key], -priority[key]) <= (reached, -prio)
+                    ):
+                        continue
+                    ends[key] = end
+                    arrival[key] = reached
+                    priority[key] = prio
+                    parent[key] = (state, c, x)
+                    count += 1
+                    heapq.heappush(
+                        heap, (reached + h[dest], reached, -prio, count, key)
+                    )
+
+        if goal is None:
+            raise RuntimeError(
+                f"can't find any path moving before turn {MAX_TURN}"
+            )
+
+        moves: list[tuple[Connection, Hub, int, int]] = []
+        state = goal
+        while state != start:
+            prev, c, x = parent[state]
+            moves.append((c, state[0], x, arrival[state]))
+            state = prev
+        moves.reverse()
+
+        hops: list[tuple[Hub | Connection, int]] = []
+        for i, (c, dest, x, reached) in enumerate(moves):
+            if reached > x:
+                hops.append((c, reached - x))
+            leave: int = moves[i + 1][2] if i + 1 < len(moves) else reached + 1
+            hops.append((dest, leave - reached))
+        return Route(self.start_hub, moves[0][2] - 1, hops)
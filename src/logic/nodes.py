@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
 
-from src.logic import Drone
-
 
 class Hub():
     """
@@ -16,12 +14,13 @@ class Hub():
         color: str,
         max_drones: int,
         start_hub: bool = False,
-        end_hub: bool = False
+        end_hub: bool = False,
+        cost: int | None = None
     ) -> None:
         """
         Create a Hub.
 
-        Store hub metadata and initialize links and occupancy tracking.
+        Store hub metadata and initialize links.
 
         Parameters
         ----------
@@ -41,9 +40,13 @@ class Hub():
             Whether this hub is the start hub.
         end_hub
             Whether this hub is the end hub.
+        cost
+            Turns taken to enter the hub, 2 for restricted zones and 1
+            otherwise by default.
         """
+        # index in Map.nodes, set by the owning Map
+        self.id: int = 0
         self.linked: list[Connection] = []
-        self.drones: dict[int, list[Drone]] = {}
 
         self.name: str = name
         self.x: int | float = x
@@ -53,6 +56,10 @@ class Hub():
         self.max_drones: int = max_drones
         self.start_hub: bool = start_hub
         self.end_hub: bool = end_hub
+        # the turns before the last one are spent on the connection
+        self.cost: int = (
+            cost if cost is not None else 2 if zone == "restricted" else 1
+        )
 
     class Validate(BaseModel):
         """
@@ -76,6 +83,8 @@ class Hub():
             Whether this hub is the start hub.
         end_hub
             Whether this hub is the end hub.
+        cost
+            Turns taken to enter the hub, zone default if unset.
         """
         model_config = ConfigDict(extra="forbid")
 
@@ -87,6 +96,7 @@ class Hub():
         # in case it is a start or end hub
         start_hub: bool = False
         end_hub: bool = False
+        cost: int | None = Field(default=None, ge=1)
 
 
 class Connection():
@@ -97,7 +107,7 @@ class Connection():
         """
         Create a Connection.
 
-        Link the hubs and initialize per-turn capacity tracking.
+        Link the hubs. Reservations are kept by the solve context.
 
         Parameters
         ----------
@@ -108,11 +118,10 @@ class Connection():
         max_drones
             Maximum drones on the connection.
         """
+        # index in Map.nodes, set by the owning Map
+        self.id: int = 0
         self.name: str = f"{a.name}/{b.name}"
-        self.drones: dict[int, list[Drone]] = {}
         self.linked: list[Hub] = []
-
-        self.drone_count: dict[int, int] = {}
         self.max_drones: int = max_drones
 
         self.linked.append(a)
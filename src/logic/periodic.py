@@ -0,0 +1,448 @@
+from math import ceil
+from typing import TYPE_CHECKING, Iterator
+
+from src.logic import Hub, Connection
+from src.logic.flow import min_cost_flow
+from src.logic.route import Route
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+# (route, departure turn modulo the period, drones leaving each period)
+Lane = tuple[Route, int, int]
+
+
+def steady_lanes(m: "Map", period: int) -> list[Lane]:
+    """
+    Fit the routes of a min-cost flow into a repeating pattern.
+
+    Each drone of the flow gets the first departure turn modulo the
+    period whose nodes still have room in a reservation table indexed by
+    turn modulo the period, or is dropped. Repeating the pattern every
+    period turns, forever, then never overloads a node.
+
+    Parameters
+    ----------
+    m
+        Map to route on, reduced.
+    period
+        Turns after which the pattern repeats.
+
+    Returns
+    -------
+    list[Lane]
+        Departure lanes, cheapest routes first.
+    """
+    assert m.start_hub is not None
+
+    # drones on each node at each turn modulo the period
+    table: dict[Hub | Connection, list[int]] = {}
+    lanes: dict[tuple[int, int], Lane] = {}
+    for i, (nodes, rate) in enumerate(min_cost_flow(m, period)):
+        route: Route = Route.from_nodes(m.start_hub, 0, nodes[1:])
+        held: list[tuple[Hub | Connection, int]] = []
+        prev: Hub | Connection = route.start
+        for entry, node, dwell in route.steps():
+            if isinstance(prev, Hub) and isinstance(node, Hub):
+                held.append((m.get_connection(prev, node), entry))
+            if node is not m.end_hub:
+                held.extend((node, entry + k) for k in range(dwell))
+            prev = node
+
+        for _ in range(rate):
+            for phase in range(period):
+                if all(
+                    table.get(node, [0] * period)[(phase + turn) % period]
+                    < node.max_drones
+                    for node, turn in held
+                ):
+                    break
+            else:
+                continue
+            for node, turn in held:
+                table.setdefault(node, [0] * period)[
+                    (phase + turn) % period
+                ] += 1
+            _, _, count = lanes.get((i, phase), (route, phase, 0))
+            lanes[(i, phase)] = (route, phase, count + 1)
+    return [lanes[key] for key in sorted(lanes)]
+
+
+class PeriodicSchedule():
+    """
+    Schedule repeating one steady-state pattern, for huge fleets.
+
+    Routes of a min-cost flow are fitted into a pattern repeating every
+    period turns: each lane lets its drones leave the start hub on one
+    turn of the period, as long as they arrive by the horizon. The turn
+    count is found from the lanes alone, and drones, logs and occupancy
+    rows are derived on demand from (departure, lane, rank), so building
+    the schedule does not depend on the number of drones.
+    """
+    def __init__(self, m: "Map") -> None:
+        """
+        Compute the pattern of a map.
+
+        Periods up to the longest hub cost are tried, since a connection
+        held k turns by each drone may only fit a fraction of a drone per
+        turn, and the one with the highest throughput is kept.
+
+        Parameters
+        ----------
+        m
+            Map to plan, reduced first.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised if no route reaches the end hub.
+        """
+        m.reduce()
+        longest: int = max(
+            (n.cost - 1 for n in m.active if isinstance(n, Hub)), default=1
+        )
+        best: tuple[float, int, list[Lane]] = (0, 1, [])
+        for period in range(1, max(longest, 1) + 1):
+            lanes: list[Lane] = steady_lanes(m, period)
+            throughput: float = sum(count for _, _, count in lanes) / period
+            if throughput > best[0]:
+                best = (throughput, period, lanes)
+        if best[0] == 0:
+            raise RuntimeError("can't find any existing path")
+
+        self.map: "Map" = m
+        self.nb_drones: int = m.nb_drones
+        self.period: int = best[1]
+        # shortest routes first, then routes through priority hubs
+        best[2].sort(key=lambda lane: (len(lane[0]), -sum(
+            1 for n in lane[0].nodes()
+            if isinstance(n, Hub) and n.zone == "priority"
+        )))
+        # hops of each lane, for a drone leaving on turn 0
+        self.templates: list[Route] = [route for route, _, _ in best[2]]
+        self.phases: list[int] = [phase for _, phase, _ in best[2]]
+        self.rates: list[int] = [count for _, _, count in best[2]]
+        # turns from departure to arrival
+        self.lengths: list[int] = [route.arrival for route in self.templates]
+
+        self.horizon: int = self.earliest_horizon()
+        # last departure of each lane arriving by the horizon, -1 if none
+        self.last: list[int] = []
+        for length, phase in zip(self.lengths, self.phases):
+            latest: int = self.horizon - length - phase
+            self.last.append(
+                phase + latest // self.period * self.period
+                if latest >= 0 else -1
+            )
+        # departure of the last drone, the only one that may be partial
+        lo: int = 0
+        hi: int = self.horizon
+        while lo < hi:
+            mid: int = (lo + hi) // 2
+            if self.departed(mid + 1) >= self.nb_drones:
+                hi = mid
+            else:
+                lo = mid + 1
+        self.final: int = lo
+
+    @property
+    def turn_count(self) -> int:
+        """
+        Get the turn count of the schedule.
+
+        Returns
+        -------
+        int
+            Turns from turn 0 to the last arrival, both included.
+        """
+        return self.horizon + 1
+
+    def departures(self, i: int, turn: int, last: int) -> int:
+        """
+        Count the departure turns of a lane up to a turn.
+
+        Parameters
+        ----------
+        i
+            Lane index.
+        turn
+            Last turn counted.
+        last
+            Last departure turn of the lane.
+
+        Returns
+        -------
+        int
+            Departure turns of the lane, not after turn nor last.
+        """
+        latest: int = min(turn, last) - self.phases[i]
+        return latest // self.period + 1 if latest >= 0 else 0
+
+    def capacity(self, horizon: int) -> int:
+        """
+        Count the drones that can arrive by a turn.
+
+        Parameters
+        ----------
+        horizon
+            Last arrival turn.
+
+        Returns
+        -------
+        int
+            Departures of every lane arriving by the horizon.
+        """
+        return sum(
+            rate * self.departures(i, horizon - length, horizon - length)
+            for i, (rate, length) in enumerate(zip(self.rates, self.lengths))
+        )
+
+    def earliest_horizon(self) -> int:
+        """
+        Find the earliest turn every drone can arrive by.
+
+        Returns
+        -------
+        int
+            Smallest horizon whose capacity holds every drone.
+        """
+        lo: int = min(self.lengths)
+        hi: int = max(self.lengths) + self.period * (
+            ceil(self.nb_drones / sum(self.rates)) + 1
+        )
+        while lo < hi:
+            mid: int = (lo + hi) // 2
+            if self.capacity(mid) >= self.nb_drones:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def departed(self, turn: int) -> int:
+        """
+        Count the drones leaving the start hub before a turn.
+
+        Parameters
+        ----------
+        turn
+            Turn to count up to, excluded.
+
+        Returns
+        -------
+        int
+            Drones whose departure is before the turn.
+        """
+        total: int = sum(
+            rate * self.departures(i, turn - 1, last)
+            for i, (rate, last) in enumerate(zip(self.rates, self.last))
+        )
+        return min(total, self.nb_drones)
+
+    def slots(self, departure: int) -> list[tuple[int, int]]:
+        """
+        Get the drones leaving on each lane at a given turn.
+
+        Drones are numbered by departure, then by lane.
+
+        Parameters
+        ----------
+        departure
+            Departure turn.
+
+        Returns
+        -------
+        list[tuple[int, int]]
+            Index of the first drone and number of drones, for each lane.
+        """
+        if departure < 0 or departure > self.final:
+            return [(0, 0)] * len(self.rates)
+        first: int = self.departed(departure)
+        slots: list[tuple[int, int]] = []
+        for i, rate in enumerate(self.rates):
+            if not self.slot_open(i, departure):
+                slots.append((0, 0))
+                continue
+            slots.append((first, max(0, min(rate, self.nb_drones - first))))
+            first += rate
+        return slots
+
+    def slot_open(self, i: int, departure: int) -> bool:
+        """
+        Check if a lane lets drones leave at a given turn.
+
+        Parameters
+        ----------
+        i
+            Lane index.
+        departure
+            Departure turn.
+
+        Returns
+        -------
+        bool
+            True if the turn is a departure turn of the lane.
+        """
+        return (
+            self.phases[i] <= departure <= self.last[i]
+            and (departure - self.phases[i]) % self.period == 0
+        )
+
+    def arrived(self, turn: int) -> int:
+        """
+        Count the drones on the end hub at a given turn.
+
+        Parameters
+        ----------
+        turn
+            Turn index.
+
+        Returns
+        -------
+        int
+            Drones whose arrival is not after the turn.
+        """
+        total: int = 0
+        for i, length in enumerate(self.lengths):
+            latest: int = turn - length
+            total += self.rates[i] * self.departures(
+                i, latest, min(self.last[i], self.final - 1)
+            )
+            if latest >= self.final:
+                total += self.slots(self.final)[i][1]
+        return total
+
+    def occupancy_row(self, turn: int) -> list[int]:
+        """
+        Count the drones displayed on every node at a given turn.
+
+        Parameters
+        ----------
+        turn
+            Turn index.
+
+        Returns
+        -------
+        list[int]
+            Drone count of each node, indexed by node id, as
+            Map.occupancy_row.
+        """
+        assert self.map.start_hub is not None
+        assert self.map.end_hub is not None
+
+        row: list[int] = [0] * len(self.map.nodes)
+        slots: dict[int, list[tuple[int, int]]] = {}
+        for i, template in enumerate(self.templates):
+            for entry, node, dwell in template.steps():
+                if node is self.map.end_hub:
+                    continue
+                for departure in range(
+                    turn - entry - dwell + 1, turn - entry + 1
+                ):
+                    if departure not in slots:
+                        slots[departure] = self.slots(departure)
+                    row[node.id] += slots[departure][i][1]
+        row[self.map.start_hub.id] = self.nb_drones - self.departed(turn)
+        row[self.map.end_hub.id] = self.arrived(turn)
+        return row
+
+    def drone_turns(self) -> list[int]:
+        """
+        Sum the turns drones hold every node over the schedule.
+
+        Nodes are counted as Map.reserve_path reserves them, once per
+        lane times the drones leaving on it, so the sums are those of
+        Congestion without going through every drone.
+
+        Returns
+        -------
+        list[int]
+            Drone-turns of each node, indexed by node id.
+        """
+        totals: list[int] = [0] * len(self.map.nodes)
+        last_slots: list[tuple[int, int]] = self.slots(self.final)
+        for i, template in enumerate(self.templates):
+            drones: int = self.rates[i] * self.departures(
+                i, self.final - 1, self.last[i]
+            ) + last_slots[i][1]
+            prev: Hub | Connection = template.start
+            for _, node, dwell in template.steps():
+                if isinstance(prev, Hub) and isinstance(node, Hub):
+                    totals[self.map.get_connection(prev, node).id] += drones
+                totals[node.id] += drones * dwell
+                prev = node
+        return totals
+
+    def route(self, drone: int) -> Route:
+        """
+        Get the route of one drone.
+
+        Parameters
+        ----------
+        drone
+            Drone index, from 0.
+
+        Returns
+        -------
+        Route
+            Route of this drone.
+
+        Raises
+        ------
+        IndexError:
+            Raised if there is no such drone.
+        """
+        assert self.map.start_hub is not None
+
+        lo: int = 0
+        hi: int = self.final
+        while lo < hi:
+            mid: int = (lo + hi + 1) // 2
+            if self.departed(mid) <= drone:
+                lo = mid
+            else:
+                hi = mid - 1
+        for template, (first, count) in zip(self.templates, self.slots(lo)):
+            if first <= drone < first + count:
+                return Route(self.map.start_hub, lo, template.hops)
+        raise IndexError(f"no drone {drone}")
+
+    def routes(self) -> Iterator[Route]:
+        """
+        Iterate over the routes of every drone.
+
+        Yields
+        ------
+        Route
+            Route of each drone, in drone order.
+        """
+        assert self.map.start_hub is not None
+
+        for departure in range(self.final + 1):
+            for template, (_, count) in zip(
+                self.templates, self.slots(departure)
+            ):
+                for _ in range(count):
+                    yield Route(self.map.start_hub, departure, template.hops)
+
+    def display_logs(self) -> None:
+        """
+        Print per-turn movement logs, as Map.display_logs.
+
+        Each turn is built from the lanes and departures entering a hop on
+        it, so memory does not grow with the number of drones.
+        """
+        for turn in range(1, self.turn_count):
+            moves: list[tuple[int, str]] = []
+            slots: dict[int, list[tuple[int, int]]] = {}
+            for i, template in enumerate(self.templates):
+                for entry, node, _ in template.steps():
+                    departure: int = turn - entry
+                    if departure not in slots:
+                        slots[departure] = self.slots(departure)
+                    first, count = slots[departure][i]
+                    moves.extend(
+                        (first + k, node.name) for k in range(count)
+                    )
+            moves.sort()
+            print(" ".join(f"D{d + 1}-{name}" for d, name in moves))
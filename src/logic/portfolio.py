@@ -0,0 +1,128 @@
+import time
+import multiprocessing as mp
+from multiprocessing.process import BaseProcess
+from queue import Empty
+from typing import Any
+
+from src.logic import Map
+from src.logic.map import STRATEGIES
+from src.logic.shared import SharedMap, Handle, attach
+
+
+DEADLINE: float = 10
+
+
+def plan_worker(handle: Handle, strategy: str, results: Any) -> None:
+    """
+    Plan a map with one strategy and send back the schedule.
+
+    Run inside a worker process, on a Map of its own.
+
+    Parameters
+    ----------
+    handle
+        Shared map to plan, see SharedMap.handle.
+    strategy
+        Planning strategy, one of STRATEGIES.
+    results
+        Queue receiving (strategy, turn_count, routes, error) tuples,
+        routes being encoded with Route.encode.
+    """
+    try:
+        with attach(handle) as m:
+            drones, routes = m.plan(strategy)
+        results.put((
+            strategy,
+            max(len(r) for r in routes.values()),
+            [routes[d].encode() for d in drones],
+            None
+        ))
+    except (RuntimeError, AssertionError) as e:
+        results.put((strategy, 0, [], str(e)))
+
+
+def race(
+    map_specs: dict[str, Any],
+    deadline: float = DEADLINE,
+    strategies: tuple[str, ...] = STRATEGIES
+) -> tuple[str, int, list[tuple[int, list[tuple[int, int]]]]]:
+    """
+    Race several planning strategies in separate processes.
+
+    Keep the schedule with the lowest turn count. Remaining workers are
+    terminated as soon as a schedule reaches the map lower bound, or when
+    the deadline expires.
+
+    Parameters
+    ----------
+    map_specs
+        Validated map specs from the parser.
+    deadline
+        Time budget in seconds.
+    strategies
+        Strategies to race, earlier ones win ties.
+
+    Returns
+    -------
+    tuple[str, int, list[tuple[int, list[tuple[int, int]]]]]
+        Winning strategy, its turn count and its encoded routes, to be
+        loaded with Map.apply_paths.
+
+    Raises
+    ------
+    RuntimeError:
+        Raised if no strategy produced a schedule before the deadline.
+    """
+    m: Map = Map(**map_specs)
+    lower_bound: int = m.lower_bound()
+    # reduced once, every worker maps the same block
+    shared: SharedMap = SharedMap(m)
+    ctx = mp.get_context()
+    results: Any = ctx.Queue()
+    workers: list[BaseProcess] = [
+        ctx.Process(
+            target=plan_worker, args=(shared.handle, s, results),
+            daemon=True
+        )
+        for s in strategies
+    ]
+    for w in workers:
+        w.start()
+
+    end_time: float = time.monotonic() + deadline
+    best: tuple[
+        str, int, list[tuple[int, list[tuple[int, int]]]]
+    ] | None = None
+    errors: list[str] = []
+    try:
+        for _ in workers:
+            if best is not None and best[1] <= lower_bound:
+                break
+            remaining: float = end_time - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                strategy, turn_count, routes, error = results.get(
+                    timeout=remaining
+                )
+            except Empty:
+                break
+            if error is not None:
+                errors.append(f"{strategy}: {error}")
+                continue
+            if best is None or (
+                turn_count, strategies.index(strategy)
+            ) < (best[1], strategies.index(best[0])):
+                best = (strategy, turn_count, routes)
+    finally:
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+            w.join()
+        shared.close()
+
+    if best is None:
+        if errors:
+            raise RuntimeError(errors[0])
+        raise RuntimeError("no strategy finished before the deadline")
+    return best
@@ -0,0 +1,152 @@
+from bisect import bisect_right
+from typing import Iterator
+
+from src.logic import Hub, Connection
+
+
+class Route():
+    """
+    Run-length path of one drone.
+
+    The drone stays on the start hub up to its departure turn, then goes
+    through hops, each being a node and the number of turns spent on it.
+    Once the last hop is reached, the drone stays there.
+    """
+    def __init__(
+        self,
+        start: Hub,
+        departure: int,
+        hops: list[tuple[Hub | Connection, int]]
+    ) -> None:
+        """
+        Create a Route.
+
+        Parameters
+        ----------
+        start
+            Start hub.
+        departure
+            Last turn spent on the start hub.
+        hops
+            Nodes visited after the start hub, with their dwell counts.
+        """
+        self.start: Hub = start
+        self.departure: int = departure
+        self.hops: list[tuple[Hub | Connection, int]] = hops
+
+        # turn at which each hop is entered
+        self.turns: list[int] = []
+        turn: int = departure + 1
+        for _, dwell in hops:
+            self.turns.append(turn)
+            turn += dwell
+
+    @classmethod
+    def from_nodes(
+        cls, start: Hub, departure: int, nodes: list[Hub | Connection]
+    ) -> "Route":
+        """
+        Build a route from per-turn nodes.
+
+        Parameters
+        ----------
+        start
+            Start hub.
+        departure
+            Last turn spent on the start hub.
+        nodes
+            Node occupied on each turn after departure.
+
+        Returns
+        -------
+        Route
+            Route with consecutive identical nodes merged.
+        """
+        hops: list[tuple[Hub | Connection, int]] = []
+        for node in nodes:
+            if hops and hops[-1][0] is node:
+                hops[-1] = (node, hops[-1][1] + 1)
+            else:
+                hops.append((node, 1))
+        return cls(start, departure, hops)
+
+    def __len__(self) -> int:
+        """
+        Get the number of turns of the route.
+
+        Returns
+        -------
+        int
+            Turns from turn 0 to the arrival turn, both included.
+        """
+        if not self.hops:
+            return self.departure + 1
+        return self.turns[-1] + self.hops[-1][1]
+
+    @property
+    def arrival(self) -> int:
+        """
+        Get the arrival turn.
+
+        Returns
+        -------
+        int
+            Turn at which the last hop is entered.
+        """
+        return self.turns[-1] if self.hops else self.departure
+
+    def position(self, turn: int) -> Hub | Connection:
+        """
+        Get the node occupied at a given turn.
+
+        Parameters
+        ----------
+        turn
+            Turn to look up.
+
+        Returns
+        -------
+        Hub | Connection
+            Node occupied at this turn.
+        """
+        i: int = bisect_right(self.turns, turn) - 1
+        if i < 0:
+            return self.start
+        return self.hops[i][0]
+
+    def steps(self) -> Iterator[tuple[int, Hub | Connection, int]]:
+        """
+        Iterate over the hops with their timing.
+
+        Yields
+        ------
+        tuple[int, Hub | Connection, int]
+            Entry turn, node and dwell count of each hop.
+        """
+        for turn, (node, dwell) in zip(self.turns, self.hops):
+            yield turn, node, dwell
+
+    def nodes(self) -> list[Hub | Connection]:
+        """
+        Expand the route into per-turn nodes.
+
+        Returns
+        -------
+        list[Hub | Connection]
+            Node occupied on each turn, from turn 0 to arrival.
+        """
+        nodes: list[Hub | Connection] = [self.start] * (self.departure + 1)
+        for node, dwell in self.hops:
+            nodes.extend([node] * dwell)
+        return nodes
+
+    def encode(self) -> tuple[int, list[tuple[int, int]]]:
+        """
+        Encode the route with node ids.
+
+        Returns
+        -------
+        tuple[int, list[tuple[int, int]]]
+            Departure turn and (node id, dwell) hops.
+        """
+        return self.departure, [(node.id, dwell) for node, dwell in self.hops]
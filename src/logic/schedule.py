@@ -0,0 +1,106 @@
+from typing import Any
+
+from src.logic import Map, Drone, Hub, Connection
+from src.logic.route import Route
+
+
+class Schedule():
+    """
+    Planned schedule of a map, as plain data.
+
+    Nothing is printed: per-turn moves and log lines are built from the
+    routes on demand, for callers embedding the solver.
+    """
+    def __init__(
+        self,
+        m: Map,
+        drones: list[Drone],
+        routes: dict[Drone, Route],
+        strategy: str
+    ) -> None:
+        """
+        Wrap the routes of a finalized map.
+
+        Parameters
+        ----------
+        m
+            Map the routes are reserved on, finalized.
+        drones
+            Planned drones, in id order.
+        routes
+            Route of each drone.
+        strategy
+            Planning strategy the schedule comes from.
+        """
+        self.map: Map = m
+        self.strategy: str = strategy
+        self.turn_count: int = m.turn_count
+        self.drones: list[Drone] = drones
+        # by drone id
+        self.routes: dict[int, Route] = {d.id: routes[d] for d in drones}
+        # moves of each turn, built by moves
+        self.turns: list[list[tuple[int, Hub | Connection]]] | None = None
+
+    def moves(self, turn: int) -> list[tuple[int, Hub | Connection]]:
+        """
+        Get the moves made on a turn.
+
+        Parameters
+        ----------
+        turn
+            Turn index.
+
+        Returns
+        -------
+        list[tuple[int, Hub | Connection]]
+            Id of each drone entering a node on this turn, with the node,
+            by drone id.
+        """
+        if self.turns is None:
+            self.turns = [[] for _ in range(self.turn_count)]
+            for drone_id, route in self.routes.items():
+                for entered, node, _ in route.steps():
+                    self.turns[entered].append((drone_id, node))
+        if not 0 <= turn < self.turn_count:
+            return []
+        return self.turns[turn]
+
+    def log_lines(self) -> list[str]:
+        """
+        Format the moves as the program prints them.
+
+        Returns
+        -------
+        list[str]
+            Moves of each turn from turn 1 to the last arrival.
+        """
+        return self.map.log_lines(
+            self.drones, {d: self.routes[d.id] for d in self.drones}
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Describe the schedule with built-in types only.
+
+        Returns
+        -------
+        dict[str, Any]
+            strategy and turn_count, the route of each drone id as its
+            departure turn and [node name, turns spent] hops, and moves,
+            the [drone id, node name] pairs of each turn from turn 1.
+        """
+        return {
+            "strategy": self.strategy,
+            "turn_count": self.turn_count,
+            "routes": {
+                drone_id: {
+                    "departure": route.departure,
+                    "hops": [[node.name, dwell] for node, dwell in route.hops]
+                }
+                for drone_id, route in self.routes.items()
+            },
+            "moves": [
+                [[drone_id, node.name] for drone_id, node in self.moves(turn)]
+                for turn in range(1, self.turn_count)
+            ]
+        }
@@ -0,0 +1,332 @@
+import gc
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterator
+
+import numpy as np
+import numpy.typing as npt
+
+from src.logic import Map, Hub, Connection, SolveContext
+from src.logic.layered import LayeredSearch
+from src.logic.timeline import Timelines, Intervals
+
+# name, dtype and length of each array of the block, in order
+Layout = list[tuple[str, str, int]]
+# shared memory block name and its layout, all a worker receives
+Handle = tuple[str, Layout]
+
+IntArray = npt.NDArray[np.int64]
+
+# arrays start on multiples of 8 bytes
+ALIGN: int = 8
+
+
+def text(strings: list[str]) -> npt.NDArray[np.uint8]:
+    """
+    Pack strings into bytes.
+
+    Names come from a line based format, so they never hold a newline.
+
+    Parameters
+    ----------
+    strings
+        Strings to pack.
+
+    Returns
+    -------
+    npt.NDArray[np.uint8]
+        UTF-8 bytes of the strings joined by newlines.
+    """
+    return np.frombuffer("\n".join(strings).encode(), dtype=np.uint8)
+
+
+def timelines(tables: Timelines, size: int) -> Intervals:
+    """
+    Flatten timelines into interval arrays.
+
+    Parameters
+    ----------
+    tables
+        Timeline of each node, by node id.
+    size
+        Number of nodes.
+
+    Returns
+    -------
+    Intervals
+        Offset of the intervals of each node, then one past the last, and
+        the starts and counts of every interval.
+    """
+    ids, starts, counts = tables.intervals()
+    offsets: IntArray = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ids, minlength=size), out=offsets[1:])
+    return offsets, starts, counts
+
+
+def pack(m: Map) -> dict[str, npt.NDArray[Any]]:
+    """
+    Compile a reduced map and its reservations into flat arrays.
+
+    Parameters
+    ----------
+    m
+        Map to compile, reduced first.
+
+    Returns
+    -------
+    dict[str, npt.NDArray[Any]]
+        Arrays by name, see attach for how they are read back.
+    """
+    assert m.start_hub is not None
+    assert m.end_hub is not None
+
+    m.reduce()
+    hubs: list[Hub] = list(m.hubs.values())
+    # zones and colors are a few distinct strings, stored once
+    styles: list[str] = sorted(
+        {h.zone for h in hubs} | {h.color for h in hubs}
+    )
+    style: dict[str, int] = {s: i for i, s in enumerate(styles)}
+    distances: dict[Hub | Connection, int] = m.distances_to_end()
+    graph: dict[str, IntArray] = LayeredSearch.compile(m)
+
+    context: SolveContext = m.context
+    reserved: Intervals = timelines(context.reserved, len(m.nodes))
+    transit: Intervals = timelines(context.transit, len(m.nodes))
+    return {
+        "meta": np.array([
+            m.nb_drones, m.start_hub.id, m.end_hub.id, context.turn_count,
+            context.next_id
+        ], dtype=np.int64),
+        "names": text([h.name for h in hubs]),
+        "styles": text(styles),
+        "hub_x": np.array([h.x for h in hubs], dtype=np.int64),
+        "hub_y": np.array([h.y for h in hubs], dtype=np.int64),
+        "hub_zone": np.array([style[h.zone] for h in hubs], dtype=np.int64),
+        "hub_color": np.array(
+            [style[h.color] for h in hubs], dtype=np.int64
+        ),
+        "hub_max": np.array([h.max_drones for h in hubs], dtype=np.int64),
+        "hub_cost": np.array([h.cost for h in hubs], dtype=np.int64),
+        "conn_a": np.array(
+            [c.linked[0].id for c in m.connections], dtype=np.int64
+        ),
+        "conn_b": np.array(
+            [c.linked[1].id for c in m.connections], dtype=np.int64
+        ),
+        "conn_max": np.array(
+            [c.max_drones for c in m.connections], dtype=np.int64
+        ),
+        # reduced graph, moves leaving each hub from links[id], see
+        # LayeredSearch.compile
+        "links": graph["offsets"],
+        "link_ids": graph["conn"],
+        "dest": graph["dest"],
+        "cost": graph["cost"],
+        "bonus": graph["bonus"],
+        "capacity": graph["capacity"],
+        "active": np.array(
+            [n in m.active for n in m.nodes], dtype=np.bool_
+        ),
+        # -1 where the end hub can't be reached
+        "distances": np.array(
+            [distances.get(n, -1) for n in m.nodes], dtype=np.int64
+        ),
+        "reserved": reserved[0],
+        "reserved_starts": reserved[1],
+        "reserved_counts": reserved[2],
+        "transit": transit[0],
+        "transit_starts": transit[1],
+        "transit_counts": transit[2],
+        "departures": np.array(context.departures, dtype=np.int64),
+        "arrivals": np.array(context.arrivals, dtype=np.int64),
+    }
+
+
+class SharedMap():
+    """
+    Map compiled into one shared memory block, for worker processes.
+
+    Hubs, connections, the reduced graph, static distances to the end hub
+    and the reservations of the current solve are packed into flat
+    arrays once. Workers only receive the block name and its layout, and
+    map the block read-only for as long as they plan, see attach.
+    """
+    def __init__(self, m: Map) -> None:
+        """
+        Pack a map into a new shared memory block.
+
+        Parameters
+        ----------
+        m
+            Map to share, reduced first.
+        """
+        arrays: dict[str, npt.NDArray[Any]] = pack(m)
+        self.layout: Layout = [
+            (name, a.dtype.str, len(a)) for name, a in arrays.items()
+        ]
+        size: int = sum(
+            -(-a.nbytes // ALIGN) * ALIGN for a in arrays.values()
+        )
+        shm: SharedMemory = SharedMemory(create=True, size=max(size, 1))
+        buf: memoryview | None = shm.buf
+        assert buf is not None
+        offset: int = 0
+        for a in arrays.values():
+            buf[offset:offset + a.nbytes] = a.tobytes()
+            offset += -(-a.nbytes // ALIGN) * ALIGN
+        self.shm: SharedMemory | None = shm
+
+    @property
+    def handle(self) -> Handle:
+        """
+        Get what a worker needs to attach the block.
+
+        Returns
+        -------
+        Handle
+            Block name and layout.
+        """
+        assert self.shm is not None
+        return self.shm.name, self.layout
+
+    def close(self) -> None:
+        """
+        Free the block, once no worker attaches it anymore.
+        """
+        if self.shm is None:
+            return
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+
+@contextmanager
+def attach(handle: Handle) -> Iterator[Map]:
+    """
+    Plan on a map backed by a shared memory block.
+
+    Run inside a worker process. The block stays mapped read-only until
+    the context exits, and the planners read it in place:
+
+    - reservations are never copied as a whole, a node timeline copies
+      its own intervals out of the block the first time it is read;
+    - the layered search walks the adjacency and capacity arrays of the
+      block;
+    - hubs and connections, which routes are made of, are created from
+      the block without going through map specs, and the reduced graph
+      and distances to the end hub come with it.
+
+    Map specs are left empty, the map is only planned.
+
+    Parameters
+    ----------
+    handle
+        Block name and layout, see SharedMap.handle.
+
+    Yields
+    ------
+    Map
+        Reduced map with the reservations of the shared one.
+    """
+    name, layout = handle
+    shm: SharedMemory = SharedMemory(name=name)
+    views: dict[str, npt.NDArray[Any]] = {}
+    m: Map | None = None
+    try:
+        offset: int = 0
+        for key, dtype, length in layout:
+            views[key] = np.ndarray(
+                (length,), dtype=np.dtype(dtype), buffer=shm.buf,
+                offset=offset
+            )
+            views[key].flags.writeable = False
+            offset += -(-views[key].nbytes // ALIGN) * ALIGN
+        # only long-lived objects are created, collections would walk
+        # every one of them for nothing
+        collecting: bool = gc.isenabled()
+        gc.disable()
+        try:
+            m = build(views)
+        finally:
+            if collecting:
+                gc.enable()
+        yield m
+    finally:
+        # views must be gone before the block is closed
+        if m is not None:
+            m.context = SolveContext()
+            m.layered = None
+        views.clear()
+        shm.close()
+
+
+def build(views: dict[str, npt.NDArray[Any]]) -> Map:
+    """
+    Create the map of a shared memory block.
+
+    Parameters
+    ----------
+    views
+        Arrays of the block by name, see pack.
+
+    Returns
+    -------
+    Map
+        Reduced map reading its reservations from views.
+    """
+    nb_drones, start_id, end_id, turn_count, next_id = (
+        views["meta"].tolist()
+    )
+    names: list[str] = bytes(views["names"]).decode().split("\n")
+    styles: list[str] = bytes(views["styles"]).decode().split("\n")
+    m: Map = Map(nb_drones, {}, [])
+    for i, (hub_name, x, y, zone, color, max_drones, cost) in enumerate(zip(
+        names, views["hub_x"].tolist(), views["hub_y"].tolist(),
+        views["hub_zone"].tolist(), views["hub_color"].tolist(),
+        views["hub_max"].tolist(), views["hub_cost"].tolist()
+    )):
+        m.add_hub(Hub(
+            hub_name, x, y, styles[zone], styles[color], max_drones,
+            start_hub=i == start_id, end_hub=i == end_id, cost=cost
+        ))
+    hubs: list[Hub] = list(m.hubs.values())
+    for a, b, max_drones in zip(
+        views["conn_a"].tolist(), views["conn_b"].tolist(),
+        views["conn_max"].tolist()
+    ):
+        m.add_connection(Connection(hubs[a], hubs[b], max_drones))
+
+    # the reduced graph and distances come with the block
+    links: list[int] = views["links"].tolist()
+    link_ids: list[int] = views["link_ids"].tolist()
+    m.links = {
+        h: [m.connections[j - len(hubs)] for j in link_ids[a:b]]
+        for h, a, b in zip(hubs, links, links[1:])
+    }
+    m.active = {
+        n for n, kept in zip(m.nodes, views["active"].tolist()) if kept
+    }
+    m.reduced = True
+    m.end_distances = {
+        n: d for n, d in zip(m.nodes, views["distances"].tolist())
+        if d >= 0
+    }
+    m.layered = LayeredSearch(m, {
+        "offsets": views["links"], "conn": views["link_ids"],
+        "dest": views["dest"], "cost": views["cost"],
+        "bonus": views["bonus"], "capacity": views["capacity"]
+    })
+
+    m.context.reserved = Timelines((
+        views["reserved"], views["reserved_starts"],
+        views["reserved_counts"]
+    ))
+    m.context.transit = Timelines((
+        views["transit"], views["transit_starts"], views["transit_counts"]
+    ))
+    m.context.departures = views["departures"].tolist()
+    m.context.arrivals = views["arrivals"].tolist()
+    m.turn_count = turn_count
+    m.context.next_id = next_id
+    return m
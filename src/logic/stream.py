@@ -0,0 +1,263 @@
+import multiprocessing as mp
+from multiprocessing.connection import Connection as Pipe
+from multiprocessing.process import BaseProcess
+from typing import Any
+
+from src.logic import Map, Drone
+from src.logic.route import Route
+from src.logic.trace import write_trace
+from src.logic.validate import validate
+from src.logic.analytics import write_report
+from src.logic.improve import Improver
+from src.logic.shared import SharedMap, Handle, attach
+
+
+def stream_worker(
+    handle: Handle,
+    strategy: str,
+    conn: Pipe,
+    kept: dict[int, tuple[int, list[tuple[int, int]]]],
+    budget: float = 0
+) -> None:
+    """
+    Plan a map and send each route as soon as it is planned.
+
+    Run inside a worker process, on a Map of its own. Messages are drone
+    ids with their encoded routes, then None once every drone is planned
+    and the schedule improved, or an error message. Routes replaced while
+    improving are sent again.
+
+    Parameters
+    ----------
+    handle
+        Shared map to plan, see SharedMap.handle.
+    strategy
+        Planning strategy, one of STRATEGIES.
+    conn
+        Sending end of the pipe.
+    kept
+        Encoded routes to keep, by drone id.
+    budget
+        Seconds spent improving the schedule once planned, see Improver.
+    """
+    try:
+        with attach(handle) as m:
+            drones: list[Drone] = []
+            routes: dict[Drone, Route] = {}
+            for d, route in m.plan_iter(strategy, {
+                drone_id: m.decode_route(encoded)
+                for drone_id, encoded in kept.items()
+            }):
+                drones.append(d)
+                routes[d] = route
+                conn.send((d.id, route.encode()))
+            if budget > 0:
+                improver: Improver = Improver(m, drones, routes, strategy)
+                for d, route in improver.improve_iter(budget):
+                    conn.send((d.id, route.encode()))
+        conn.send(None)
+    except (RuntimeError, AssertionError) as e:
+        conn.send(str(e))
+    finally:
+        conn.close()
+
+
+class PlanStream():
+    """
+    Schedule planned in a worker process and received drone by drone.
+
+    Received routes are reserved on the displayed map, whose turn count
+    grows with them. Turns stay provisional until every drone is planned
+    and the schedule improved, since a later drone may still go through
+    an earlier turn, and a route received again replaces the previous one.
+    """
+    def __init__(
+        self,
+        m: Map,
+        strategy: str,
+        trace_out: str | None = None,
+        check: bool = False,
+        analytics_out: str | None = None,
+        kept: dict[int, Route] | None = None,
+        budget: float = 0
+    ) -> None:
+        """
+        Start planning in a worker process.
+
+        Parameters
+        ----------
+        m
+            Displayed map, shared with the worker before any route is
+            received.
+        strategy
+            Planning strategy, one of STRATEGIES.
+        trace_out
+            Trace file to write the schedule to once done, if any.
+        check
+            Whether to validate the schedule once done.
+        analytics_out
+            JSON file to write the congestion report to once done, if any.
+        kept
+            Routes on the displayed map to keep, by drone id, the other
+            drones being planned around them.
+        budget
+            Seconds spent improving the schedule once planned, see
+            Improver.
+        """
+        self.map: Map = m
+        self.trace_out: str | None = trace_out
+        self.check: bool = check
+        self.analytics_out: str | None = analytics_out
+        self.violations: list[tuple[int, str, str]] = []
+        self.drones: list[Drone] = []
+        self.routes: dict[Drone, Route] = {}
+        self.by_id: dict[int, Drone] = {}
+        self.done: bool = False
+        self.error: str | None = None
+
+        # freed once the worker stops
+        self.shared: SharedMap = SharedMap(m)
+        ctx = mp.get_context()
+        self.conn, sender = ctx.Pipe(duplex=False)
+        self.worker: BaseProcess = ctx.Process(
+            target=stream_worker,
+            args=(self.shared.handle, strategy, sender, {
+                drone_id: route.encode()
+                for drone_id, route in (kept or {}).items()
+            }, budget),
+            daemon=True
+        )
+        self.worker.start()
+        # only the worker writes
+        sender.close()
+
+    @property
+    def planned(self) -> int:
+        """
+        Get the number of drones received so far.
+
+        Returns
+        -------
+        int
+            Planned drones.
+        """
+        return len(self.drones)
+
+    def poll(self, timeout: float | None = 0) -> bool:
+        """
+        Receive the routes planned since the last call.
+
+        Once every drone is planned, finalize the map, print the logs,
+        write the trace and the congestion report and validate the
+        schedule.
+
+        Parameters
+        ----------
+        timeout
+            Seconds to wait for a first message, None to wait forever.
+
+        Returns
+        -------
+        bool
+            True if something was received.
+        """
+        received: bool = False
+        while not self.done and self.conn.poll(timeout):
+            timeout = 0
+            received = True
+            try:
+                message: Any = self.conn.recv()
+            except EOFError:
+                message = "planner stopped unexpectedly"
+            if isinstance(message, str):
+                self.error = message
+                self.close()
+            elif message is None:
+                self.finish()
+            else:
+                self.receive(*message)
+        return received
+
+    @property
+    def improving(self) -> bool:
+        """
+        Check if every drone is planned and the schedule being improved.
+
+        Returns
+        -------
+        bool
+            True if routes may still be replaced.
+        """
+        return not self.done and self.planned == self.map.nb_drones
+
+    def receive(
+        self, drone_id: int, encoded: tuple[int, list[tuple[int, int]]]
+    ) -> None:
+        """
+        Reserve a received route, replacing the previous one of its drone.
+
+        Parameters
+        ----------
+        drone_id
+            Id of the drone.
+        encoded
+            Route of the drone, as given by Route.encode.
+        """
+        d: Drone | None = self.by_id.get(drone_id)
+        if d is None:
+            d = Drone(drone_id)
+            self.by_id[drone_id] = d
+            self.drones.append(d)
+            self.routes[d] = self.map.decode_route(encoded)
+            self.map.reserve_path(d, self.routes[d])
+            self.map.turn_count = max(
+                self.map.turn_count, len(self.routes[d])
+            )
+            return
+        self.map.release_path(d, self.routes[d])
+        self.routes[d] = self.map.decode_route(encoded)
+        self.map.reserve_path(d, self.routes[d])
+        # improvements never lengthen the schedule
+        self.map.turn_count = max(len(r) for r in self.routes.values())
+
+    def finish(self) -> None:
+        """
+        Finalize the schedule once every drone is planned.
+        """
+        self.close()
+        # kept drones come first, logs follow drone ids
+        self.drones.sort(key=lambda d: d.id)
+        self.map.finalize(self.routes)
+        self.map.display_logs(self.drones, self.routes)
+        if self.check:
+            self.violations = validate(self.map, self.routes.values())
+        if self.trace_out is not None:
+            try:
+                write_trace(self.trace_out, self.map, self.drones, self.routes)
+            except OSError as e:
+                self.error = str(e)
+        if self.analytics_out is not None:
+            try:
+                write_report(
+                    self.analytics_out, self.map, self.routes.values()
+                )
+            except OSError as e:
+                self.error = str(e)
+
+    def wait(self) -> None:
+        """
+        Block until every drone is planned or planning failed.
+        """
+        while not self.done:
+            self.poll(None)
+
+    def close(self) -> None:
+        """
+        Stop the worker and the pipe.
+        """
+        self.done = True
+        if self.worker.is_alive():
+            self.worker.terminate()
+        self.worker.join()
+        self.conn.close()
+        self.shared.close()
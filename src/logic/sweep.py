@@ -0,0 +1,124 @@
+import json
+import statistics
+from typing import TYPE_CHECKING, Any
+
+from src.logic import Drone
+from src.logic.route import Route
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+# marginal cost flagged as a jump, as a multiple of the typical one
+JUMP: float = 2
+
+
+def sweep(
+    m: "Map", strategy: str = "bfs"
+) -> tuple[list[Drone], dict[Drone, Route], list[int]]:
+    """
+    Plan a map and record the turn count of every fleet size.
+
+    Drones are planned one after the other around the routes of the
+    previous ones, so the schedule of the first n drones never depends on
+    the next ones: the turn count of a fleet of n drones is read while
+    planning the full fleet, without solving again for each size.
+
+    Parameters
+    ----------
+    m
+        Map to plan.
+    strategy
+        Planning strategy, one of STRATEGIES but windowed.
+
+    Returns
+    -------
+    tuple[list[Drone], dict[Drone, Route], list[int]]
+        Planned drones, their routes, and the turn count of the first n
+        drones at index n - 1.
+
+    Raises
+    ------
+    RuntimeError:
+        Raised if the strategy plans every drone at once, is unknown, or
+        no path exists.
+    """
+    # the first routes of a window depend on the drones planned with them
+    if strategy == "windowed":
+        raise RuntimeError("windowed plans every drone at once, can't sweep")
+
+    drones: list[Drone] = []
+    routes: dict[Drone, Route] = {}
+    turn_counts: list[int] = []
+    turn_count: int = 0
+    for d, route in m.plan_iter(strategy):
+        drones.append(d)
+        routes[d] = route
+        turn_count = max(turn_count, len(route))
+        turn_counts.append(turn_count)
+    return drones, routes, turn_counts
+
+
+def jumps(turn_counts: list[int], factor: float = JUMP) -> list[int]:
+    """
+    Find the fleet sizes where the turn count jumps.
+
+    The marginal cost of a drone is the number of turns it adds. Most
+    drones add nothing or the few turns the throughput of the map costs,
+    a jump is a drone adding at least factor times the median of the
+    non-zero marginal costs, typically one forced into a detour.
+
+    Parameters
+    ----------
+    turn_counts
+        Turn count of each fleet size, see sweep.
+    factor
+        Multiple of the typical marginal cost flagged.
+
+    Returns
+    -------
+    list[int]
+        Fleet sizes whose last drone makes the turn count jump.
+    """
+    marginals: list[int] = [
+        b - a for a, b in zip(turn_counts, turn_counts[1:])
+    ]
+    costs: list[int] = [c for c in marginals if c > 0]
+    if not costs:
+        return []
+    typical: float = statistics.median(costs)
+    return [n for n, c in enumerate(marginals, 2) if c >= factor * typical]
+
+
+def write_sweep(path: str, strategy: str, turn_counts: list[int]) -> None:
+    """
+    Write the fleet size curve of a sweep as JSON.
+
+    Parameters
+    ----------
+    path
+        Output file.
+    strategy
+        Planning strategy of the sweep.
+    turn_counts
+        Turn count of each fleet size, see sweep.
+
+    Raises
+    ------
+    OSError:
+        Raised when the file cannot be written.
+    """
+    curve: dict[str, Any] = {
+        "strategy": strategy,
+        "turn_counts": [
+            {
+                "nb_drones": n,
+                "turn_count": t,
+                "marginal": t - turn_counts[n - 2] if n > 1 else t,
+            }
+            for n, t in enumerate(turn_counts, 1)
+        ],
+        "jumps": jumps(turn_counts),
+    }
+    with open(path, "w") as f:
+        json.dump(curve, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,276 @@
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+import numpy as np
+import numpy.typing as npt
+
+IntArray = npt.NDArray[np.int64]
+# offset of the intervals of each node then one past the last, and the
+# starts and counts of every interval
+Intervals = tuple[IntArray, IntArray, IntArray]
+
+# end of an interval that is never closed
+FOREVER: int = 2 ** 62
+# last turn a drone may start a move on, past it searches give up
+MAX_TURN: int = 10000
+
+
+class Timeline():
+    """
+    Per-turn drone count of a node, stored as sorted intervals.
+
+    The count is constant from starts[i] up to starts[i + 1] excluded, and
+    zero before starts[0]. Memory grows with the number of reservations,
+    not with the number of turns they span.
+    """
+    def __init__(self) -> None:
+        """
+        Create an empty Timeline.
+        """
+        self.starts: list[int] = []
+        self.counts: list[int] = []
+
+    def count(self, turn: int) -> int:
+        """
+        Get the drone count at a given turn.
+
+        Parameters
+        ----------
+        turn
+            Turn to look up.
+
+        Returns
+        -------
+        int
+            Number of drones reserved at this turn.
+        """
+        i: int = bisect_right(self.starts, turn) - 1
+        return self.counts[i] if i >= 0 else 0
+
+    def split(self, turn: int) -> int:
+        """
+        Make sure an interval starts at a given turn.
+
+        Parameters
+        ----------
+        turn
+            Turn to split at.
+
+        Returns
+        -------
+        int
+            Index of the interval starting at this turn.
+        """
+        i: int = bisect_left(self.starts, turn)
+        if i == len(self.starts) or self.starts[i] != turn:
+            self.starts.insert(i, turn)
+            self.counts.insert(i, self.counts[i - 1] if i > 0 else 0)
+        return i
+
+    def reserve(self, begin: int, end: int, amount: int = 1) -> None:
+        """
+        Add drones over a range of turns.
+
+        Parameters
+        ----------
+        begin
+            First turn, included.
+        end
+            Last turn, excluded.
+        amount
+            Drones to add, negative to release them.
+        """
+        if begin >= end:
+            return
+        first: int = self.split(begin)
+        last: int = self.split(end)
+        for i in range(first, last):
+            self.counts[i] += amount
+
+        # merge equal neighbours to keep the timeline short
+        lo: int = max(first - 1, 0)
+        hi: int = min(last + 1, len(self.starts) - 1)
+        for i in range(hi, lo, -1):
+            if self.counts[i] == self.counts[i - 1]:
+                del self.starts[i]
+                del self.counts[i]
+        if self.starts and self.counts[0] == 0:
+            del self.starts[0]
+            del self.counts[0]
+
+    def release(self, begin: int, end: int) -> None:
+        """
+        Remove one drone over a range of turns.
+
+        Parameters
+        ----------
+        begin
+            First turn, included.
+        end
+            Last turn, excluded.
+        """
+        self.reserve(begin, end, -1)
+
+    def earliest_free(
+        self, turn: int, capacity: int, length: int = 1
+    ) -> int:
+        """
+        Find the earliest range of turns with room left.
+
+        Parameters
+        ----------
+        turn
+            Turn to search from.
+        capacity
+            Maximum drones at once.
+        length
+            Number of consecutive turns needed.
+
+        Returns
+        -------
+        int
+            First turn not before turn starting length turns with a count
+            below capacity, or FOREVER if there is none.
+        """
+        if capacity <= 0:
+            return FOREVER
+        i: int = bisect_right(self.starts, turn) - 1
+        if i < 0:
+            if not self.starts or self.starts[0] - turn >= length:
+                return turn
+            i = 0
+        begin: int = turn
+        for j in range(i, len(self.starts)):
+            end: int = (
+                self.starts[j + 1] if j + 1 < len(self.starts) else FOREVER
+            )
+            if self.counts[j] >= capacity:
+                begin = end
+            elif end - begin >= length:
+                return begin
+        return FOREVER
+
+    def safe_intervals(self, capacity: int) -> list[tuple[int, int]]:
+        """
+        List the maximal ranges of turns with room left.
+
+        Parameters
+        ----------
+        capacity
+            Maximum drones at once.
+
+        Returns
+        -------
+        list[tuple[int, int]]
+            Sorted (begin, end) ranges, end excluded, the last one ending
+            at FOREVER.
+        """
+        if capacity <= 0:
+            return []
+        intervals: list[tuple[int, int]] = []
+        begin: int | None = 0
+        for start, count in zip(self.starts, self.counts):
+            if count >= capacity and begin is not None:
+                if start > begin:
+                    intervals.append((begin, start))
+                begin = None
+            elif count < capacity and begin is None:
+                begin = start
+        if begin is not None:
+            intervals.append((begin, FOREVER))
+        return intervals
+
+
+class Timelines(dict[int, Timeline]):
+    """
+    Timeline of every node, by node id, created on first access.
+
+    Most nodes are never reserved in a solve, so only the timelines read
+    or written exist. Intervals given as a base, such as the reservations
+    of a shared map, are read straight from their arrays: a node timeline
+    copies its own intervals out of them on first access, and the others
+    are never copied.
+    """
+    def __init__(self, base: Intervals | None = None) -> None:
+        """
+        Create a Timelines.
+
+        Parameters
+        ----------
+        base
+            Flattened intervals of the nodes at the start of the solve,
+            none reserved if None.
+        """
+        super().__init__()
+        self.base: Intervals | None = base
+
+    def __missing__(self, node_id: int) -> Timeline:
+        """
+        Create the timeline of a node.
+
+        Parameters
+        ----------
+        node_id
+            Node id.
+
+        Returns
+        -------
+        Timeline
+            Timeline holding the base intervals of the node, if any.
+        """
+        t: Timeline = Timeline()
+        if self.base is not None:
+            offsets, starts, counts = self.base
+            first: int = int(offsets[node_id])
+            last: int = int(offsets[node_id + 1])
+            if first < last:
+                t.starts = starts[first:last].tolist()
+                t.counts = counts[first:last].tolist()
+        self[node_id] = t
+        return t
+
+    def intervals(self) -> tuple[IntArray, IntArray, IntArray]:
+        """
+        Flatten every timeline into interval arrays.
+
+        Returns
+        -------
+        tuple[IntArray, IntArray, IntArray]
+            Node id, start and count of every interval, sorted by node id
+            then start.
+        """
+        own: list[tuple[int, Timeline]] = sorted(
+            (i, t) for i, t in self.items() if t.starts
+        )
+        lengths: IntArray = np.array(
+            [len(t.starts) for _, t in own], dtype=np.int64
+        )
+        ids: IntArray = np.repeat(
+            np.array([i for i, _ in own], dtype=np.int64), lengths
+        )
+        starts: IntArray = np.fromiter(
+            chain.from_iterable(t.starts for _, t in own),
+            dtype=np.int64, count=int(lengths.sum())
+        )
+        counts: IntArray = np.fromiter(
+            chain.from_iterable(t.counts for _, t in own),
+            dtype=np.int64, count=len(starts)
+        )
+        if self.base is None:
+            return ids, starts, counts
+
+        # base intervals of the nodes without a timeline of their own
+        offsets, base_starts, base_counts = self.base
+        base_ids: IntArray = np.repeat(
+            np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets)
+        )
+        kept: npt.NDArray[np.bool_] = ~np.isin(
+            base_ids, np.fromiter(self.keys(), dtype=np.int64)
+        )
+        ids = np.concatenate((base_ids[kept], ids))
+        order: IntArray = np.argsort(ids, kind="stable")
+        return (
+            ids[order],
+            np.concatenate((base_starts[kept], starts))[order],
+            np.concatenate((base_counts[kept], counts))[order]
+        )
@@ -0,0 +1,290 @@
+import json
+import mmap
+import struct
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import numpy.typing as npt
+
+from src.error import ParseError
+from src.logic import Drone
+from src.logic.route import Route
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+MAGIC: bytes = b"FLYTRACE"
+VERSION: int = 2
+
+# magic, version, specs size, node count, turn count, drone count
+HEADER: struct.Struct = struct.Struct("<8sIIIII")
+
+IntArray = npt.NDArray[np.int64]
+
+
+def is_trace(path: str) -> bool:
+    """
+    Check if a file is a trace.
+
+    Parameters
+    ----------
+    path
+        File to check.
+
+    Returns
+    -------
+    bool
+        True if the file starts with the trace magic bytes.
+    """
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def occupancy_index(m: "Map") -> tuple[IntArray, IntArray]:
+    """
+    Build the sparse per-turn occupancy of a schedule.
+
+    Reservation intervals are expanded into one (node id, count) pair per
+    occupied node and turn in one pass, so the index grows with the drones
+    on the map, not with its size. Counts are the ones of Map.occupancy.
+
+    Parameters
+    ----------
+    m
+        Map the schedule was computed on, after finalize.
+
+    Returns
+    -------
+    tuple[IntArray, IntArray]
+        Offset of the first pair of each turn, then one past the last, and
+        the pairs of every turn, sorted by node id within a turn.
+    """
+    assert m.start_hub is not None
+    assert m.end_hub is not None
+
+    horizon: int = m.turn_count
+    # drones in transit on connections, reserved on other hubs, hubs
+    # coming first
+    hub_ids, hub_starts, hub_counts = m.context.reserved.intervals()
+    hub: npt.NDArray[np.bool_] = (hub_ids < len(m.hubs)) & (
+        hub_ids != m.start_hub.id
+    ) & (hub_ids != m.end_hub.id)
+    conn_ids, conn_starts, conn_counts = m.context.transit.intervals()
+    conn: npt.NDArray[np.bool_] = conn_ids >= len(m.hubs)
+    ids: IntArray = np.concatenate((hub_ids[hub], conn_ids[conn]))
+    starts: IntArray = np.concatenate((hub_starts[hub], conn_starts[conn]))
+    counts: IntArray = np.concatenate((hub_counts[hub], conn_counts[conn]))
+    # an interval ends where the next one of its node starts
+    ends: IntArray = np.full(len(starts), horizon, dtype=np.int64)
+    if len(starts) > 1:
+        same: npt.NDArray[np.bool_] = ids[1:] == ids[:-1]
+        ends[:-1][same] = starts[1:][same]
+    starts = np.minimum(starts, horizon)
+    spans: IntArray = np.clip(np.minimum(ends, horizon) - starts, 0, None)
+    spans[counts == 0] = 0
+
+    # one entry per turn of each interval
+    total: int = int(spans.sum())
+    turns: IntArray = np.arange(total, dtype=np.int64) + np.repeat(
+        starts - np.cumsum(spans) + spans, spans
+    )
+    nodes: IntArray = np.repeat(ids, spans)
+    values: IntArray = np.repeat(counts, spans)
+
+    # waiting on the start hub and parked on the end hub, see occupancy
+    every: IntArray = np.arange(horizon, dtype=np.int64)
+    waiting: IntArray = len(m.context.departures) - np.searchsorted(
+        np.array(m.context.departures, dtype=np.int64), every, side="left"
+    )
+    parked: IntArray = np.searchsorted(
+        np.array(m.context.arrivals, dtype=np.int64), every, side="right"
+    )
+    turns = np.concatenate((turns, every, every))
+    nodes = np.concatenate((
+        nodes, np.full(horizon, m.start_hub.id, dtype=np.int64),
+        np.full(horizon, m.end_hub.id, dtype=np.int64)
+    ))
+    values = np.concatenate((values, waiting, parked))
+
+    kept: npt.NDArray[np.bool_] = values > 0
+    turns, nodes, values = turns[kept], nodes[kept], values[kept]
+    order: IntArray = np.lexsort((nodes, turns))
+    offsets: IntArray = np.zeros(horizon + 1, dtype=np.int64)
+    np.cumsum(np.bincount(turns, minlength=horizon), out=offsets[1:])
+    pairs: IntArray = np.empty(2 * len(order), dtype=np.int64)
+    pairs[0::2] = nodes[order]
+    pairs[1::2] = values[order]
+    return offsets, pairs
+
+
+def write_trace(
+    path: str,
+    m: "Map",
+    drones: list[Drone],
+    routes: dict[Drone, Route]
+) -> None:
+    """
+    Write a computed schedule to a trace file.
+
+    The file holds a fixed header, the map specs as JSON, the sparse
+    occupancy index (offset of the first pair of each turn, then the
+    (node id, drone count) pairs of the occupied nodes, see
+    occupancy_index), then the routes of the drones as departure turn and
+    (node id, dwell) hops.
+
+    Parameters
+    ----------
+    path
+        Output file.
+    m
+        Map the schedule was computed on, after finalize.
+    drones
+        Planned drones, in log order.
+    routes
+        Route of each drone.
+    """
+    specs: bytes = json.dumps(m.specs).encode()
+    offsets, pairs = occupancy_index(m)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(
+            MAGIC, VERSION, len(specs), len(m.nodes), m.turn_count,
+            len(drones)
+        ))
+        f.write(specs)
+        f.write(offsets.astype("<u8").tobytes())
+        f.write(pairs.astype("<u4").tobytes())
+        for d in drones:
+            departure, hops = routes[d].encode()
+            f.write(struct.pack(
+                f"<II{2 * len(hops)}I", departure, len(hops),
+                *(value for hop in hops for value in hop)
+            ))
+
+
+class Trace():
+    """
+    Trace file opened with mmap.
+
+    Only the header and the map specs are read when opening, the
+    occupancy of a turn and the routes are decoded on demand.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Open a trace file.
+
+        Parameters
+        ----------
+        path
+            Trace file.
+
+        Raises
+        ------
+        ParseError:
+            Raised if the file is not a valid trace.
+        """
+        with open(path, "rb") as f:
+            self.buffer: mmap.mmap = mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        if len(self.buffer) < HEADER.size:
+            self.close()
+            raise ParseError(f"{path}: truncated trace")
+        magic, version, specs_size, self.nb_nodes, self.turn_count, \
+            self.nb_drones = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ParseError(f"{path}: unsupported trace")
+
+        self.index_offset: int = HEADER.size + specs_size
+        # pairs follow the offset of each turn, then one past the last
+        self.pairs_offset: int = (
+            self.index_offset + 8 * (self.turn_count + 1)
+        )
+        if len(self.buffer) < self.pairs_offset:
+            self.close()
+            raise ParseError(f"{path}: truncated trace")
+        self.routes_offset: int = self.pairs_offset + 8 * self.entry(
+            self.turn_count
+        )
+        if len(self.buffer) < self.routes_offset:
+            self.close()
+            raise ParseError(f"{path}: truncated trace")
+        self.specs: dict[str, Any] = json.loads(
+            self.buffer[HEADER.size:self.index_offset]
+        )
+
+    def close(self) -> None:
+        """
+        Release the mapping.
+        """
+        self.buffer.close()
+
+    def entry(self, turn: int) -> int:
+        """
+        Get the index of the first occupancy pair of a turn.
+
+        Parameters
+        ----------
+        turn
+            Turn index, turn_count for one past the last pair.
+
+        Returns
+        -------
+        int
+            Pair index.
+        """
+        offset: int
+        (offset,) = struct.unpack_from(
+            "<Q", self.buffer, self.index_offset + 8 * turn
+        )
+        return offset
+
+    def occupancy_row(self, turn: int) -> list[int]:
+        """
+        Get the drones displayed on each node at a given turn.
+
+        Only the pairs of this turn are read from the file.
+
+        Parameters
+        ----------
+        turn
+            Turn index.
+
+        Returns
+        -------
+        list[int]
+            Drone count of each node, indexed by node id.
+        """
+        row: list[int] = [0] * self.nb_nodes
+        if not 0 <= turn < self.turn_count:
+            return row
+        first: int = self.entry(turn)
+        size: int = self.entry(turn + 1) - first
+        values: tuple[int, ...] = struct.unpack_from(
+            f"<{2 * size}I", self.buffer, self.pairs_offset + 8 * first
+        )
+        for node_id, count in zip(values[::2], values[1::2]):
+            row[node_id] = count
+        return row
+
+    def routes(self) -> list[tuple[int, list[tuple[int, int]]]]:
+        """
+        Decode the routes.
+
+        Returns
+        -------
+        list[tuple[int, list[tuple[int, int]]]]
+            Per-drone routes, as given by Route.encode.
+        """
+        encoded: list[tuple[int, list[tuple[int, int]]]] = []
+        offset: int = self.routes_offset
+        for _ in range(self.nb_drones):
+            departure, nb_hops = struct.unpack_from("<II", self.buffer, offset)
+            offset += 8
+            values: tuple[int, ...] = struct.unpack_from(
+                f"<{2 * nb_hops}I", self.buffer, offset
+            )
+            offset += 8 * nb_hops
+            encoded.append((departure, list(zip(values[::2], values[1::2]))))
+        return encoded
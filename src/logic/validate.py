@@ -0,0 +1,344 @@
+from typing import TYPE_CHECKING, Iterable
+
+import numpy as np
+import numpy.typing as npt
+
+from src.logic import Hub
+from src.logic.route import Route
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+# hops checked at once, bounds the size of temporary arrays
+CHUNK: int = 1 << 20
+
+IntArray = npt.NDArray[np.int64]
+Int32Array = npt.NDArray[np.int32]
+BoolArray = npt.NDArray[np.bool_]
+
+
+class Validator():
+    """
+    Schedule checker working on flat hop arrays.
+
+    Node properties are turned into lookup tables indexed by node id, so
+    that every rule is an array operation over all hops at once.
+    """
+    def __init__(self, m: "Map") -> None:
+        """
+        Build the lookup tables of a map.
+
+        Parameters
+        ----------
+        m
+            Map the schedules are computed on.
+        """
+        assert m.start_hub is not None
+        assert m.end_hub is not None
+
+        self.map: "Map" = m
+        self.start: int = m.start_hub.id
+        self.end: int = m.end_hub.id
+        self.nb_hubs: int = len(m.hubs)
+        self.size: int = len(m.nodes)
+        self.capacity: IntArray = np.array(
+            [n.max_drones for n in m.nodes], dtype=np.int64
+        )
+        # turns taken to enter each hub, 0 for connections
+        self.cost: IntArray = np.array(
+            [n.cost if isinstance(n, Hub) else 0 for n in m.nodes],
+            dtype=np.int64
+        )
+        self.blocked: BoolArray = np.array(
+            [isinstance(n, Hub) and n.zone == "blocked" for n in m.nodes]
+        )
+
+        # connection endpoints, -1 for hubs
+        self.ends_a: Int32Array = np.full(self.size, -1, dtype=np.int32)
+        self.ends_b: Int32Array = np.full(self.size, -1, dtype=np.int32)
+        for c in m.connections:
+            self.ends_a[c.id], self.ends_b[c.id] = (
+                c.linked[0].id, c.linked[1].id
+            )
+        # sorted hub pair keys and their connection, the -1 sentinel
+        # matches no pair and keeps lookups in bounds
+        keys: IntArray = np.array(
+            [-1] + [
+                min(a.id, b.id) * self.size + max(a.id, b.id)
+                for a, b in (c.linked for c in m.connections)
+            ],
+            dtype=np.int64
+        )
+        order: IntArray = np.argsort(keys)
+        self.pair_keys: IntArray = keys[order]
+        self.pair_ids: IntArray = np.array(
+            [-1] + [c.id for c in m.connections], dtype=np.int64
+        )[order]
+
+        self.violations: list[tuple[int, str, str]] = []
+
+    def report(
+        self, mask: BoolArray, turns: Int32Array, nodes: Int32Array,
+        reason: str
+    ) -> None:
+        """
+        Record the hops selected by a mask.
+
+        Parameters
+        ----------
+        mask
+            Hops breaking the rule.
+        turns
+            Entry turn of each hop.
+        nodes
+            Node id of each hop.
+        reason
+            Rule broken.
+        """
+        for i in np.flatnonzero(mask):
+            self.violations.append(
+                (int(turns[i]), self.map.nodes[nodes[i]].name, reason)
+            )
+
+    def check(self, routes: Iterable[Route]) -> list[tuple[int, str, str]]:
+        """
+        Check a schedule.
+
+        Parameters
+        ----------
+        routes
+            Route of each drone.
+
+        Returns
+        -------
+        list[tuple[int, str, str]]
+            (turn, node name, reason) of each violation, sorted by turn.
+        """
+        self.violations = []
+        kept: list[Route] = []
+        for route in routes:
+            if route.hops:
+                kept.append(route)
+            else:
+                self.violations.append((
+                    route.departure, self.map.nodes[self.start].name,
+                    "route not ending on end hub"
+                ))
+        total: int = sum(len(route.hops) for route in kept)
+        if total == 0:
+            return self.violations
+
+        nodes: Int32Array = np.fromiter(
+            (node.id for route in kept for node, _ in route.hops),
+            dtype=np.int32, count=total
+        )
+        turns: Int32Array = np.fromiter(
+            (turn for route in kept for turn in route.turns),
+            dtype=np.int32, count=total
+        )
+        dwells: Int32Array = np.fromiter(
+            (dwell for route in kept for _, dwell in route.hops),
+            dtype=np.int32, count=total
+        )
+        last: BoolArray = np.zeros(total, dtype=np.bool_)
+        last[np.cumsum([len(route.hops) for route in kept]) - 1] = True
+        del kept
+        prev: Int32Array = np.empty_like(nodes)
+        prev[0] = self.start
+        prev[1:] = np.where(last[:-1], self.start, nodes[:-1])
+
+        span: int = int((turns + dwells).max()) + 1
+        events: list[IntArray] = []
+        for lo in range(0, total, CHUNK):
+            hi: int = min(lo + CHUNK, total)
+            before: Int32Array = np.empty(hi - lo, dtype=np.int32)
+            before[0] = prev[lo - 1] if lo > 0 else -1
+            before[1:] = prev[lo:hi - 1]
+            events.append(self.check_hops(
+                nodes[lo:hi], turns[lo:hi], dwells[lo:hi], prev[lo:hi],
+                before, last[lo:hi], span
+            ))
+        del nodes, turns, dwells, prev, last
+        self.check_capacity(events, span)
+
+        self.violations.sort()
+        return self.violations
+
+    def check_hops(
+        self,
+        nodes: Int32Array,
+        turns: Int32Array,
+        dwells: Int32Array,
+        prev: Int32Array,
+        before: Int32Array,
+        last: BoolArray,
+        span: int
+    ) -> IntArray:
+        """
+        Check the move rules of consecutive hops.
+
+        Parameters
+        ----------
+        nodes
+            Node id of each hop.
+        turns
+            Entry turn of each hop.
+        dwells
+            Turns spent on each hop.
+        prev
+            Node id of the hop before, the start hub for first hops.
+        before
+            Node id of the hop before prev, only read after connections.
+        last
+            Whether each hop ends its route.
+        span
+            Turn count bound, for occupancy event keys.
+
+        Returns
+        -------
+        IntArray
+            Occupancy events of these hops, see check_capacity.
+        """
+        is_hub: BoolArray = nodes < self.nb_hubs
+        prev_hub: BoolArray = prev < self.nb_hubs
+
+        # hub to hub moves go through the connection between them
+        direct: BoolArray = is_hub & prev_hub
+        pair: IntArray = (
+            np.minimum(prev, nodes).astype(np.int64) * self.size
+            + np.maximum(prev, nodes)
+        )
+        found: IntArray = np.minimum(
+            np.searchsorted(self.pair_keys, pair), len(self.pair_keys) - 1
+        )
+        linked: BoolArray = self.pair_keys[found] == pair
+        del pair
+        self.report(
+            direct & ~linked, turns, nodes, "no connection from previous hub"
+        )
+        self.report(
+            direct & (self.cost[nodes] > 1), turns, nodes,
+            "hub entered faster than its cost"
+        )
+        self.report(self.blocked[nodes], turns, nodes, "blocked hub entered")
+
+        # a connection is entered from one end and left through the other
+        transit: BoolArray = ~is_hub
+        self.report(
+            transit & ~prev_hub, turns, nodes,
+            "connection entered from a connection"
+        )
+        self.report(
+            transit & (prev != self.ends_a[nodes])
+            & (prev != self.ends_b[nodes]),
+            turns, nodes, "connection entered from an unlinked hub"
+        )
+        # held until the last turn of the cost of the hub it leads to
+        ahead: Int32Array = np.where(
+            self.ends_a[nodes] == prev, self.ends_b[nodes], self.ends_a[nodes]
+        )
+        self.report(
+            transit & (dwells != self.cost[ahead] - 1), turns, nodes,
+            "waiting on a connection"
+        )
+        self.report(
+            transit & last, turns, nodes, "route ending on a connection"
+        )
+        other: Int32Array = np.where(
+            self.ends_a[prev] == before, self.ends_b[prev], self.ends_a[prev]
+        )
+        self.report(
+            is_hub & ~prev_hub & (nodes != other), turns, nodes,
+            "connection left through the wrong hub"
+        )
+        self.report(
+            last & (nodes != self.end), turns, nodes,
+            "route not ending on end hub"
+        )
+
+        # stays on the hops, and connections crossed by hub to hub moves;
+        # the start and end hubs have no capacity limit
+        stay: BoolArray = (nodes != self.start) & (nodes != self.end)
+        crossed: BoolArray = direct & linked
+        occupied: IntArray = np.concatenate(
+            (nodes[stay], self.pair_ids[found[crossed]])
+        )
+        begins: IntArray = np.concatenate((turns[stay], turns[crossed]))
+        ends: IntArray = np.concatenate(
+            (turns[stay] + dwells[stay], turns[crossed] + 1)
+        )
+        # (node, turn) key, the low bit telling arrivals from departures
+        return np.concatenate((
+            (occupied * span + begins) * 2 + 1, (occupied * span + ends) * 2
+        ))
+
+    def check_capacity(self, chunks: list[IntArray], span: int) -> None:
+        """
+        Find the nodes holding more drones than their capacity.
+
+        Arrivals add one and departures remove one. Sorting the events by
+        (node, turn) and summing them gives the drone count of each node
+        after each change, events of one (node, turn) being summed in any
+        order.
+
+        Parameters
+        ----------
+        chunks
+            Occupancy events, as made by check_hops, emptied here.
+        span
+            Turn count bound used by the event keys.
+        """
+        events: IntArray = np.concatenate(chunks)
+        chunks.clear()
+        events.sort()
+        counts: Int32Array = np.empty(len(events), dtype=np.int32)
+        for lo in range(0, len(events), CHUNK):
+            counts[lo:lo + CHUNK] = (events[lo:lo + CHUNK] & 1) * 2 - 1
+        # every stay is closed, so the sum is back to 0 between two nodes
+        np.cumsum(counts, out=counts)
+        events >>= 1
+
+        size: int = len(events)
+        for lo in range(0, size, CHUNK):
+            hi: int = min(lo + CHUNK, size)
+            keys: IntArray = events[lo:hi]
+            # keep the count after the last event of each (node, turn)
+            last: BoolArray = np.empty(hi - lo, dtype=np.bool_)
+            last[:-1] = keys[1:] != keys[:-1]
+            last[-1] = hi == size or events[hi] != keys[-1]
+            nodes: IntArray = keys // span
+            over: IntArray = np.flatnonzero(
+                last & (counts[lo:hi] > self.capacity[nodes])
+            )
+            for i in over:
+                self.violations.append((
+                    int(keys[i] % span), self.map.nodes[nodes[i]].name,
+                    f"{counts[lo + i]} drones over capacity "
+                    f"{self.capacity[nodes[i]]}"
+                ))
+
+
+def validate(m: "Map", routes: Iterable[Route]) -> list[tuple[int, str, str]]:
+    """
+    Check a schedule independently from the planners.
+
+    Routes are flattened into hop arrays, every rule being checked with
+    array operations: hub and connection capacities, moves following an
+    existing connection, hubs taking their cost in turns to enter, blocked
+    hubs never entered, no wait on a connection, and routes ending on the
+    end hub. The start and end hubs have no capacity limit.
+
+    Parameters
+    ----------
+    m
+        Map the schedule was computed on.
+    routes
+        Route of each drone.
+
+    Returns
+    -------
+    list[tuple[int, str, str]]
+        (turn, node name, reason) of each violation, sorted by turn.
+    """
+    return Validator(m).check(routes)
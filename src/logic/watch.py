@@ -0,0 +1,333 @@
+import os
+import logging
+from typing import Any
+
+from pydantic import ValidationError
+
+from src.error import ParseError
+from src.parsing import IncrementalParser
+from src.logic import Map, Drone, Hub, Connection
+from src.logic.route import Route
+from src.logic.stream import PlanStream
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# hub fields that only change how a hub is drawn
+DRAWING: set[str] = {"x", "y", "color"}
+
+# connection key, independent of the order of its hubs
+Pair = tuple[str, str]
+
+
+def pair(a: str, b: str) -> Pair:
+    """
+    Key a connection by the names of its hubs.
+
+    Parameters
+    ----------
+    a
+        First hub name.
+    b
+        Second hub name.
+
+    Returns
+    -------
+    Pair
+        Sorted hub names.
+    """
+    return (a, b) if a <= b else (b, a)
+
+
+class MapDiff():
+    """
+    Changes between two versions of the map specs.
+
+    Hubs and connections are matched by name, so their ids may differ
+    between the two maps.
+    """
+    def __init__(
+        self, old: dict[str, Any], new: dict[str, Any]
+    ) -> None:
+        """
+        Compare two map specs.
+
+        Parameters
+        ----------
+        old
+            Specs of the displayed map.
+        new
+            Specs of the map file as it is now.
+        """
+        old_hubs: dict[str, dict[str, Any]] = old["hubs"]
+        new_hubs: dict[str, dict[str, Any]] = new["hubs"]
+
+        def planned(data: dict[str, Any]) -> dict[str, Any]:
+            # terminals hold any number of drones
+            ignored: set[str] = DRAWING | (
+                {"max_drones"}
+                if "start_hub" in data or "end_hub" in data else set()
+            )
+            return {k: v for k, v in data.items() if k not in ignored}
+
+        # hubs added, removed, or changed in a way routes depend on
+        self.hubs: set[str] = {
+            name for name in old_hubs.keys() | new_hubs.keys()
+            if name not in old_hubs or name not in new_hubs
+            or planned(old_hubs[name]) != planned(new_hubs[name])
+        }
+        # hubs added, removed, or changed in a way they are drawn
+        self.redrawn: set[str] = {
+            name for name in old_hubs.keys() | new_hubs.keys()
+            if name not in old_hubs or name not in new_hubs
+            or any(
+                old_hubs[name].get(k) != new_hubs[name].get(k)
+                for k in DRAWING | {"zone"}
+            )
+        }
+
+        old_links: dict[Pair, int] = {
+            pair(a, b): capacity for a, b, capacity in old["connections"]
+        }
+        new_links: dict[Pair, int] = {
+            pair(a, b): capacity for a, b, capacity in new["connections"]
+        }
+        # connections added, removed, or with a new capacity
+        self.connections: set[Pair] = {
+            key for key in old_links.keys() | new_links.keys()
+            if old_links.get(key) != new_links.get(key)
+        }
+        moved: set[str] = {
+            name for name in old_hubs.keys() & new_hubs.keys()
+            if (old_hubs[name]["x"], old_hubs[name]["y"])
+            != (new_hubs[name]["x"], new_hubs[name]["y"])
+        }
+        # connections added, removed, or with a moved end
+        self.relinked: set[Pair] = {
+            key for key in old_links.keys() ^ new_links.keys()
+        } | {
+            key for key in old_links.keys() & new_links.keys()
+            if key[0] in moved or key[1] in moved
+        }
+
+        def terminal(specs: dict[str, Any], kind: str) -> str | None:
+            return next(
+                (name for name, data in specs["hubs"].items()
+                 if kind in data),
+                None
+            )
+
+        # every route starts and ends on the terminals
+        self.terminals: bool = any(
+            terminal(old, kind) != terminal(new, kind)
+            for kind in ("start_hub", "end_hub")
+        )
+        self.nb_drones: bool = old["nb_drones"] != new["nb_drones"]
+
+    @property
+    def empty(self) -> bool:
+        """
+        Check if the specs are the same.
+
+        Returns
+        -------
+        bool
+            True if nothing changed.
+        """
+        return not (
+            self.hubs or self.redrawn or self.connections or self.relinked
+            or self.terminals or self.nb_drones
+        )
+
+    def touches(self, route: Route) -> bool:
+        """
+        Check if a route goes through anything that changed.
+
+        Parameters
+        ----------
+        route
+            Route on the displayed map.
+
+        Returns
+        -------
+        bool
+            True if a hub the route enters, or a connection it uses or
+            crosses, changed.
+        """
+        prev: Hub | Connection = route.start
+        for node, _ in route.hops:
+            if isinstance(node, Hub):
+                if node.name in self.hubs:
+                    return True
+                if isinstance(prev, Hub) and pair(
+                    prev.name, node.name
+                ) in self.connections:
+                    return True
+            else:
+                a, b = node.linked
+                if pair(a.name, b.name) in self.connections:
+                    return True
+            prev = node
+        return self.terminals
+
+
+def carry_over(
+    diff: MapDiff, routes: dict[Drone, Route], m: Map
+) -> dict[int, Route]:
+    """
+    Move the routes a diff leaves untouched to a new map.
+
+    Parameters
+    ----------
+    diff
+        Changes from the map of the routes to m.
+    routes
+        Routes on the displayed map.
+    m
+        Map built from the new specs.
+
+    Returns
+    -------
+    dict[int, Route]
+        Routes on m, by drone id, for drones still in the fleet.
+    """
+    assert m.start_hub is not None
+
+    kept: dict[int, Route] = {}
+    for d, route in routes.items():
+        if d.id > m.nb_drones or diff.touches(route):
+            continue
+        hops: list[tuple[Hub | Connection, int]] = []
+        for node, dwell in route.hops:
+            if isinstance(node, Hub):
+                hops.append((m.hubs[node.name], dwell))
+            else:
+                a, b = node.linked
+                hops.append((
+                    m.get_connection(m.hubs[a.name], m.hubs[b.name]), dwell
+                ))
+        kept[d.id] = Route(m.start_hub, route.departure, hops)
+    return kept
+
+
+class MapWatcher():
+    """
+    Map file followed while it is displayed.
+
+    When the file changes, only its changed lines are parsed again, the
+    new specs are compared to the displayed ones, and only the drones
+    whose route goes through a changed hub or connection are planned
+    again, around the routes of the others.
+    """
+    def __init__(
+        self,
+        parser: IncrementalParser,
+        m: Map,
+        stream: PlanStream,
+        strategy: str,
+        trace_out: str | None = None,
+        check: bool = False,
+        analytics_out: str | None = None,
+        budget: float = 0
+    ) -> None:
+        """
+        Follow a map file, already parsed and being planned.
+
+        Parameters
+        ----------
+        parser
+            Parser of the map file, holding its last parse.
+        m
+            Displayed map, built from the last parse.
+        stream
+            Schedule of m being planned.
+        strategy
+            Planning strategy, one of STRATEGIES.
+        trace_out
+            Trace file to write each schedule to once done, if any.
+        check
+            Whether to validate each schedule once done.
+        analytics_out
+            JSON file to write each congestion report to once done, if
+            any.
+        budget
+            Seconds spent improving each schedule once planned, see
+            Improver.
+        """
+        self.parser: IncrementalParser = parser
+        self.map: Map = m
+        self.stream: PlanStream = stream
+        self.strategy: str = strategy
+        self.trace_out: str | None = trace_out
+        self.check: bool = check
+        self.analytics_out: str | None = analytics_out
+        self.budget: float = budget
+        self.mtime: int = self.modified()
+        # changes of the last reload, and why the file was not reloaded
+        self.diff: MapDiff | None = None
+        self.error: str | None = None
+
+    def modified(self) -> int:
+        """
+        Get the modification time of the map file.
+
+        Returns
+        -------
+        int
+            Modification time in nanoseconds, -1 if the file is missing.
+        """
+        try:
+            return os.stat(self.parser.file_name).st_mtime_ns
+        except OSError:
+            return -1
+
+    def poll(self) -> bool:
+        """
+        Reload the map file if it changed since the last call.
+
+        A file that fails to parse or validate is reported in error and
+        the displayed map is kept, until the file changes again.
+
+        Returns
+        -------
+        bool
+            True if the displayed map was replaced.
+        """
+        mtime: int = self.modified()
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+
+        try:
+            specs: dict[str, Any] = self.parser.parse()
+            Map.Validate(**specs)
+        except (ParseError, OSError) as e:
+            self.error = str(e)
+            logger.error(self.error)
+            return False
+        except ValidationError as e:
+            self.error = e.errors()[0]["msg"]
+            logger.error(self.error)
+            return False
+        self.error = None
+
+        diff: MapDiff = MapDiff(self.map.specs, specs)
+        if diff.empty:
+            return False
+        m: Map = Map(**specs)
+        # planning may still be going on, routes received so far are kept
+        self.stream.poll()
+        kept: dict[int, Route] = carry_over(diff, self.stream.routes, m)
+        self.stream.close()
+
+        logger.info(
+            f"reloaded {self.parser.file_name}:"
+            f" {self.parser.reparsed} line(s) parsed,"
+            f" {m.nb_drones - len(kept)} drone(s) to plan"
+        )
+        self.map = m
+        self.diff = diff
+        self.stream = PlanStream(
+            m, self.strategy, self.trace_out, self.check,
+            self.analytics_out, kept, self.budget
+        )
+        return True
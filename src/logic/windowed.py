@@ -0,0 +1,350 @@
+import heapq
+from typing import TYPE_CHECKING
+
+from src.logic import Hub, Connection
+from src.logic.route import Route
+from src.logic.timeline import MAX_TURN, Timeline
+
+if TYPE_CHECKING:
+    from src.logic import Map
+
+
+# turns each drone reserves ahead of the current turn
+WINDOW: int = 32
+# turns of each plan kept before every drone is planned again
+COMMIT: int = 32
+# cost of waiting a turn on a hub, waiting on the start hub costing 1 so
+# that drones wait there rather than hold a hub others need
+WAIT_COST: int = 2
+
+# last turn on the hub left, connection taken and hub entered
+Move = tuple[int, Connection, Hub]
+# hub and turn the drone is on it
+State = tuple[Hub, int]
+
+
+class WindowedPlanner():
+    """
+    Windowed cooperative A* (WHCA*) over every drone at once.
+
+    Drones are planned together, one window at a time: each drone
+    searches a path for the next window turns only, against the paths
+    of the drones planned before it in the same window, and the first
+    commit turns of every path are kept. The window table is then
+    cleared and the window slides, drones being planned in a rotating
+    order so that none is always planned last. Reservations never span
+    more than a window, whatever the length of the schedule.
+    """
+    def __init__(
+        self,
+        m: "Map",
+        fixed: list[Route] | None = None,
+        window: int = WINDOW,
+        commit: int = COMMIT
+    ) -> None:
+        """
+        Prepare the window table of a map.
+
+        Parameters
+        ----------
+        m
+            Map to plan, reduced first.
+        fixed
+            Routes already reserved on m, planned around.
+        window
+            Turns each drone reserves ahead.
+        commit
+            Turns kept from each plan before planning again.
+        """
+        m.reduce()
+        m.distances_to_end()
+        self.map: "Map" = m
+        # reservations of the current window, on the same topology
+        self.table: "Map" = m.fork()
+        self.touched: set[int] = set()
+        self.fixed: list[Route] = fixed or []
+        self.commit: int = max(commit, 1)
+        longest: int = max(
+            (n.cost for n in m.active if isinstance(n, Hub)), default=1
+        )
+        # a move started before the commit turn ends inside the window
+        self.window: int = max(window, self.commit + longest)
+
+    def hold(
+        self, node: Hub | Connection, begin: int, end: int, amount: int = 1
+    ) -> None:
+        """
+        Reserve a node in the window table.
+
+        Terminals hold any number of drones and are never reserved.
+
+        Parameters
+        ----------
+        node
+            Hub or connection.
+        begin
+            First turn, included.
+        end
+            Last turn, excluded.
+        amount
+            Drones to add, negative to release them.
+        """
+        if node is self.map.start_hub or node is self.map.end_hub:
+            return
+        self.table.context.reserved[node.id].reserve(begin, end, amount)
+        self.touched.add(node.id)
+
+    def hold_path(
+        self,
+        hub: Hub,
+        ready: int,
+        moves: list[Move],
+        end: int,
+        amount: int = 1
+    ) -> None:
+        """
+        Reserve the nodes of a drone up to the end of the window.
+
+        Parameters
+        ----------
+        hub
+            Hub the drone is on.
+        ready
+            First turn the drone is on hub.
+        moves
+            Moves of the drone from there.
+        end
+            Last turn of the window, the drone staying on its last hub.
+        amount
+            Drones to add, negative to release them.
+        """
+        turn: int = ready
+        for dep, c, dest in moves:
+            self.hold(hub, turn, dep + 1, amount)
+            turn = dep + dest.cost
+            # crossed on arrival, or held until then
+            self.hold(c, min(dep + 1, turn), max(turn, dep + 2), amount)
+            hub = dest
+        self.hold(hub, turn, end + 1, amount)
+
+    def hold_route(self, route: Route, begin: int, end: int) -> None:
+        """
+        Reserve the part of a fixed route inside the window.
+
+        Parameters
+        ----------
+        route
+            Route reserved on the map.
+        begin
+            First turn of the window.
+        end
+            Last turn of the window.
+        """
+        prev: Hub | Connection = route.start
+        for turn, node, dwell in route.steps():
+            if turn > end:
+                break
+            if turn + dwell > begin:
+                self.hold(node, max(turn, begin), min(turn + dwell, end + 1))
+            if (
+                isinstance(prev, Hub) and isinstance(node, Hub)
+                and turn >= begin
+            ):
+                self.hold(
+                    self.map.get_connection(prev, node), turn, turn + 1
+                )
+            prev = node
+
+    def clear(self) -> None:
+        """
+        Empty the window table.
+        """
+        for node_id in self.touched:
+            self.table.context.reserved[node_id] = Timeline()
+        self.touched.clear()
+
+    def search(
+        self, hub: Hub, ready: int, cut: int, end: int
+    ) -> list[Move]:
+        """
+        Find the moves of one drone up to the end of the window.
+
+        States are (hub, turn) pairs, expanded in A* order using
+        distances_to_end as heuristic: a drone may wait on any hub, and
+        the search stops on the end hub or on the first state past the
+        window, whose cost is its turn plus its distance to the end.
+
+        Parameters
+        ----------
+        hub
+            Hub the drone is on.
+        ready
+            First turn the drone may leave hub after.
+        cut
+            Commit turn, no drone being between two hubs on it.
+        end
+            Last turn of the window.
+
+        Returns
+        -------
+        list[Move]
+            Moves of the drone, in order.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised if the drone can neither move nor wait.
+        """
+        m: "Map" = self.table
+        h: dict[Hub | Connection, int] = self.map.distances_to_end()
+        origin: State = (hub, ready)
+        # turns, waits on a hub other than the start one costing more
+        cost: dict[State, int] = {origin: 0}
+        priority: dict[State, int] = {origin: 0}
+        parent: dict[State, tuple[State, Move | None]] = {}
+        closed: set[State] = set()
+
+        # deepest first on ties, then through priority hubs
+        count: int = 0
+        heap: list[tuple[int, int, int, int, State]] = [
+            (h[hub], -ready, 0, count, origin)
+        ]
+        goal: State | None = None
+        while heap:
+            _, _, _, _, state = heapq.heappop(heap)
+            if state in closed:
+                continue
+            closed.add(state)
+            node, turn = state
+            if node is self.map.end_hub or turn >= end:
+                goal = state
+                break
+
+            # next state, move, added cost and priority bonus
+            nexts: list[tuple[State, Move | None, int, int]] = []
+            if node is self.map.start_hub:
+                nexts.append(((node, turn + 1), None, 1, 0))
+            elif m.is_node_valid(node, turn + 1):
+                nexts.append(((node, turn + 1), None, WAIT_COST, 0))
+            for c, dest in m.moves(node, turn + 1):
+                if dest in h and not turn < cut < turn + dest.cost:
+                    nexts.append((
+                        (dest, turn + dest.cost), (turn, c, dest), dest.cost,
+                        1 if dest.zone == "priority" else 0
+                    ))
+            for key, move, step, bonus in nexts:
+                g: int = cost[state] + step
+                prio: int = priority[state] + bonus
+                if key in closed or key in cost and (
+                    (cost[key], -priority[key]) <= (g, -prio)
+                ):
+                    continue
+                cost[key] = g
+                priority[key] = prio
+                parent[key] = (state, move)
+                count += 1
+                heapq.heappush(heap, (
+                    g + h[key[0]], -key[1], -prio, count, key
+                ))
+
+        if goal is None:
+            raise RuntimeError("can't find any existing path")
+        moves: list[Move] = []
+        while goal != origin:
+            goal, move = parent[goal]
+            if move is not None:
+                moves.append(move)
+        moves.reverse()
+        return moves
+
+    def route(self, moves: list[Move]) -> Route:
+        """
+        Build the route of a drone from its committed moves.
+
+        Parameters
+        ----------
+        moves
+            Moves of the drone, from the start hub to the end hub.
+
+        Returns
+        -------
+        Route
+            Route of the drone.
+        """
+        assert self.map.start_hub is not None
+
+        hops: list[tuple[Hub | Connection, int]] = []
+        for i, (dep, c, dest) in enumerate(moves):
+            if dest.cost > 1:
+                hops.append((c, dest.cost - 1))
+            arrival: int = dep + dest.cost
+            leave: int = moves[i + 1][0] if i + 1 < len(moves) else arrival
+            hops.append((dest, leave - arrival + 1))
+        return Route(
+            self.map.start_hub, moves[0][0] if moves else 0, hops
+        )
+
+    def plan(self, count: int) -> list[Route]:
+        """
+        Plan drones leaving the start hub together.
+
+        Before each window, every drone reserves the hub it stands on for
+        the whole window, and releases it when planned: a drone can
+        always wait, so no search ever fails. Moves never span the commit
+        turn, so the kept part of every path only relies on the kept part
+        of the others.
+
+        Parameters
+        ----------
+        count
+            Number of drones.
+
+        Returns
+        -------
+        list[Route]
+            Route of each drone.
+
+        Raises
+        ------
+        RuntimeError:
+            Raised if drones are still on their way past MAX_TURN.
+        """
+        assert self.map.start_hub is not None
+
+        hubs: list[Hub] = [self.map.start_hub] * count
+        ready: list[int] = [0] * count
+        moves: list[list[Move]] = [[] for _ in range(count)]
+        active: list[int] = list(range(count))
+        begin: int = 0
+        cycle: int = 0
+        while active:
+            if begin > MAX_TURN:
+                raise RuntimeError(
+                    f"can't find any path leaving before turn {MAX_TURN}"
+                )
+            cut: int = begin + self.commit
+            end: int = begin + self.window
+            for route in self.fixed:
+                self.hold_route(route, begin, end)
+            for i in active:
+                self.hold_path(hubs[i], ready[i], [], end)
+
+            shift: int = cycle % len(active)
+            for i in active[shift:] + active[:shift]:
+                self.hold_path(hubs[i], ready[i], [], end, -1)
+                path: list[Move] = self.search(hubs[i], ready[i], cut, end)
+                self.hold_path(hubs[i], ready[i], path, end)
+                for move in path:
+                    if move[0] >= cut:
+                        break
+                    moves[i].append(move)
+                    hubs[i] = move[2]
+                    ready[i] = move[0] + move[2].cost
+
+            begin = cut
+            cycle += 1
+            active = [i for i in active if hubs[i] is not self.map.end_hub]
+            for i in active:
+                ready[i] = begin
+            self.clear()
+        return [self.route(path) for path in moves]
@@ -1,3 +1,5 @@
-from .parsing import parse
+from .parsing import parse, parse_text
+from .parallel import parse_parallel
+from .incremental import IncrementalParser
 
-__all__ = ["parse"]
+__all__ = ["parse", "parse_text", "parse_parallel", "IncrementalParser"]
@@ -0,0 +1,232 @@
+from typing import Any
+
+from src.error import ParseError
+from .parsing import (
+    split_line,
+    check_key,
+    check_terminals,
+    new_specs,
+    split_connection_token,
+    parse_connection_metadata,
+    parse_hub
+)
+
+
+# parsed hub, (from, to, capacity) of a connection, capacity being the
+# error its metadata raised, or the error the line raised
+Entry = (
+    dict[str, dict[str, Any]] | tuple[str, str, int | ParseError]
+    | ParseError | None
+)
+# key and value of a line, or the error splitting raised, and its entry
+Parsed = tuple[tuple[str, str] | ParseError | None, Entry]
+
+
+class IncrementalParser():
+    """
+    Map file parser reusing the results of unchanged lines.
+
+    Each line is parsed on its own and cached by its text: only lines
+    that changed since the last call are parsed again. Checks spanning
+    several lines (first key, duplicate names and connections, unknown
+    hubs, terminals) are set lookups, run again over the cached results
+    in file order, so specs and error messages are the same as parse.
+    """
+    def __init__(self, file_name: str) -> None:
+        """
+        Create a parser with an empty cache.
+
+        Parameters
+        ----------
+        file_name
+            Path to the spec file to parse.
+        """
+        self.file_name: str = file_name
+        # keyed by (line, nb_drones), see cache_key
+        self.lines: dict[tuple[str, int], Parsed] = {}
+        # lines parsed again by the last call
+        self.reparsed: int = 0
+
+    @staticmethod
+    def cache_key(line: str, nb_drones: int) -> tuple[str, int]:
+        """
+        Key a line in the cache.
+
+        Terminals default to nb_drones drones, so lines that may declare
+        one are parsed again when it changes.
+
+        Parameters
+        ----------
+        line
+            Raw line.
+        nb_drones
+            Total number of drones, 0 before it is declared.
+
+        Returns
+        -------
+        tuple[str, int]
+            Cache key of the line.
+        """
+        if "start_hub" in line or "end_hub" in line:
+            return line, nb_drones
+        return line, 0
+
+    @staticmethod
+    def parse_line(line: str, nb_drones: int) -> Parsed:
+        """
+        Parse what a line tells on its own.
+
+        Parameters
+        ----------
+        line
+            Raw line.
+        nb_drones
+            Total number of drones, 0 before it is declared.
+
+        Returns
+        -------
+        Parsed
+            Key and value (None for empty and comment lines) or the error
+            splitting raised, and the parsed hub or connection, if any.
+        """
+        try:
+            split: tuple[str, str] | None = split_line(line)
+        except ParseError as e:
+            return e, None
+        if split is None:
+            return None, None
+        key, value = split
+        if "hub" in key:
+            try:
+                return split, parse_hub(
+                    {"seen_names": set()}, key, value, nb_drones
+                )
+            except ParseError as e:
+                return split, e
+        if key == "connection":
+            try:
+                from_hub, dest_hub, pre_metadata = split_connection_token(
+                    value
+                )
+            except ParseError as e:
+                return split, e
+            capacity: int | ParseError
+            try:
+                capacity = parse_connection_metadata(pre_metadata)
+            except ParseError as e:
+                capacity = e
+            return split, (from_hub, dest_hub, capacity)
+        return split, None
+
+    def parse(self) -> dict[str, Any]:
+        """
+        Parse the map file into specs.
+
+        Cached results of lines gone from the file are dropped.
+
+        Returns
+        -------
+        dict[str, Any]
+            Complete parsed map specification dict.
+
+        Raises
+        ------
+        ParseError:
+            Raised when a line fails to parse, prefixed with its number.
+        ParseError:
+            Raised when start_hub or end_hub is missing or duplicated.
+        """
+        with open(self.file_name, "r", encoding="utf-8") as f:
+            lines: list[str] = f.readlines()
+
+        cached: dict[tuple[str, int], Parsed] = self.lines
+        self.lines = {}
+        self.reparsed = 0
+        map_specs, seen = new_specs()
+        for i, line in enumerate(lines, start=1):
+            key: tuple[str, int] = self.cache_key(
+                line, map_specs.get("nb_drones", 0)
+            )
+            if key not in cached:
+                self.reparsed += 1
+                cached[key] = self.parse_line(line, key[1])
+            self.lines[key] = cached[key]
+            try:
+                self.merge(seen, map_specs, *cached[key])
+            except ParseError as e:
+                # lines after the error are kept for the next call
+                self.lines = cached
+                raise ParseError(f"l{i}: {e}")
+
+        try:
+            check_terminals(seen)
+        except ParseError:
+            self.lines = cached
+            raise
+        return map_specs
+
+    @staticmethod
+    def merge(
+        seen: dict[str, Any],
+        map_specs: dict[str, Any],
+        split: tuple[str, str] | ParseError | None,
+        entry: Entry
+    ) -> None:
+        """
+        Check a parsed line against the previous ones and add it.
+
+        Parameters
+        ----------
+        seen
+            Seen keys and names while parsing.
+        map_specs
+            Map spec dict being built.
+        split
+            Key and value of the line, see parse_line.
+        entry
+            Parsed hub or connection of the line, see parse_line.
+
+        Raises
+        ------
+        ParseError:
+            Raised as parse_key would for the same line.
+        """
+        if split is None:
+            return
+        if isinstance(split, ParseError):
+            raise split
+        key, value = split
+        check_key(seen, key)
+        if isinstance(entry, ParseError):
+            raise entry
+
+        if isinstance(entry, dict):
+            name: str = next(iter(entry))
+            if name in seen["seen_names"]:
+                raise ParseError(f"invalid name ({name}), already assigned")
+            seen["seen_names"].add(name)
+            map_specs["hubs"] |= entry
+        elif entry is not None:
+            from_hub, dest_hub, capacity = entry
+            if (
+                from_hub not in map_specs["hubs"]
+                or dest_hub not in map_specs["hubs"]
+            ):
+                raise ParseError("invalid connection (unexisting hub(s))")
+            if (
+                f"{from_hub}-{dest_hub}" in seen["connections"]
+                or f"{dest_hub}-{from_hub}" in seen["connections"]
+            ):
+                raise ParseError("invalid connection (already registered)")
+            seen["connections"].add(f"{from_hub}-{dest_hub}")
+            if isinstance(capacity, ParseError):
+                raise capacity
+            map_specs["connections"].append((from_hub, dest_hub, capacity))
+        elif key == "nb_drones":
+            if key in seen["seen_keys"]:
+                raise ParseError(f"invalid key, {key} already seen")
+            try:
+                map_specs["nb_drones"] = int(value)
+            except ValueError:
+                raise ParseError(f"invalid value ({value}) for {key}")
+        seen["seen_keys"].append(key)
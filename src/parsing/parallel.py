@@ -0,0 +1,209 @@
+import mmap
+import multiprocessing as mp
+from typing import Any
+
+from src.error import ParseError
+from .parsing import (
+    split_line,
+    check_key,
+    parse_key,
+    check_terminals,
+    new_specs,
+    split_connection,
+    parse_connection_metadata,
+    parse
+)
+
+
+# chunks per worker, smooths out uneven chunks
+CHUNKS_PER_JOB: int = 4
+
+# file and hub names, set once in each worker by init_worker
+worker_state: dict[str, Any] = {}
+
+
+def init_worker(file_name: str, hubs: dict[str, Any]) -> None:
+    """
+    Store what every chunk of a worker needs.
+
+    Parameters
+    ----------
+    file_name
+        Map file.
+    hubs
+        Hubs declared before the connection section, by name.
+    """
+    worker_state["file_name"] = file_name
+    worker_state["hubs"] = hubs
+
+
+def parse_chunk(bounds: tuple[int, int]) -> tuple[
+    list[tuple[int, str, str, int]],
+    int,
+    tuple[int, str, tuple[str, str] | None] | None,
+    bool
+]:
+    """
+    Parse a line-aligned range of the connection section.
+
+    Duplicates are not checked here, they are found when merging chunks.
+
+    Parameters
+    ----------
+    bounds
+        First byte and byte after the last one.
+
+    Returns
+    -------
+    tuple[list[tuple[int, str, str, int]], int,
+          tuple[int, str, tuple[str, str] | None] | None, bool]
+        (line, from, to, capacity) of each connection with lines counted
+        from the chunk start, the number of lines of the chunk, the first
+        error as (line, message, connection) if any, connection being set
+        when the error comes after the duplicate check, and whether a
+        non-connection line was met.
+    """
+    begin, end = bounds
+    with open(worker_state["file_name"], "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text: str = mm[begin:end].decode("utf-8")
+    lines: list[str] = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+
+    seen: dict[str, Any] = {"seen_keys": ["nb_drones"]}
+    connections: list[tuple[int, str, str, int]] = []
+    for i, line in enumerate(lines, start=1):
+        pair: tuple[str, str] | None = None
+        try:
+            split: tuple[str, str] | None = split_line(line)
+            if split is None:
+                continue
+            key, value = split
+            check_key(seen, key)
+            if key != "connection":
+                return connections, len(lines), None, True
+            from_hub, dest_hub, pre_metadata = split_connection(
+                value, worker_state["hubs"]
+            )
+            pair = (from_hub, dest_hub)
+            connections.append((
+                i, from_hub, dest_hub,
+                parse_connection_metadata(pre_metadata)
+            ))
+        except ParseError as e:
+            return connections, len(lines), (i, str(e), pair), False
+    return connections, len(lines), None, False
+
+
+def parse_parallel(file_name: str, jobs: int) -> dict[str, Any]:
+    """
+    Parse a map file, splitting connections across processes.
+
+    Lines are parsed sequentially up to the first connection. The rest
+    of the memory-mapped file is cut into line-aligned chunks parsed by a
+    process pool, then merged in order, duplicates being checked there.
+    Results and error messages are the same as parse. If a line other
+    than a connection follows the first connection, the file is parsed
+    again with parse.
+
+    Parameters
+    ----------
+    file_name
+        Path to the spec file to parse.
+    jobs
+        Number of worker processes.
+
+    Returns
+    -------
+    dict[str, Any]
+        Complete parsed map specification dict.
+
+    Raises
+    ------
+    ParseError:
+        Raised when a line fails to parse, prefixed with its number.
+    ParseError:
+        Raised when start_hub or end_hub is missing or duplicated.
+    """
+    map_specs, seen = new_specs()
+    with open(file_name, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # only "\n" line ends are split on by chunks
+            if mm.find(b"\r") != -1:
+                return parse(file_name)
+            size: int = len(mm)
+            offset: int = 0
+            nb_lines: int = 0
+            while offset < size:
+                raw: bytes = mm.readline()
+                nb_lines += 1
+                try:
+                    split: tuple[str, str] | None = split_line(
+                        raw.decode("utf-8")
+                    )
+                    if split is not None:
+                        key, value = split
+                        check_key(seen, key)
+                        if key == "connection":
+                            nb_lines -= 1
+                            break
+                        parse_key(seen, map_specs, key, value)
+                except ParseError as e:
+                    raise ParseError(f"l{nb_lines}: {e}")
+                offset += len(raw)
+
+            bounds: list[tuple[int, int]] = []
+            count: int = jobs * CHUNKS_PER_JOB
+            begin: int = offset
+            for k in range(1, count + 1):
+                if begin >= size:
+                    break
+                target: int = offset + (size - offset) * k // count
+                newline: int = mm.find(b"\n", max(target, begin))
+                cut: int = size if newline == -1 or k == count else (
+                    newline + 1
+                )
+                bounds.append((begin, cut))
+                begin = cut
+
+    chunks: list[tuple[
+        list[tuple[int, str, str, int]],
+        int,
+        tuple[int, str, tuple[str, str] | None] | None,
+        bool
+    ]] = []
+    if bounds:
+        with mp.get_context().Pool(
+            jobs, initializer=init_worker,
+            initargs=(file_name, map_specs["hubs"])
+        ) as pool:
+            chunks = pool.map(parse_chunk, bounds)
+
+    # merge in file order, as parse would have met them
+    registered: set[tuple[str, str]] = set()
+    for connections, chunk_lines, error, other_key in chunks:
+        for i, from_hub, dest_hub, capacity in connections:
+            pair: tuple[str, str] = (
+                min(from_hub, dest_hub), max(from_hub, dest_hub)
+            )
+            if pair in registered:
+                raise ParseError(
+                    f"l{nb_lines + i}: "
+                    "invalid connection (already registered)"
+                )
+            registered.add(pair)
+            map_specs["connections"].append((from_hub, dest_hub, capacity))
+        if error is not None:
+            line, message, failed = error
+            if failed is not None and (
+                min(failed), max(failed)
+            ) in registered:
+                message = "invalid connection (already registered)"
+            raise ParseError(f"l{nb_lines + line}: {message}")
+        if other_key:
+            return parse(file_name)
+        nb_lines += chunk_lines
+
+    check_terminals(seen)
+    return map_specs
@@ -1,4 +1,5 @@
-from typing import Any
+import io
+from typing import IO, Any, Iterable
 
 from src.error import ParseError
 
@@ -14,7 +15,8 @@ keys: set[str] = {
 hub_metadata_keys: set[str] = {
     "zone",
     "color",
-    "max_drones"
+    "max_drones",
+    "cost"
 }
 
 connection_metadata_keys: set[str] = {
@@ -100,8 +102,68 @@ def parse_connection_metadata(pre_metadata: list[str]) -> int:
     return max_link_capacity
 
 
+def split_connection_token(value: str) -> tuple[str, str, list[str]]:
+    """
+    Split a connection specification without looking its hubs up.
+
+    Parameters
+    ----------
+    value
+        Raw connection value string.
+
+    Returns
+    -------
+    tuple[str, str, list[str]]
+        Hub names and raw metadata tokens.
+
+    Raises
+    ------
+    ParseError:
+        Raised when the connection token is malformed.
+    """
+    connection, *pre_metadata = value.split()
+    # get hubs
+    if connection.count("-") != 1:
+        raise ParseError("invalid connection syntax (should have one '-')")
+    from_hub, dest_hub = connection.split("-")
+    return from_hub, dest_hub, pre_metadata
+
+
+def split_connection(
+    value: str, hubs: dict[str, Any]
+) -> tuple[str, str, list[str]]:
+    """
+    Split a connection specification.
+
+    Check the connection token and its hubs, leaving metadata raw.
+
+    Parameters
+    ----------
+    value
+        Raw connection value string.
+    hubs
+        Hubs declared so far, by name.
+
+    Returns
+    -------
+    tuple[str, str, list[str]]
+        Hub names and raw metadata tokens.
+
+    Raises
+    ------
+    ParseError:
+        Raised when the connection token is malformed.
+    ParseError:
+        Raised when a referenced hub does not exist.
+    """
+    from_hub, dest_hub, pre_metadata = split_connection_token(value)
+    if from_hub not in hubs or dest_hub not in hubs:
+        raise ParseError("invalid connection (unexisting hub(s))")
+    return from_hub, dest_hub, pre_metadata
+
+
 def parse_connection(
-    seen: dict[str, list[str]], value: str, map_specs: dict[str, Any]
+    seen: dict[str, Any], value: str, map_specs: dict[str, Any]
 ) -> tuple[str, str, int]:
     """
     Parse a connection specification.
@@ -132,18 +194,15 @@ def parse_connection(
         Raised when the connection is already registered.
     """
     metadata: int = 0
-    connection, *pre_metadata = value.split()
-    # get hubs
-    if connection.count("-") != 1:
-        raise ParseError("invalid connection syntax (should have one '-')")
-    from_hub, dest_hub = connection.split("-")
-    if from_hub not in map_specs["hubs"] or dest_hub not in map_specs["hubs"]:
-        raise ParseError("invalid connection (unexisting hub(s))")
+    from_hub, dest_hub, pre_metadata = split_connection(
+        value, map_specs["hubs"]
+    )
+    connection: str = "-".join([from_hub, dest_hub])
     # check already seen connections
     reverse: str = "-".join([dest_hub, from_hub])
     if (connection in seen["connections"] or reverse in seen["connections"]):
         raise ParseError("invalid connection (already registered)")
-    seen["connections"].append(connection)
+    seen["connections"].add(connection)
     metadata = parse_connection_metadata(pre_metadata)
 
     return (from_hub, dest_hub, metadata)
@@ -155,7 +214,7 @@ def parse_hub_metadata(
     """
     Parse hub metadata.
 
-    Parse zone/color/max_drones metadata with defaults.
+    Parse zone/color/max_drones/cost metadata with defaults.
 
     Parameters
     ----------
@@ -186,7 +245,7 @@ def parse_hub_metadata(
     ParseError:
         Raised when the color value is empty.
     ParseError:
-        Raised when max_drones is not an int.
+        Raised when max_drones or cost is not an int.
     ParseError:
         Raised when max_drones is too small for start/end.
     ParseError:
@@ -251,6 +310,11 @@ def parse_hub_metadata(
                     f"invalid metadata value ({value}), {hub_key} 'max_drones'"
                     " must be equal or superior to 'nb_drones'"
                 )
+        elif key == "cost":
+            try:
+                metadata[key] = int(value)
+            except ValueError:
+                raise ParseError(f"invalid metadata value ({value})")
         else:
             metadata[key] = value
 
@@ -261,7 +325,7 @@ def parse_hub_metadata(
 
 
 def parse_hub(
-    seen: dict[str, list[str]], key: str, value: str, nb_drones: int
+    seen: dict[str, Any], key: str, value: str, nb_drones: int
 ) -> dict[str, dict[str, Any]]:
     """
     Parse a hub specification.
@@ -313,25 +377,23 @@ def parse_hub(
     # valid
     if name in seen["seen_names"]:
         raise ParseError(f"invalid name ({name}), already assigned")
-    seen["seen_names"].append(name)
+    seen["seen_names"].add(name)
     return {name: {"x": x, "y": y} | metadata}
 
 
-def parse(file_name: str) -> dict[str, Any]:
+def split_line(line: str) -> tuple[str, str] | None:
     """
-    Parse a map file into specs.
-
-    Read a spec file and return a validated map_specs dict.
+    Split a line into key and value.
 
     Parameters
     ----------
-    file_name
-        Path to the spec file to parse.
+    line
+        Raw line.
 
     Returns
     -------
-    dict[str, Any]
-        Complete parsed map specification dict.
+    tuple[str, str] | None
+        Key and value, or None for empty and comment lines.
 
     Raises
     ------
@@ -339,82 +401,239 @@ def parse(file_name: str) -> dict[str, Any]:
         Raised when a line has an invalid ':' count.
     ParseError:
         Raised when key or value is empty.
+    """
+    # remove from line what's after first #
+    comment_index: int = line.find('#')
+    if comment_index != -1:
+        line = line[0:comment_index]
+    # ignore empty lines
+    if not line.strip():
+        return None
+    # split key, value
+    if line.count(":") != 1:
+        raise ParseError("invalid number of ':'")
+    key, value = line.split(":")
+
+    if not key.strip() or not value.strip():
+        raise ParseError("invalid line (empty key or value)")
+    return key, value
+
+
+def check_key(seen: dict[str, Any], key: str) -> None:
+    """
+    Check a key against the keys seen so far.
+
+    Parameters
+    ----------
+    seen
+        Seen keys and names while parsing.
+    key
+        Key of the line.
+
+    Raises
+    ------
     ParseError:
         Raised when a key is unknown.
     ParseError:
         Raised when the first key is not nb_drones.
+    """
+    if key not in keys:
+        raise ParseError(f"invalid key ({key})")
+    if not seen["seen_keys"] and key != "nb_drones":
+        raise ParseError(f"invalid first key ({key})")
+
+
+def parse_key(
+    seen: dict[str, Any],
+    map_specs: dict[str, Any],
+    key: str,
+    value: str
+) -> None:
+    """
+    Parse the value of a checked key into the map specs.
+
+    Parameters
+    ----------
+    seen
+        Seen keys and names while parsing.
+    map_specs
+        Map spec dict being built.
+    key
+        Key of the line, see check_key.
+    value
+        Raw value of the line.
+
+    Raises
+    ------
     ParseError:
         Raised when nb_drones is not an int.
     ParseError:
-        Raised when a line fails to parse.
+        Raised when a value fails to parse.
+    """
+    if "hub" in key:
+        map_specs[
+            "hubs"
+        ] |= parse_hub(seen, key, value, map_specs["nb_drones"])
+    elif key == "connection":
+        map_specs[
+            "connections"
+        ].append(parse_connection(seen, value, map_specs))
+    elif key == "nb_drones":
+        if key in seen["seen_keys"]:
+            raise ParseError(f"invalid key, {key} already seen")
+        try:
+            nb_drones: int = int(value)
+            map_specs["nb_drones"] = nb_drones
+        except ValueError:
+            raise ParseError(f"invalid value ({value}) for {key}")
+    seen["seen_keys"].append(key)
+
+
+def check_terminals(seen: dict[str, Any]) -> None:
+    """
+    Check that start and end hubs are declared once.
+
+    Parameters
+    ----------
+    seen
+        Seen keys and names after parsing.
+
+    Raises
+    ------
     ParseError:
         Raised when start_hub is missing or duplicated.
     ParseError:
         Raised when end_hub is missing or duplicated.
     """
+    if seen["seen_keys"].count("start_hub") != 1:
+        raise ParseError(
+            "invalid number of 'start_hub' keys (should be one)"
+        )
+    if seen["seen_keys"].count("end_hub") != 1:
+        raise ParseError(
+            "invalid number of 'end_hub' keys (should be one)"
+        )
+
+
+def new_specs() -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    Create empty map specs and seen tracking.
+
+    Returns
+    -------
+    tuple[dict[str, Any], dict[str, Any]]
+        Map specs and seen keys and names.
+    """
     map_specs: dict[str, Any] = {}
     map_specs["hubs"] = {}
     map_specs["connections"] = []
 
-    seen: dict[str, list[str]] = {}
+    seen: dict[str, Any] = {}
     seen["seen_keys"] = []
-    seen["seen_names"] = []
-    seen["connections"] = []
-    with open(file_name, "r", encoding="utf-8") as f:
-        nb_keys: int = 0
-        for i, line in enumerate(f, start=1):
-            try:
-                # remove from line what's after first #
-                comment_index: int = line.find('#')
-                if comment_index != -1:
-                    line = line[0:comment_index]
-                # ignore empty lines
-                if not line.strip():
-                    continue
-                # split key, value
-                if line.count(":") != 1:
-                    raise ParseError("invalid number of ':'")
-                key, value = line.split(":")
-
-                if not key.strip() or not value.strip():
-                    raise ParseError("invalid line (empty key or value)")
-
-                # parse key
-                if key not in keys:
-                    raise ParseError(f"invalid key ({key})")
-                if nb_keys == 0 and key != "nb_drones":
-                    raise ParseError(f"invalid first key ({key})")
-
-                if "hub" in key:
-                    map_specs[
-                        "hubs"
-                    ] |= parse_hub(seen, key, value, map_specs["nb_drones"])
-                elif key == "connection":
-                    map_specs[
-                        "connections"
-                    ].append(parse_connection(seen, value, map_specs))
-                elif key == "nb_drones":
-                    if key in seen["seen_keys"]:
-                        raise ParseError(f"invalid key, {key} already seen")
-                    try:
-                        nb_drones: int = int(value)
-                        map_specs["nb_drones"] = nb_drones
-                    except ValueError:
-                        raise ParseError(f"invalid value ({value}) for {key}")
-                seen["seen_keys"].append(key)
-                nb_keys += 1
-
-            except ParseError as e:
-                raise ParseError(f"l{i}: {e}")
-
-        # check keys validity
-        if seen["seen_keys"].count("start_hub") != 1:
-            raise ParseError(
-                "invalid number of 'start_hub' keys (should be one)"
-            )
-        if seen["seen_keys"].count("end_hub") != 1:
-            raise ParseError(
-                "invalid number of 'end_hub' keys (should be one)"
-            )
+    # sets, names and connections are only looked up
+    seen["seen_names"] = set()
+    seen["connections"] = set()
+    return map_specs, seen
+
+
+def parse_lines(lines: Iterable[str]) -> dict[str, Any]:
+    """
+    Parse map lines into specs.
+
+    Parameters
+    ----------
+    lines
+        Lines of a spec file, in order.
+
+    Returns
+    -------
+    dict[str, Any]
+        Complete parsed map specification dict.
+
+    Raises
+    ------
+    ParseError:
+        Raised when a line fails to parse, prefixed with its number.
+    ParseError:
+        Raised when start_hub or end_hub is missing or duplicated.
+    """
+    map_specs, seen = new_specs()
+    for i, line in enumerate(lines, start=1):
+        try:
+            split: tuple[str, str] | None = split_line(line)
+            if split is None:
+                continue
+            key, value = split
+            check_key(seen, key)
+            parse_key(seen, map_specs, key, value)
+
+        except ParseError as e:
+            raise ParseError(f"l{i}: {e}")
+
+    # check keys validity
+    check_terminals(seen)
 
     return map_specs
+
+
+def parse(file_name: str) -> dict[str, Any]:
+    """
+    Parse a map file into specs.
+
+    Read a spec file and return a validated map_specs dict.
+
+    Parameters
+    ----------
+    file_name
+        Path to the spec file to parse.
+
+    Returns
+    -------
+    dict[str, Any]
+        Complete parsed map specification dict.
+
+    Raises
+    ------
+    ParseError:
+        Raised when a line fails to parse, prefixed with its number.
+    ParseError:
+        Raised when start_hub or end_hub is missing or duplicated.
+    """
+    with open(file_name, "r", encoding="utf-8") as f:
+        return parse_lines(f)
+
+
+def parse_text(source: str | bytes | IO[str] | IO[bytes]) -> dict[str, Any]:
+    """
+    Parse a map held in memory into specs.
+
+    Parameters
+    ----------
+    source
+        Map text, UTF-8 bytes, or a text or binary file object read
+        from its current position. A str is the text itself, never a
+        path, see parse.
+
+    Returns
+    -------
+    dict[str, Any]
+        Complete parsed map specification dict.
+
+    Raises
+    ------
+    ParseError:
+        Raised when a line fails to parse, prefixed with its number.
+    ParseError:
+        Raised when start_hub or end_hub is missing or duplicated.
+    ParseError:
+        Raised when bytes are not valid UTF-8.
+    """
+    if isinstance(source, str):
+        # newlines translated as when reading a file
+        return parse_lines(io.StringIO(source, newline=None))
+    if isinstance(source, bytes):
+        try:
+            return parse_text(source.decode("utf-8"))
+        except UnicodeDecodeError as e:
+            raise ParseError(f"invalid encoding ({e.reason})")
+    return parse_text(source.read())